@@ -1,12 +1,18 @@
 from typing import Any, Optional
 from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import JSONResponse
 from datetime import datetime, timedelta
 from collections import defaultdict
+import numpy as np
 from app.models.raw_data import RawData, DataSource
 from app.models.user import User
 from app.db.session import MongoDatabase
 from app.api import deps
-from app.services.disl import NinjasProvider, WildlifeProvider, EBirdProvider
+from app.core.config import settings
+from app.models.etl_job import EtlJobKind, EtlJobStatus
+from app.services.disl.ebird_batch import ObservationBatch
+from app.services.disl.ebird_store import EBirdObservationStore
+from app.services.disl.job_queue import EtlJobQueue
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,105 +31,57 @@ async def get_temporal_patterns(
         raw_data_collection = db["raw_data"]
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
-        cursor = raw_data_collection.find({
-            "source": DataSource.EBIRD.value,
-            "fetched_at": {"$gte": cutoff_date}
-        }).sort("fetched_at", 1)
-        
-        ebird_data = []
-        async for doc in cursor:
-            doc["id"] = str(doc["_id"])
-            del doc["_id"]
-            ebird_data.append(RawData(**doc))
+        observation_store = EBirdObservationStore()
+        ebird_data = await observation_store.find_batch(fields=["location"], species=species, obs_since=cutoff_date, limit=0)
         
         # Temporal aggregation structures
         hourly_counts = defaultdict(int)
         daily_counts = defaultdict(int)  # 0=Monday, 6=Sunday
         monthly_counts = defaultdict(int)
-        total_observations = 0
         species_locations = set()  # For habitat correlation
+        data_sources_used = ["ebird", "local_db"]
         
         species_filter = species.lower() if species else None
         
+        def aggregate(observations: ObservationBatch) -> int:
+            hourly, daily, monthly = observations.temporal_counts()
+            for counts, values in ((hourly_counts, hourly), (daily_counts, daily), (monthly_counts, monthly)):
+                for key in np.flatnonzero(values).tolist():
+                    counts[key] += int(values[key])
+
+            # Collect locations for habitat analysis
+            dated = ~np.isnat(observations.obs_dt)
+            species_locations.update(loc.lower() for loc in set(observations.location[dated].tolist()) if loc)
+            return int(dated.sum())
+        
         # Process eBird observations
-        for record in ebird_data:
-            if record.metadata.get("type") == "normalized" and isinstance(record.data, list):
-                for obs in record.data:
-                    # Filter by species if specified
-                    if species_filter:
-                        obs_species = (obs.get("species") or obs.get("comName") or obs.get("sci_name") or obs.get("sciName") or "").lower()
-                        if species_filter not in obs_species:
-                            continue
-                    
-                    date_str = obs.get("obsDt") or obs.get("date")
-                    if not date_str:
-                        continue
-                    
-                    try:
-                        obs_date = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-                        hourly_counts[obs_date.hour] += 1
-                        daily_counts[obs_date.weekday()] += 1
-                        monthly_counts[obs_date.month] += 1
-                        total_observations += 1
-                        
-                        # Collect location for habitat analysis
-                        loc = obs.get("locName", "")
-                        if loc:
-                            species_locations.add(loc.lower())
-                    except Exception as e:
-                        logger.warning(f"Failed to parse date {date_str}: {e}")
-                        pass
+        total_observations = aggregate(ebird_data)
         
         if total_observations == 0 and species:
             logger.info(f"[ANALYTICS] No local observations found for {species}, fetching from eBird API...")
             try:
-                ebird_provider = EBirdProvider()
-                # Run ETL for the species (defaults to "world" region)
-                await ebird_provider.run_etl(species=species, max_results=100)
+                # Run ETL for the species (defaults to "world" region) in the worker; a species eBird
+                # has no sightings of is collected again once per collection interval at most
+                queue = EtlJobQueue()
+                job = await queue.enqueue_unless_recent(
+                    EtlJobKind.EBIRD_RUN_ETL, {"region_code": "world", "species": species, "max_results": 100},
+                    within=timedelta(minutes=settings.EBIRD_COLLECTION_INTERVAL_MINUTES), user_id=current_user.id,
+                )
+                job = await queue.wait(job.id)
+                if job.status in (EtlJobStatus.QUEUED, EtlJobStatus.RUNNING):
+                    # Still collecting: the client polls /etl/jobs/{job_id} and asks again once it is done
+                    return JSONResponse(status_code=202, content={
+                        "species": species,
+                        "message": "Collecting eBird observations",
+                        "job_id": job.id,
+                        "status": job.status.value,
+                    })
+                if job.status != EtlJobStatus.SUCCEEDED:
+                    raise RuntimeError(f"eBird job {job.id} failed: {job.error}")
                 
                 # Re-query DB after fetch
-                cursor = raw_data_collection.find({
-                    "source": DataSource.EBIRD.value,
-                    "fetched_at": {"$gte": cutoff_date}
-                }).sort("fetched_at", 1)
-                
-                ebird_data = []
-                async for doc in cursor:
-                    doc["id"] = str(doc["_id"])
-                    del doc["_id"]
-                    ebird_data.append(RawData(**doc))
-                
-                # Reset counts and process again
-                total_observations = 0
-                species_locations.clear()
-                hourly_counts.clear()
-                daily_counts.clear()
-                monthly_counts.clear()
-                
-                for record in ebird_data:
-                    if record.metadata.get("type") == "normalized" and isinstance(record.data, list):
-                        for obs in record.data:
-                            if species_filter:
-                                obs_species = (obs.get("species") or obs.get("comName") or obs.get("sci_name") or obs.get("sciName") or "").lower()
-                                if species_filter not in obs_species:
-                                    continue
-                            
-                            date_str = obs.get("obsDt") or obs.get("date")
-                            if not date_str:
-                                continue
-                            
-                            try:
-                                obs_date = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-                                hourly_counts[obs_date.hour] += 1
-                                daily_counts[obs_date.weekday()] += 1
-                                monthly_counts[obs_date.month] += 1
-                                total_observations += 1
-                                
-                                loc = obs.get("locName", "")
-                                if loc:
-                                    species_locations.add(loc.lower())
-                            except Exception as e:
-                                pass
+                ebird_data = await observation_store.find_batch(fields=["location"], species=species, obs_since=cutoff_date, limit=0)
+                total_observations = aggregate(ebird_data)
                                 
                 if total_observations > 0:
                      logger.info(f"[ANALYTICS] Successfully fetched and processed {total_observations} new observations for {species}")
@@ -146,7 +104,7 @@ async def get_temporal_patterns(
         
         habitat_info = {}
         behavior_info = {}
-        data_sources_used = ["ebird", "local_db"]
+        ninjas_job = None
         
         if include_habitat and species:
             logger.debug(f"[ANALYTICS] Fetching habitat data for species: {species}")
@@ -187,31 +145,26 @@ async def get_temporal_patterns(
             if not habitat_info and not behavior_info:
                 logger.info(f"[ANALYTICS] No local data found, fetching from external APIs for: {species}")
                 try:
-                    # Use Ninjas ETL Provider
-                    ninjas_provider = NinjasProvider()
-                    raw_ninjas_data = await ninjas_provider.fetch(name=species)
+                    # Ninjas ETL (fetch, normalize, save) runs in the worker
+                    job = await EtlJobQueue().run(EtlJobKind.NINJAS_FETCH, {"name": species}, user_id=current_user.id)
+                    if job.status in (EtlJobStatus.QUEUED, EtlJobStatus.RUNNING):
+                        # Answered without habitat; the client can poll the job and ask again
+                        ninjas_job = {"job_id": job.id, "status": job.status.value}
+                    elif job.status != EtlJobStatus.SUCCEEDED:
+                        raise RuntimeError(f"Ninjas job {job.id} failed: {job.error}")
+                    animal = job.result["animal"] if job.status == EtlJobStatus.SUCCEEDED else None
                     
-                    logger.debug(f"[ANALYTICS] Ninjas API raw response: {raw_ninjas_data}")
+                    logger.debug(f"[ANALYTICS] Ninjas first match: {animal}")
                     
-                    if raw_ninjas_data:
-                        # Normalize using ETL
-                        normalized_ninjas = ninjas_provider.normalize(raw_ninjas_data)
-                        
-                        logger.debug(f"[ANALYTICS] Ninjas normalized data: {normalized_ninjas}")
+                    if animal:
+                        # Extract info from the normalized first match
+                        data_sources_used.append("ninjas_live")
+                        characteristics = animal.get("characteristics") or {}
+                        behavior_info["diet"] = characteristics.get("diet", "Unknown")
+                        behavior_info["habitat"] = characteristics.get("habitat", "Unknown")
+                        habitat_info["primary_habitat"] = characteristics.get("habitat", "Unknown")
                         
-                        # Save to DB using ETL
-                        await ninjas_provider.save(raw_ninjas_data, normalized_ninjas)
-                        
-                        # Extract info from normalized data
-                        if normalized_ninjas and len(normalized_ninjas) > 0:
-                            data_sources_used.append("ninjas_live")
-                            animal = normalized_ninjas[0]
-                            characteristics = animal.get("characteristics", {})
-                            behavior_info["diet"] = characteristics.get("diet", "Unknown")
-                            behavior_info["habitat"] = characteristics.get("habitat", "Unknown")
-                            habitat_info["primary_habitat"] = characteristics.get("habitat", "Unknown")
-                            
-                            logger.info(f"[ANALYTICS] Successfully fetched and normalized Ninjas data for {species}")
+                        logger.info(f"[ANALYTICS] Successfully fetched and normalized Ninjas data for {species}")
                         
                 except Exception as e:
                     logger.error(f"[ANALYTICS] Failed to fetch external API data: {e}", exc_info=True)
@@ -301,6 +254,7 @@ async def get_temporal_patterns(
             "seasonal_distribution": monthly_dist,
             "habitat_correlation": habitat_correlation if habitat_correlation else None,
             "species_behavior": behavior_info if behavior_info else None,
+            "ninjas_job": ninjas_job,
             "recommendations": recommendations,
             "data_quality": {
                 "observation_count": total_observations,
@@ -1,11 +1,19 @@
-from typing import Any, List
+from typing import Any, List, Optional
 from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Query
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from motor.core import AgnosticDatabase as MongoDatabase
-from app.models.raw_data import RawData, DataSource, ETLStatus
+from app.core.leader import JobRunHistory
+from app.core.scheduler import scheduler_leader
+from app.models.etl_job import EtlJob, EtlJobKind, EtlJobStatus
+from app.models.raw_data import RawData, DataSource
 from app.models.user import User
 from app.services.disl import WildlifeProvider, NinjasProvider, OpenStreetMapsProvider
 from app.services.disl.ebird import EBirdProvider
+from app.services.disl.countries import country_boundaries
+from app.services.disl.ebird_store import EBirdCollectionRunStore, EBirdObservationStore
+from app.services.disl.geocode_cache import geocode_cache
+from app.services.disl.job_queue import EtlJobQueue
 from app.api import deps
 import logging
 
@@ -61,50 +69,105 @@ async def run_etl(
     Query a provider, save results to database, and return raw results.
     Admin only endpoint - for testing queries.
     """
-    try:
-        if provider == DataSource.EBIRD:
-            ebird_provider = EBirdProvider()
-            result = await ebird_provider.fetch(
-                region_code=request.region_code,
-                species_code=request.species if request.species else None,
-                max_results=request.max_results
-            )
-            # Save to database
-            normalized = ebird_provider.normalize(result)
-            await ebird_provider.save(result, normalized)
-            return {"provider": provider.value, "data": result, "count": len(result) if isinstance(result, list) else 1}
-        
-        elif provider == DataSource.WILDLIFE:
-            if not request.image_url:
-                raise HTTPException(status_code=400, detail="image_url is required for Wildlife queries")
-            # Wildlife needs image bytes, not URL - return info message
-            return {"provider": provider.value, "message": "Wildlife provider requires image upload, not URL. Use the image-to-animal page instead."}
-        
-        elif provider == DataSource.NINJAS:
-            if not request.animal_name:
-                raise HTTPException(status_code=400, detail="animal_name is required for Ninjas queries")
-            ninjas_provider = NinjasProvider()
-            result = await ninjas_provider.fetch(name=request.animal_name)
-            # Save to database
-            normalized = ninjas_provider.normalize(result)
-            await ninjas_provider.save(result, normalized)
-            return {"provider": provider.value, "data": result, "count": len(result) if isinstance(result, list) else 1}
-        
-        elif provider == DataSource.MAPS:
-            if not request.location:
-                raise HTTPException(status_code=400, detail="location is required for Maps queries")
-            maps_provider = OpenStreetMapsProvider()
-            result = await maps_provider.geocode_single(request.location)
-            # Save to database
-            await maps_provider.store({"location": request.location, "coordinates": result}, status=ETLStatus.SUCCESS, metadata={"query": request.location})
-            return {"provider": provider.value, "data": result}
-        
-        else:
-            raise HTTPException(status_code=400, detail="Invalid provider")
-    
-    except Exception as e:
-        logger.error(f"Error querying {provider.value}: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
+    if provider == DataSource.WILDLIFE:
+        if not request.image_url:
+            raise HTTPException(status_code=400, detail="image_url is required for Wildlife queries")
+        # Wildlife needs image bytes, not URL - return info message
+        return {"provider": provider.value, "message": "Wildlife provider requires image upload, not URL. Use the image-to-animal page instead."}
+    if provider == DataSource.NINJAS and not request.animal_name:
+        raise HTTPException(status_code=400, detail="animal_name is required for Ninjas queries")
+    if provider == DataSource.MAPS and not request.location:
+        raise HTTPException(status_code=400, detail="location is required for Maps queries")
+
+    # The query runs in the ETL worker; answer with the job id if it takes longer than the wait
+    job = await EtlJobQueue().run(EtlJobKind.PROVIDER_QUERY, {"provider": provider.value, **request.model_dump()}, user_id=current_user.id)
+    if job.status == EtlJobStatus.FAILED:
+        logger.error(f"Error querying {provider.value}: {job.error}")
+        raise HTTPException(status_code=500, detail=f"Query failed: {job.error}")
+    if job.status != EtlJobStatus.SUCCEEDED:
+        return JSONResponse(status_code=202, content={"provider": provider.value, "job_id": job.id, "status": job.status.value})
+    return job.result
+
+@router.get("/jobs", response_model=List[EtlJob])
+async def list_etl_jobs(
+    status: Optional[EtlJobStatus] = Query(None, description="Filter by job status"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(deps.get_current_active_superuser)
+):
+    """
+    Most recent ETL jobs, without their results.
+    """
+    return await EtlJobQueue().recent(status=status, limit=limit)
+
+@router.get("/scheduler")
+async def get_scheduler_status(
+    job_id: Optional[str] = Query(None, description="Only runs of this scheduled job"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(deps.get_current_active_superuser)
+):
+    """
+    Current scheduler leader and the execution history of scheduled jobs.
+    """
+    leader = await scheduler_leader.current()
+    return {
+        "leader": {k: v for k, v in leader.items() if k != "_id"} if leader else None,
+        "runs": await JobRunHistory().recent(job_id=job_id, limit=limit),
+    }
+
+@router.get("/ebird/collection-runs")
+async def get_ebird_collection_runs(
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(deps.get_current_active_superuser)
+):
+    """
+    Scheduled eBird collection runs: per-country status, counts and durations, failures and totals.
+    """
+    return await EBirdCollectionRunStore().recent(limit=limit)
+
+@router.get("/geocode-cache")
+async def get_geocode_cache_stats(
+    current_user: User = Depends(deps.get_current_active_superuser)
+):
+    """
+    Geocoding cache hit rates of this API process per lookup kind, cached entry counts, and how many
+    country lookups the bundled boundaries answered without Photon.
+    """
+    return {**await geocode_cache.stats(), "offline_countries": country_boundaries.stats()}
+
+@router.get("/jobs/{job_id}", response_model=EtlJob)
+async def get_etl_job(
+    job_id: str,
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """
+    Status (and result, once succeeded) of a job returned by an endpoint that answered 202.
+    Only the users that requested the job and superusers can read it.
+    """
+    job = await EtlJobQueue().get(job_id)
+    # Jobs of other users are reported as missing, so ids cannot be probed
+    if not job or not EtlJobQueue.readable_by(job, current_user):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/jobs/{job_id}/observations")
+async def get_etl_job_observations(
+    job_id: str,
+    limit: int = Query(5000, ge=1, le=5000),
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """
+    Observations collected by a succeeded eBird ETL job, read back from the observation store
+    (the job itself only keeps a summary).
+    """
+    job = await EtlJobQueue().get(job_id)
+    if not job or not EtlJobQueue.readable_by(job, current_user):
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.kind != EtlJobKind.EBIRD_RUN_ETL:
+        raise HTTPException(status_code=400, detail="Only eBird ETL jobs collect observations")
+    if job.status != EtlJobStatus.SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status.value}")
+    observations = await EBirdObservationStore().find_run(job.result, limit=limit)
+    return {"job_id": job.id, "observations": observations, "region_errors": job.result["region_errors"]}
 
 @router.get("/{provider}/results", response_model=List[RawData])
 async def get_etl_results(
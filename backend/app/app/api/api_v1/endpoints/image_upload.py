@@ -34,8 +34,7 @@ async def image_to_animal_info(
         return {"error": "Wildlife API key not set"}
     try:
         logger.debug(f"Using Wildlife API key: {provider.api_key}")
-        data = await provider.fetch(contents, file.filename, file.content_type)
-        normalized = provider.normalize(data)
+        normalized = await provider.identify(contents, file.filename, file.content_type)
         logger.info(f"Wildlife API normalized result: {normalized}")
         if normalized:
             # Find the annotation with the highest score
@@ -72,6 +71,9 @@ async def image_to_animal_info(
             try:
                 from app.models import Observation
                 from app.db.session import MongoDatabase
+                from app.services.disl import data_versions
+                from app.services.disl.data_versions import DataVersionStore
+                from app.services.disl.observation_store import location_fields
                 from bson import ObjectId
                 
                 db = MongoDatabase()
@@ -109,14 +111,15 @@ async def image_to_animal_info(
                     "confidence": important["score"],
                     "image": contents,  # Already resized/compressed
                     "image_mime_type": file.content_type or "image/jpeg",
-                    "latitude": lat,
-                    "longitude": lon,
+                    **location_fields(lat, lon),
                     "country_code": country_code,
                     "timestamp": datetime.utcnow()
                 }
                 result = await observations_collection.insert_one(observation_data)
                 observation_id = str(result.inserted_id)
                 logger.info(f"Saved observation for user {current_user.id} and species {important['name']}")
+                if "location" in observation_data:
+                    await DataVersionStore().safe_bump(data_versions.LOCAL)
                 
                 # Add observation ID to response
                 response_data = {
@@ -1,7 +1,16 @@
 import logging
-from typing import Any
-from fastapi import APIRouter, Depends, Query
+from datetime import datetime, timedelta
+from typing import Any, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response
+from fastapi.responses import JSONResponse
 from app.api import deps
+from app.core.config import settings
+from app.models.etl_job import EtlJobKind, EtlJobStatus
+from app.services.disl.clusters import MAX_MERCATOR_LAT, ebird_cluster_index, local_cluster_index
+from app.services.disl.ebird_store import EBirdObservationStore
+from app.services.disl.job_queue import EtlJobQueue
+from app.services.disl.mvt import MEDIA_TYPE
+from app.services.disl.vector_tiles import TILE_LAYERS, VectorTileCache, current_versions, vector_tiles
 import app.models as models
 
 logger = logging.getLogger(__name__)
@@ -24,9 +33,9 @@ async def geocode_location(
             return {"error": "Location not found"}
             
         return {
-            "latitude": result["lat"],
-            "longitude": result["lon"],
-            "display_name": result.get("display_name", address)
+            "latitude": result[0],
+            "longitude": result[1],
+            "display_name": address
         }
     except Exception as e:
         logger.error(f"Geocode error: {str(e)}")
@@ -39,28 +48,18 @@ async def animal_to_map(
     current_user: models.User = Depends(deps.get_current_active_user)
 ) -> Any:
     """
-    Get a map of the animal's location using Ninjas and ETL maps.
+    Get a map of the animal's location using Ninjas and ETL maps. The lookup runs in the ETL
+    worker; if it takes longer than the wait, answers 202 with the job id to poll instead.
     """
-    from app.services.disl.ninjas import NinjasProvider
-    from app.services.disl.maps import OpenStreetMapsProvider
     import traceback
     try:
-        ninjas_provider = NinjasProvider()
         animal_name = name or "zebra"
-        
-        # Use provider method
-        locations = await ninjas_provider.get_locations(animal_name)
-        
-        if not locations:
-            return {"error": "No location found for this animal."}
-            
-        maps_provider = OpenStreetMapsProvider()
-        map_data = await maps_provider.get_map_for_locations(locations)
-        
-        if not map_data:
-            return {"error": "Could not generate map for the given locations."}
-            
-        return {"map_data": map_data, "animal_name": animal_name, "locations": locations}
+        job = await EtlJobQueue().run(EtlJobKind.ANIMAL_MAP, {"name": animal_name}, user_id=current_user.id)
+        if job.status == EtlJobStatus.FAILED:
+            return {"error": job.error}
+        if job.status != EtlJobStatus.SUCCEEDED:
+            return JSONResponse(status_code=202, content={"animal_name": animal_name, "job_id": job.id, "status": job.status.value})
+        return job.result
     except Exception as e:
         logger.error(f"Map endpoint error: {str(e)}")
         return {"error": str(e), "trace": traceback.format_exc()}
@@ -72,14 +71,28 @@ async def ebird_observations_map(
     current_user: models.User = Depends(deps.get_current_active_user)
 ) -> Any:
     """
-    Get eBird observations for a species to display on a map.
+    Get eBird observations for a species to display on a map. Species without recently collected
+    observations are collected by the ETL worker; if that takes longer than the wait, answers
+    202 with the job id to poll before asking again.
     """
-    from app.services.disl.ebird import EBirdProvider
-    
     try:
-        provider = EBirdProvider()
-        observations = await provider.get_observations(species)
-        
+        store = EBirdObservationStore()
+        now = datetime.utcnow()
+        # Collected within the hour, so a species is refreshed from eBird at most hourly
+        filters = {"species": species, "obs_since": now - timedelta(days=30), "seen_since": now - timedelta(hours=1)}
+        observations = await store.find(**filters)
+
+        if not observations:
+            logger.info(f"No recent eBird observations stored for {species}, queueing a collection")
+            job = await EtlJobQueue().run(
+                EtlJobKind.EBIRD_RUN_ETL, {"region_code": "world", "species": species, "max_results": 100}, user_id=current_user.id,
+            )
+            if job.status == EtlJobStatus.FAILED:
+                return {"error": job.error, "observations": []}
+            if job.status != EtlJobStatus.SUCCEEDED:
+                return JSONResponse(status_code=202, content={"species": species, "observations": [], "job_id": job.id, "status": job.status.value})
+            observations = await store.find(**filters)
+
         if not observations:
              return {"error": "No eBird observations found for this species.", "observations": []}
              
@@ -88,3 +101,90 @@ async def ebird_observations_map(
         logger.error(f"eBird observations map error: {str(e)}")
         import traceback
         return {"error": str(e), "trace": traceback.format_exc()}
+
+
+@router.get("/clusters")
+async def map_clusters(
+    species: Optional[str] = Query(None, description="Species name (common or scientific); required for eBird"),
+    zoom: float = Query(..., ge=0, le=24, description="Map zoom level"),
+    min_lat: float = Query(-MAX_MERCATOR_LAT, ge=-90, le=90, description="Viewport south edge"),
+    min_lon: float = Query(-180, ge=-180, le=180, description="Viewport west edge (greater than max_lon across the antimeridian)"),
+    max_lat: float = Query(MAX_MERCATOR_LAT, ge=-90, le=90, description="Viewport north edge"),
+    max_lon: float = Query(180, ge=-180, le=180, description="Viewport east edge"),
+    source: Literal["ebird", "local"] = Query("ebird", description="eBird observations or user observations"),
+    days_back: int = Query(30, ge=1, le=30, description="eBird observations of the last days"),
+    limit: int = Query(settings.MAP_CLUSTER_MAX_RESULTS, ge=1, le=settings.MAP_CLUSTER_MAX_RESULTS),
+    current_user: models.User = Depends(deps.get_current_active_user)
+) -> Any:
+    """
+    Marker clusters of a species' observations inside the viewport at a zoom level. Single
+    observations come back as points with their details; clusters with their size and the zoom
+    at which they split, so the response stays small whatever the number of observations.
+    eBird species without stored observations are collected by the ETL worker: the response then
+    carries the collection job (`ebird_job`) to poll before asking again.
+    """
+    if min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="min_lat must not be greater than max_lat")
+    if source == "ebird":
+        if not species:
+            raise HTTPException(status_code=400, detail="species is required for eBird clusters")
+        index = await ebird_cluster_index(species, days_back)
+    else:
+        index = await local_cluster_index(species)
+
+    clusters = index.clusters(min_lat, min_lon, max_lat, max_lon, zoom, limit=limit)
+    response = {
+        "species": species,
+        "source": source,
+        "zoom": zoom,
+        "total": index.size,
+        "clusters": clusters,
+        "truncated": len(clusters) == limit,
+    }
+    if source == "ebird" and not index.size:
+        # A species eBird has no sightings of is collected again once per collection interval at most
+        job = await EtlJobQueue().enqueue_unless_recent(
+            EtlJobKind.EBIRD_RUN_ETL, {"region_code": "world", "species": species, "max_results": 100},
+            within=timedelta(minutes=settings.EBIRD_COLLECTION_INTERVAL_MINUTES), user_id=current_user.id,
+        )
+        response["ebird_job"] = {"job_id": job.id, "status": job.status.value}
+    return response
+
+
+@router.get("/tiles/{z}/{x}/{y}.mvt", response_class=Response, responses={200: {"content": {MEDIA_TYPE: {}}}})
+async def observation_tile(
+    request: Request,
+    z: int = Path(..., ge=0, le=settings.MAP_TILE_MAX_ZOOM, description="Tile zoom"),
+    x: int = Path(..., ge=0, description="Tile column"),
+    y: int = Path(..., ge=0, description="Tile row (XYZ, north at 0)"),
+    layers: str = Query(",".join(TILE_LAYERS), description="Comma separated layers: ebird, local"),
+    species: Optional[str] = Query(None, description="Species name (common or scientific), substring match"),
+    since: Optional[datetime] = Query(None, description="Observations taken at or after"),
+    until: Optional[datetime] = Query(None, description="Observations taken at or before"),
+    current_user: models.User = Depends(deps.get_current_active_user)
+) -> Response:
+    """
+    Mapbox Vector Tile of stored observations, with an "ebird" and a "local" point layer for
+    map libraries to style and query client-side. Observations sharing a pixel are one feature
+    with the details of the newest and their `count`. Tiles are cached on disk until new
+    observations are ingested; an unchanged tile answers If-None-Match with 304.
+    """
+    if x >= 1 << z or y >= 1 << z:
+        raise HTTPException(status_code=404, detail="Tile outside the zoom level")
+    selected = [layer for layer in TILE_LAYERS if layer in {name.strip() for name in layers.split(",")}]
+    if not selected:
+        raise HTTPException(status_code=400, detail=f"layers must name at least one of {', '.join(TILE_LAYERS)}")
+    if since and until and since > until:
+        raise HTTPException(status_code=400, detail="since must not be after until")
+
+    generation = VectorTileCache.generation(selected, await current_versions())
+    filters = VectorTileCache.filters_key(species, since, until)
+    headers = {
+        "ETag": f'"{generation}.{filters}"',
+        "Cache-Control": f"private, max-age={settings.MAP_TILE_MAX_AGE_SECONDS}",
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+
+    data = await vector_tiles.get(generation, filters, z, x, y, selected, species, since, until)
+    return Response(content=data, media_type=MEDIA_TYPE, headers=headers)
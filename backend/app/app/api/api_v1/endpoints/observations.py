@@ -1,11 +1,18 @@
+from datetime import datetime
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pymongo.errors import OperationFailure
 from app.api import deps
+from app.core.config import settings
 from app.models.user import User
 from app.models.observation import Observation
-from app.services.disl.ebird import EBirdProvider
+from app.models.etl_job import EtlJobKind, EtlJobStatus
+from app.services.disl.ebird import EBIRD_MAX_GEO_DIST_KM, GEO_REGION
+from app.services.disl.ebird_store import EBirdObservationStore
+from app.services.disl.geo import bbox_geometry, haversine_km, polygon_geometry
+from app.services.disl.job_queue import EtlJobQueue
+from app.services.disl.observation_store import ObservationStore
 import logging
-import base64
 
 logger = logging.getLogger(__name__)
 
@@ -39,8 +46,21 @@ async def search_observations(
     country: Optional[str] = Query("world", description="Country name or code"),
     species: Optional[str] = Query(None, description="Species name"),
     max_results: int = 100,
+    lat: Optional[float] = Query(None, ge=-90, le=90, description="Search around this latitude instead of a country"),
+    lon: Optional[float] = Query(None, ge=-180, le=180, description="Search around this longitude instead of a country"),
+    near_me: bool = Query(False, description="Search around the location stored in your profile"),
+    dist_km: Optional[float] = Query(None, gt=0, le=EBIRD_MAX_GEO_DIST_KM, description="Search radius in km for lat/lon and near_me searches"),
     current_user: User = Depends(deps.get_current_active_user)
 ) -> Any:
+    if near_me:
+        if current_user.latitude is None or current_user.longitude is None:
+            raise HTTPException(status_code=400, detail="Your profile has no location; set one or pass lat and lon")
+        lat, lon = current_user.latitude, current_user.longitude
+    if (lat is None) != (lon is None):
+        raise HTTPException(status_code=400, detail="lat and lon must be given together")
+    if lat is not None:
+        return await search_observations_near(lat, lon, dist_km or settings.EBIRD_GEO_DEFAULT_DIST_KM, species, max_results, current_user)
+
     country_lower = country.lower()
     region_code = COUNTRY_CODES.get(country_lower, country.upper())
     
@@ -71,50 +91,141 @@ async def search_observations(
         "region_code": region_code
     }
 
-    try:
-        provider = EBirdProvider()
-        ebird_data = await provider.run_etl(
-            region_code=region_code, 
-            species=species if species else "", 
-            max_results=max_results
-        )
-        results["ebird"] = ebird_data
-    except Exception as e:
-        logger.error(f"Error fetching from eBird: {str(e)}")
-        results["ebird_error"] = str(e)
+    await add_ebird_results(results, {
+        "region_code": region_code,
+        "species": species if species else "",
+        "max_results": max_results
+    }, current_user)
 
     try:
-        from app.db.session import MongoDatabase
-        db = MongoDatabase()
-        observations_collection = db["observations"]
-        
         # Build query
-        query = {"latitude": {"$ne": None}}
+        query = ObservationStore.build_query(species=species, latitude={"$ne": None})
         
         # Filter by country if not "world"
         if region_code != "world":
             query["country_code"] = region_code
         
-        formatted_local = []
-        async for obs_doc in observations_collection.find(query):
-            if species and species.lower() not in obs_doc.get("species", "").lower():
-                continue
-
-            image_b64 = base64.b64encode(obs_doc["image"]).decode('utf-8')
-            formatted_local.append({
-                "id": str(obs_doc["_id"]),
-                "species": obs_doc["species"],
-                "confidence": obs_doc["confidence"],
-                "user_name": obs_doc["user_name"],
-                "timestamp": obs_doc["timestamp"],
-                "lat": obs_doc["latitude"],
-                "lon": obs_doc["longitude"],
-                "image": f"data:{obs_doc['image_mime_type']};base64,{image_b64}"
-            })
-        results["local"] = formatted_local
+        results["local"] = await ObservationStore().find(query)
         
     except Exception as e:
         logger.error(f"Error fetching local observations: {str(e)}")
         results["local_error"] = str(e)
 
     return results
+
+
+async def search_observations_near(lat: float, lon: float, dist_km: float, species: Optional[str], max_results: int, user: User) -> dict:
+    """Radius search: one eBird geo request per species code, and local observations within `dist_km`."""
+    logger.info(f"Searching observations within {dist_km}km of {lat},{lon}, species: {species}")
+    results = {
+        "ebird": [],
+        "local": [],
+        "region_code": GEO_REGION,
+        "center": {"lat": lat, "lon": lon},
+        "dist_km": dist_km,
+    }
+
+    await add_ebird_results(results, {
+        "species": species if species else "",
+        "max_results": max_results,
+        "lat": lat,
+        "lng": lon,
+        "dist_km": dist_km,
+    }, user)
+
+    try:
+        results["local"] = await ObservationStore().find(ObservationStore.build_query(near=(lat, lon, dist_km), species=species))
+    except Exception as e:
+        logger.error(f"Error fetching local observations: {str(e)}")
+        results["local_error"] = str(e)
+
+    return results
+
+
+async def add_ebird_results(results: dict, params: dict, user: User):
+    """Run the eBird ETL job for `user` and put its observations, errors or pending job into `results`."""
+    try:
+        # eBird ETL runs in the worker; the request only waits for the job
+        job = await EtlJobQueue().run(EtlJobKind.EBIRD_RUN_ETL, params, user_id=user.id)
+        if job.status == EtlJobStatus.SUCCEEDED:
+            results["ebird"] = await EBirdObservationStore().find_run(job.result)
+            if job.result["region_errors"]:
+                # Partial results: report the regions that could not be fetched
+                results["ebird_region_errors"] = job.result["region_errors"]
+        elif job.status == EtlJobStatus.FAILED:
+            results["ebird_error"] = job.error
+        else:
+            # Still running: the client can poll /etl/jobs/{job_id}
+            results["ebird_job"] = {"job_id": job.id, "status": job.status.value}
+    except Exception as e:
+        logger.error(f"Error fetching from eBird: {str(e)}")
+        results["ebird_error"] = str(e)
+
+
+def parse_polygon(polygon: str) -> List[tuple[float, float]]:
+    """(lat, lon) vertices of a "lat,lon;lat,lon;..." query parameter."""
+    try:
+        points = [tuple(float(value) for value in vertex.split(",")) for vertex in polygon.strip().strip(";").split(";")]
+    except ValueError:
+        raise HTTPException(status_code=400, detail='polygon must look like "lat,lon;lat,lon;lat,lon"')
+    if any(len(point) != 2 or not (-90 <= point[0] <= 90 and -180 <= point[1] <= 180) for point in points):
+        raise HTTPException(status_code=400, detail="polygon vertices must be lat,lon pairs within range")
+    if len(set(points)) < 3:
+        raise HTTPException(status_code=400, detail="polygon needs at least 3 distinct vertices")
+    return points
+
+
+@router.get("/within")
+async def observations_within(
+    min_lat: Optional[float] = Query(None, ge=-90, le=90, description="Bounding box south edge"),
+    min_lon: Optional[float] = Query(None, ge=-180, le=180, description="Bounding box west edge (greater than max_lon across the antimeridian)"),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90, description="Bounding box north edge"),
+    max_lon: Optional[float] = Query(None, ge=-180, le=180, description="Bounding box east edge"),
+    lat: Optional[float] = Query(None, ge=-90, le=90, description="Radius search center latitude"),
+    lon: Optional[float] = Query(None, ge=-180, le=180, description="Radius search center longitude"),
+    dist_km: Optional[float] = Query(None, gt=0, le=20000, description="Radius search distance in km"),
+    polygon: Optional[str] = Query(None, description='Polygon vertices as "lat,lon;lat,lon;..."'),
+    species: Optional[str] = Query(None, description="Species name (substring, case-insensitive)"),
+    since: Optional[datetime] = Query(None, description="Only observations taken at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only observations taken at or before this time"),
+    limit: int = Query(500, ge=1, le=5000),
+    include_images: bool = Query(False, description="Inline the images (large); off for map markers"),
+    current_user: User = Depends(deps.get_current_active_user)
+) -> Any:
+    """
+    Local observations inside a bounding box (e.g. the map viewport), a radius around a point or
+    a polygon, newest first. Give exactly one of: min_lat/min_lon/max_lat/max_lon, lat/lon/dist_km, polygon.
+    """
+    box = (min_lat, min_lon, max_lat, max_lon)
+    radius = (lat, lon, dist_km)
+    modes = {
+        "bbox": any(v is not None for v in box),
+        "radius": any(v is not None for v in radius),
+        "polygon": polygon is not None,
+    }
+    selected = [mode for mode, given in modes.items() if given]
+    if len(selected) != 1:
+        raise HTTPException(status_code=400, detail="Give exactly one of a bounding box, a radius (lat, lon, dist_km) or a polygon")
+    mode = selected[0]
+    if mode == "bbox":
+        if any(v is None for v in box):
+            raise HTTPException(status_code=400, detail="min_lat, min_lon, max_lat and max_lon must be given together")
+        if min_lat > max_lat:
+            raise HTTPException(status_code=400, detail="min_lat must not be greater than max_lat")
+        query = ObservationStore.build_query(geometry=bbox_geometry(*box), species=species, since=since, until=until)
+    elif mode == "radius":
+        if any(v is None for v in radius):
+            raise HTTPException(status_code=400, detail="lat, lon and dist_km must be given together")
+        query = ObservationStore.build_query(near=radius, species=species, since=since, until=until)
+    else:
+        query = ObservationStore.build_query(geometry=polygon_geometry(parse_polygon(polygon)), species=species, since=since, until=until)
+
+    try:
+        observations = await ObservationStore().find(query, limit=limit, include_image=include_images)
+    except OperationFailure as e:
+        # e.g. a self-intersecting polygon
+        raise HTTPException(status_code=400, detail=f"Invalid geometry: {e.details.get('errmsg') if e.details else e}")
+    if mode == "radius":
+        for obs in observations:
+            obs["distance_km"] = round(haversine_km(lat, lon, obs["lat"], obs["lon"]), 3)
+    return {"mode": mode, "count": len(observations), "truncated": len(observations) == limit, "observations": observations}
@@ -47,6 +47,41 @@ class Settings(BaseSettings):
     MONGO_DATABASE: str
     MONGO_DATABASE_URI: str
 
+    # Shared HTTP client pools (per upstream, see services/disl/http_clients.py)
+    HTTP_MAX_CONNECTIONS: int = 10
+    HTTP_UPSTREAM_MAX_CONNECTIONS: Dict[str, int] = {"ebird": 8, "ninjas": 4, "photon": 4, "wildlife": 4}
+    HTTP_KEEPALIVE_EXPIRY: float = 60.0
+
+    # Token-bucket rate limits per upstream (requests/second, 0 disables) and burst size
+    UPSTREAM_RATE_LIMITS: Dict[str, float] = {"photon": 2.0, "ebird": 10.0, "ninjas": 5.0, "wildlife": 2.0}
+    UPSTREAM_RATE_BURST: Dict[str, int] = {"photon": 2, "ebird": 10, "ninjas": 5, "wildlife": 2}
+
+    # Batched ETL writes: flush after this many documents or seconds, whichever comes first
+    ETL_WRITE_BATCH_SIZE: int = 200
+    ETL_WRITE_FLUSH_SECONDS: float = 2.0
+    # Times a failed batched write is retried (every ETL_WRITE_FLUSH_SECONDS) before it is dropped
+    ETL_WRITE_MAX_RETRIES: int = 5
+    # Bound of the queues between ETL pipeline stages
+    ETL_PIPELINE_QUEUE_SIZE: int = 100
+
+    # ETL job queue (etl_jobs) consumed by the worker process, see app/worker.py
+    ETL_WORKER_CONCURRENCY: int = 4
+    ETL_JOB_VISIBILITY_SECONDS: int = 300
+    ETL_JOB_MAX_ATTEMPTS: int = 3
+    ETL_JOB_RETRY_BACKOFF_SECONDS: int = 5
+    ETL_JOB_POLL_SECONDS: float = 0.5
+    # How long API requests wait for their job before answering with its id instead
+    ETL_JOB_WAIT_SECONDS: float = 20.0
+    ETL_JOB_RETENTION_HOURS: int = 24
+
+    # Scheduler leader election: a leader that stops renewing for this long is replaced
+    SCHEDULER_LEASE_SECONDS: int = 30
+    SCHEDULER_HISTORY_DAYS: int = 30
+
+    # Raw upstream payloads: compressed cold tier with per-source retention (days)
+    RAW_COMPRESSION_LEVEL: int = 10
+    RAW_RETENTION_DAYS: Dict[str, int] = {"ebird": 30, "ninjas": 90, "maps": 30, "wildlife": 30}
+
     # External APIs
     WILDLIFE_API_KEY: str | None = os.getenv("WILDLIFE_API_KEY")
     WILDLIFE_API_URL: str = "https://www.animaldetect.com/api"
@@ -57,9 +92,48 @@ class Settings(BaseSettings):
     OPEN_STREET_MAPS_API_URL: str = "https://nominatim.openstreetmap.org"
     PHOTON_API_URL: str = "https://photon.komoot.io/api"
     PHOTON_REVERSE_API_URL: str = "https://photon.komoot.io/reverse"
+    # Geocoding cache (see services/disl/geocode_cache.py): in-process entries, lifetime of found
+    # and "not found" results, and decimals reverse lookups are rounded to (2 ~ 1km)
+    GEOCODE_CACHE_SIZE: int = 10000
+    GEOCODE_CACHE_TTL_DAYS: int = 30
+    GEOCODE_NEGATIVE_TTL_HOURS: int = 6
+    GEOCODE_REVERSE_PRECISION: int = 2
+    # Offline country lookups (see services/disl/countries.py) defer to Photon this close to a
+    # border or coast, where the bundled simplified boundaries cannot be trusted
+    COUNTRY_BORDER_MARGIN_KM: float = 15.0
+    # Map marker clustering (see services/disl/clusters.py): deepest clustered zoom, points loaded
+    # per index, clusters returned per request, and how many indexes are kept and for how long
+    MAP_CLUSTER_MAX_ZOOM: int = 16
+    MAP_CLUSTER_MAX_POINTS: int = 200000
+    MAP_CLUSTER_MAX_RESULTS: int = 1000
+    MAP_CLUSTER_CACHE_SIZE: int = 32
+    MAP_CLUSTER_TTL_MINUTES: int = 10
+    # Observation vector tiles (see services/disl/vector_tiles.py): on-disk cache, deepest zoom,
+    # observations read per layer and tile, and how long clients may reuse a tile
+    MAP_TILE_CACHE_DIR: str = "/tmp/animal-to-map/tiles"
+    MAP_TILE_MAX_ZOOM: int = 20
+    MAP_TILE_MAX_POINTS: int = 20000
+    MAP_TILE_MAX_AGE_SECONDS: int = 300
 
     EBIRD_API_KEY: str | None = os.getenv("EBIRD_API_KEY")
     EBIRD_API_URL: str = "https://api.ebird.org/v2/data/obs/"
+    # Max concurrent eBird requests per fan-out (e.g. "world" queries)
+    EBIRD_FETCH_CONCURRENCY: int = 8
+    EBIRD_FETCH_RETRIES: int = 3
+    # Streaming fetch -> store: parsed items waiting to be stored, and upsert batch size
+    EBIRD_STREAM_QUEUE_SIZE: int = 1000
+    EBIRD_STREAM_BATCH_SIZE: int = 500
+    # Scheduled incremental collection (see core/scheduler.py)
+    EBIRD_COLLECTION_INTERVAL_MINUTES: int = 60
+    EBIRD_INCREMENTAL_MAX_RESULTS: int = 2000
+    # Countries collected at once, and how old an interrupted run may be to still be resumed
+    EBIRD_COLLECTION_CONCURRENCY: int = 4
+    EBIRD_COLLECTION_RESUME_HOURS: int = 12
+    # Radius of geo (lat/lng) searches when none is given; eBird accepts at most 50km
+    EBIRD_GEO_DEFAULT_DIST_KM: int = 25
+    EBIRD_TAXONOMY_URL: str = "https://api.ebird.org/v2/ref/taxonomy/ebird"
+    # How often processes check whether the stored taxonomy was refreshed by the scheduler leader
+    EBIRD_TAXONOMY_RELOAD_MINUTES: int = 60
 
     SMTP_TLS: bool = True
     SMTP_PORT: int = 587
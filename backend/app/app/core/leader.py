@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.db.session import MongoDatabase
+
+logger = logging.getLogger(__name__)
+
+LEADER_LEASES_COLLECTION = "leader_leases"
+SCHEDULER_RUNS_COLLECTION = "scheduler_runs"
+
+
+class LeadershipLost(Exception):
+    """Work run through `LeaderElection.run` was cancelled because this process stopped being leader."""
+
+
+class LeaderElection:
+    """
+    Lease-based leader election over one document in `leader_leases`.
+
+    Every candidate tries to take or renew the lease every `lease_seconds / 3`; the document only
+    changes hands once the holder has failed to renew it for `lease_seconds`, e.g. because its
+    process died. A holder stops considering itself leader a safety margin before its lease
+    runs out, so two processes never both act as leader because of a slow renewal.
+    """
+
+    def __init__(self, name: str, lease_seconds: Optional[int] = None):
+        self.name = name
+        self.lease_seconds = lease_seconds or settings.SCHEDULER_LEASE_SECONDS
+        self.holder_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._valid_until = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._on_elected: List[Callable[[], Awaitable[Any]]] = []
+
+    @property
+    def collection(self):
+        return MongoDatabase()[LEADER_LEASES_COLLECTION]
+
+    @property
+    def is_leader(self) -> bool:
+        return time.monotonic() < self._valid_until
+
+    def on_elected(self, callback: Callable[[], Awaitable[Any]]):
+        """Register a coroutine function to run each time this process becomes leader."""
+        self._on_elected.append(callback)
+
+    async def try_acquire(self) -> bool:
+        """Take the lease if it is free or expired, or renew it if already held."""
+        was_leader = self.is_leader
+        started = time.monotonic()
+        now = datetime.utcnow()
+        update = {"holder": self.holder_id, "expires_at": now + timedelta(seconds=self.lease_seconds), "renewed_at": now}
+        if not was_leader:
+            update["acquired_at"] = now
+        try:
+            await self.collection.update_one(
+                {"_id": self.name, "$or": [{"holder": self.holder_id}, {"expires_at": {"$lt": now}}]},
+                {"$set": update},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # Held by another live process: the filter did not match and the upsert collided on _id
+            self._valid_until = 0.0
+            if was_leader:
+                logger.warning(f"[LEADER] {self.holder_id} lost the {self.name} lease")
+            return False
+        # Keep a margin of one renewal interval against clock skew and slow renewals
+        self._valid_until = started + self.lease_seconds * 2 / 3
+        if not was_leader:
+            logger.info(f"[LEADER] {self.holder_id} is now the {self.name} leader")
+            for callback in self._on_elected:
+                try:
+                    await callback()
+                except Exception as e:
+                    logger.error(f"[LEADER] On-elected callback failed: {e}")
+        return True
+
+    async def wait_lost(self):
+        """Return once this process is not the leader, rechecking whenever its lease validity runs out."""
+        while self.is_leader:
+            await asyncio.sleep(max(self._valid_until - time.monotonic(), 0.01))
+
+    async def run(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await `fn()` for as long as this process stays leader. Losing the lease cancels it and raises
+        LeadershipLost; since a holder stops being leader a margin before its lease expires, the work
+        is cancelled before another process can take over and start it again.
+        """
+        work = asyncio.ensure_future(fn())
+        lost = asyncio.ensure_future(self.wait_lost())
+        try:
+            await asyncio.wait({work, lost}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            lost.cancel()
+        if not work.done():
+            work.cancel()
+            await asyncio.gather(work, return_exceptions=True)
+            raise LeadershipLost(f"{self.holder_id} lost the {self.name} lease")
+        return work.result()
+
+    async def _campaign(self):
+        while True:
+            try:
+                await self.try_acquire()
+            except Exception as e:
+                self._valid_until = 0.0
+                logger.error(f"[LEADER] Lease renewal for {self.name} failed: {e}")
+            await asyncio.sleep(self.lease_seconds / 3)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._campaign())
+
+    async def stop(self):
+        """Stop campaigning and release the lease right away so another process takes over without waiting."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.is_leader:
+            self._valid_until = 0.0
+            await self.collection.delete_one({"_id": self.name, "holder": self.holder_id})
+            logger.info(f"[LEADER] {self.holder_id} resigned the {self.name} lease")
+
+    async def current(self) -> Optional[dict]:
+        return await self.collection.find_one({"_id": self.name})
+
+
+class JobRunHistory:
+    """Execution history of scheduled jobs in `scheduler_runs`, kept for `settings.SCHEDULER_HISTORY_DAYS`."""
+
+    def __init__(self):
+        self.collection = MongoDatabase()[SCHEDULER_RUNS_COLLECTION]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("job_id", ASCENDING), ("started_at", DESCENDING)])
+        await self.collection.create_index([("status", ASCENDING), ("heartbeat_at", ASCENDING)])
+        await self.collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+
+    async def record(self, job_id: str, holder_id: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn` as one execution of `job_id`, heartbeating the run so a failover can detect it was abandoned."""
+        now = datetime.utcnow()
+        run_id = ObjectId()
+        await self.collection.insert_one({
+            "_id": run_id,
+            "job_id": job_id,
+            "holder": holder_id,
+            "status": "running",
+            "started_at": now,
+            "heartbeat_at": now,
+            "expires_at": now + timedelta(days=settings.SCHEDULER_HISTORY_DAYS),
+        })
+        heartbeat = asyncio.create_task(self._heartbeat(run_id))
+        try:
+            result = await fn()
+        except LeadershipLost as e:
+            # Left for the next leader to rerun, see `abandon_stale`
+            await self._finish(run_id, "interrupted", error=str(e))
+            raise
+        except Exception as e:
+            await self._finish(run_id, "failed", error=str(e))
+            raise
+        finally:
+            heartbeat.cancel()
+        await self._finish(run_id, "succeeded", result=result)
+        return result
+
+    async def _heartbeat(self, run_id: ObjectId):
+        while True:
+            await asyncio.sleep(settings.SCHEDULER_LEASE_SECONDS / 3)
+            try:
+                await self.collection.update_one({"_id": run_id}, {"$set": {"heartbeat_at": datetime.utcnow()}})
+            except Exception as e:
+                logger.error(f"[SCHEDULER] Run heartbeat failed for {run_id}: {e}")
+
+    async def _finish(self, run_id: ObjectId, status: str, result: Any = None, error: Optional[str] = None):
+        await self.collection.update_one(
+            {"_id": run_id},
+            {"$set": {"status": status, "finished_at": datetime.utcnow(), "result": result, "error": error}},
+        )
+
+    async def abandon_stale(self) -> List[str]:
+        """
+        Mark runs whose process stopped heartbeating, or that were interrupted by a lost lease,
+        as abandoned; returns their job ids.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.SCHEDULER_LEASE_SECONDS)
+        stale = {"$or": [{"status": "running", "heartbeat_at": {"$lt": cutoff}}, {"status": "interrupted"}]}
+        job_ids = [doc["job_id"] async for doc in self.collection.find(stale, {"job_id": 1})]
+        if job_ids:
+            await self.collection.update_many(
+                stale, {"$set": {"status": "abandoned", "finished_at": datetime.utcnow(), "error": "Abandoned by a previous scheduler leader"}}
+            )
+        return sorted(set(job_ids))
+
+    async def recent(self, job_id: Optional[str] = None, limit: int = 50) -> List[dict]:
+        query = {"job_id": job_id} if job_id else {}
+        cursor = self.collection.find(query).sort("started_at", -1).limit(limit)
+        runs = []
+        async for doc in cursor:
+            doc["id"] = str(doc.pop("_id"))
+            runs.append(doc)
+        return runs
@@ -1,14 +1,28 @@
 
+import asyncio
 import logging
+import time
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from app.core.config import settings
+from app.core.leader import JobRunHistory, LeaderElection, LeadershipLost
+from app.services.disl import data_versions
+from app.services.disl.data_versions import DataVersionStore
 from app.services.disl.ebird import EBirdProvider
+from app.services.disl.ebird_store import EBirdCollectionRunStore
+from app.services.disl.rate_limit import background_priority
+from app.services.disl.raw_store import RawPayloadStore
+from app.services.disl.taxonomy import taxonomy_index
 from app.db.session import MongoDatabase
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
-# Important countries for daily eBird data collection
+# Every worker runs the scheduler, only the current leader executes its jobs
+scheduler_leader = LeaderElection("scheduler")
+
+# Important countries for scheduled eBird data collection
 IMPORTANT_COUNTRIES = [
     "US",  # United States
     "ES",  # Spain
@@ -23,54 +37,146 @@ IMPORTANT_COUNTRIES = [
 ]
 
 async def run_daily_ebird_collection():
-    logger.info("Starting daily eBird data collection cronjob")
-    provider = EBirdProvider()
+    """
+    Incremental collection: each country only requests what is newer than its watermark.
+    Countries run concurrently (EBIRD_COLLECTION_CONCURRENCY) and are checkpointed in
+    `ebird_collection_runs`, so a run interrupted by a restart or a lost scheduler lease resumes
+    with the unfinished ones.
+    """
+    logger.info("Starting eBird data collection cronjob")
+    runs = EBirdCollectionRunStore()
+    run = await runs.start_or_resume(IMPORTANT_COUNTRIES)
+    pending = [code for code, state in run["countries"].items() if state["status"] != "done"]
+    semaphore = asyncio.Semaphore(settings.EBIRD_COLLECTION_CONCURRENCY)
     
-    for country in IMPORTANT_COUNTRIES:
-        try:
-            logger.info(f"Fetching eBird data for {country}")
-            await provider.run_etl(region_code=country, species="", max_results=100)
-            logger.info(f"Successfully collected data for {country}")
-        except Exception as e:
-            logger.error(f"Failed to collect data for {country}: {str(e)}")
+    async def collect(country: str):
+        async with semaphore:
+            logger.info(f"Fetching new eBird data for {country}")
+            await runs.mark_country(run["_id"], country, "running", started_at=datetime.utcnow())
+            started = time.perf_counter()
+            try:
+                # One provider per country: providers keep per-call state (last_errors)
+                new_count = await EBirdProvider().run_incremental(region_code=country, bump_version=False)
+            except Exception as e:
+                logger.error(f"Failed to collect data for {country}: {str(e)}")
+                await runs.mark_country(
+                    run["_id"], country, "failed", error=str(e), duration_seconds=round(time.perf_counter() - started, 2)
+                )
+                return
+            await runs.mark_country(
+                run["_id"], country, "done", new_count=new_count, duration_seconds=round(time.perf_counter() - started, 2)
+            )
+            logger.info(f"Successfully collected {new_count} new observations for {country}")
     
-    logger.info("Daily eBird data collection completed")
+    # Background lane: user-facing eBird calls are served first
+    with background_priority():
+        await asyncio.gather(*(collect(country) for country in pending))
+    
+    summary = await runs.finish(run["_id"])
+    # Once per run rather than per country: every bump invalidates all cached map tiles
+    if summary["new_observations"]:
+        await DataVersionStore().safe_bump(data_versions.EBIRD)
+    logger.info(
+        f"eBird data collection completed with {summary['new_observations']} new observations in "
+        f"{summary['duration_seconds']}s ({summary['country_seconds']}s of country time), "
+        f"failed: {summary['failed_countries'] or 'none'}"
+    )
+    return {"run_id": str(run["_id"]), **summary}
+
+async def refresh_ebird_taxonomy():
+    logger.info("Starting weekly eBird taxonomy refresh")
+    with background_priority():
+        count = await taxonomy_index.refresh()
+    logger.info(f"eBird taxonomy refreshed with {count} species")
+    return {"species": count}
+
+async def compact_raw_payloads():
+    """Move raw payloads out of raw_data into the compressed tier and purge expired large files"""
+    logger.info("Starting daily raw payload compaction")
+    store = RawPayloadStore()
+    migrated = await store.compact()
+    purged = await store.purge_expired_files()
+    logger.info(f"Raw payload compaction migrated {migrated} documents, purged {purged} expired files")
+    return {"migrated": migrated, "purged": purged}
 
 async def cleanup_old_login_logs():
     """Delete login logs older than 1 month"""
     logger.info("Starting monthly login logs cleanup")
-    try:
-        db = MongoDatabase()
-        one_month_ago = datetime.utcnow() - timedelta(days=30)
-        
-        result = await db["login_logs"].delete_many({
-            "timestamp": {"$lt": one_month_ago}
-        })
-        
-        logger.info(f"Deleted {result.deleted_count} login logs older than 30 days")
-    except Exception as e:
-        logger.error(f"Failed to cleanup login logs: {str(e)}")
+    db = MongoDatabase()
+    one_month_ago = datetime.utcnow() - timedelta(days=30)
+    
+    result = await db["login_logs"].delete_many({
+        "timestamp": {"$lt": one_month_ago}
+    })
+    
+    logger.info(f"Deleted {result.deleted_count} login logs older than 30 days")
+    return {"deleted": result.deleted_count}
+
+def cluster_job(job_id: str, fn):
+    """
+    Wrap a job so it only runs on the scheduler leader and every run is recorded in `scheduler_runs`.
+    A run outliving the leader's lease is cancelled, so it never overlaps the next leader's run.
+    """
+    async def run():
+        if not scheduler_leader.is_leader:
+            logger.debug(f"Skipping {job_id}: not the scheduler leader")
+            return
+        try:
+            await JobRunHistory().record(job_id, scheduler_leader.holder_id, lambda: scheduler_leader.run(fn))
+        except LeadershipLost as e:
+            logger.warning(f"Scheduled job {job_id} interrupted: {str(e)}")
+        except Exception as e:
+            logger.error(f"Scheduled job {job_id} failed: {str(e)}")
+    return run
 
 def setup_scheduler():
     scheduler = AsyncIOScheduler()
     
-    # Add daily eBird collection job at 00:00
+    async def resume_abandoned_runs():
+        """On failover, rerun the jobs the previous leader died in the middle of (all of them are idempotent)."""
+        for job_id in await JobRunHistory().abandon_stale():
+            job = scheduler.get_job(job_id)
+            if job:
+                logger.info(f"Rerunning {job_id}, abandoned by the previous scheduler leader")
+                job.modify(next_run_time=datetime.now(scheduler.timezone))
+    
+    scheduler_leader.on_elected(resume_abandoned_runs)
+    
+    # Add incremental eBird collection job (hourly by default)
     scheduler.add_job(
-        run_daily_ebird_collection,
-        trigger=CronTrigger(hour=0, minute=0),  # Every day at 00:00
+        cluster_job("daily_ebird_collection", run_daily_ebird_collection),
+        trigger=IntervalTrigger(minutes=settings.EBIRD_COLLECTION_INTERVAL_MINUTES),
         id="daily_ebird_collection",
-        name="Daily eBird Historical Data Collection",
+        name="Incremental eBird Data Collection",
+        replace_existing=True
+    )
+    
+    # Add weekly eBird taxonomy refresh job (Sunday at 01:00)
+    scheduler.add_job(
+        cluster_job("weekly_ebird_taxonomy_refresh", refresh_ebird_taxonomy),
+        trigger=CronTrigger(day_of_week="sun", hour=1, minute=0),  # Every Sunday at 01:00
+        id="weekly_ebird_taxonomy_refresh",
+        name="Weekly eBird Taxonomy Refresh",
+        replace_existing=True
+    )
+    
+    # Add daily raw payload compaction job at 03:00
+    scheduler.add_job(
+        cluster_job("daily_raw_payload_compaction", compact_raw_payloads),
+        trigger=CronTrigger(hour=3, minute=0),  # Every day at 03:00
+        id="daily_raw_payload_compaction",
+        name="Daily Raw Payload Compaction",
         replace_existing=True
     )
     
     # Add monthly login logs cleanup job (first day of month at 02:00)
     scheduler.add_job(
-        cleanup_old_login_logs,
+        cluster_job("monthly_login_logs_cleanup", cleanup_old_login_logs),
         trigger=CronTrigger(day=1, hour=2, minute=0),  # First day of month at 02:00
         id="monthly_login_logs_cleanup",
         name="Monthly Login Logs Cleanup",
         replace_existing=True
     )
     
-    logger.info("APScheduler configured with daily eBird collection and monthly cleanup jobs")
+    logger.info("APScheduler configured with incremental eBird collection, weekly taxonomy refresh, raw compaction and monthly cleanup jobs")
     return scheduler
@@ -0,0 +1,130 @@
+"""
+Builds the bundled country boundaries (`app/services/disl/data/country_boundaries.json`) used by
+the offline reverse geocoder (`services/disl/countries.py`) from a Natural Earth admin-0
+countries GeoJSON (public domain, https://www.naturalearthdata.com):
+
+    python -m app.devtools.build_country_boundaries ne_110m_admin_0_countries.geojson
+
+Rings are simplified with Douglas-Peucker (`--tolerance`, degrees) and rounded to `--precision`
+decimals. Features without an ISO code (e.g. disputed areas) are kept with a null code, so the
+resolver knows not to answer there. A finer scale (50m) can be swapped in without code changes;
+raise COUNTRY_BORDER_MARGIN_KM for coarser ones.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+DEFAULT_OUTPUT = Path(__file__).resolve().parents[1] / "services" / "disl" / "data" / "country_boundaries.json"
+
+# Property names used across Natural Earth releases, most reliable first
+CODE_FIELDS = ("ISO_A2_EH", "ISO_A2", "iso_a2", "WB_A2")
+NAME_FIELDS = ("NAME", "name", "ADMIN")
+CONTINENT_FIELDS = ("CONTINENT", "continent")
+
+# Countries below the resolution of small-scale boundaries (absent, or swallowed by a neighbor):
+# lookups inside these (min_lat, min_lon, max_lat, max_lon) boxes always go to the online geocoder
+UNRESOLVED_AREAS = {
+    "AD": (42.42, 1.40, 42.66, 1.79),
+    "BH": (25.50, 50.35, 26.35, 50.85),
+    "LI": (47.04, 9.47, 47.28, 9.64),
+    "MC": (43.72, 7.40, 43.76, 7.44),
+    "MT": (35.78, 14.18, 36.09, 14.58),
+    "SG": (1.15, 103.59, 1.48, 104.10),
+    "SM": (43.89, 12.40, 43.99, 12.52),
+    "VA": (41.90, 12.44, 41.91, 12.46),
+}
+
+
+def _first(props: dict, fields) -> Optional[str]:
+    for field in fields:
+        value = props.get(field)
+        if value not in (None, "", "-99"):
+            return value
+    return None
+
+
+def _perpendicular(point, start, end) -> float:
+    (x, y), (x1, y1), (x2, y2) = point, start, end
+    dx, dy = x2 - x1, y2 - y1
+    if dx == 0 and dy == 0:
+        return ((x - x1) ** 2 + (y - y1) ** 2) ** 0.5
+    return abs(dy * x - dx * y + x2 * y1 - y2 * x1) / (dx * dx + dy * dy) ** 0.5
+
+
+def simplify(ring: List[list], tolerance: float) -> List[list]:
+    """Douglas-Peucker on a closed ring, iterative so long coastlines do not hit the recursion limit."""
+    if tolerance <= 0 or len(ring) < 5:
+        return ring
+    keep = [False] * len(ring)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(ring) - 1)]
+    while stack:
+        first, last = stack.pop()
+        index, distance = first, 0.0
+        for i in range(first + 1, last):
+            d = _perpendicular(ring[i], ring[first], ring[last])
+            if d > distance:
+                index, distance = i, d
+        if distance > tolerance:
+            keep[index] = True
+            stack.extend(((first, index), (index, last)))
+    simplified = [point for point, kept in zip(ring, keep) if kept]
+    # A ring needs at least 3 distinct points
+    return simplified if len(simplified) >= 4 else ring
+
+
+def _polygons(geometry: dict) -> List[list]:
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    if geometry["type"] == "MultiPolygon":
+        return geometry["coordinates"]
+    return []
+
+
+def build(collection: dict, tolerance: float, precision: int) -> dict:
+    countries = []
+    for feature in collection["features"]:
+        props = feature.get("properties") or {}
+        rings = []
+        for polygon in _polygons(feature.get("geometry") or {"type": None}):
+            for ring in polygon:
+                ring = [[round(x, precision), round(y, precision)] for x, y in simplify(ring, tolerance)]
+                # Flat [x0, y0, x1, y1, ...] keeps the bundle small
+                rings.append([value for point in ring for value in point])
+        if not rings:
+            continue
+        countries.append({
+            "code": _first(props, CODE_FIELDS),
+            "name": _first(props, NAME_FIELDS),
+            "continent": _first(props, CONTINENT_FIELDS),
+            "rings": rings,
+        })
+    countries.sort(key=lambda country: (country["code"] or "~", country["name"] or ""))
+    return {
+        "source": "Natural Earth admin-0 countries (public domain)",
+        "tolerance": tolerance,
+        "unresolved_areas": UNRESOLVED_AREAS,
+        "countries": countries,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build the bundled country boundaries from Natural Earth GeoJSON")
+    parser.add_argument("geojson", type=Path)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Douglas-Peucker tolerance in degrees")
+    parser.add_argument("--precision", type=int, default=3, help="Decimals kept per coordinate")
+    args = parser.parse_args()
+
+    bundle = build(json.loads(args.geojson.read_text(encoding="utf-8")), args.tolerance, args.precision)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(bundle, separators=(",", ":")) + "\n", encoding="utf-8")
+    points = sum(len(ring) // 2 for country in bundle["countries"] for ring in country["rings"])
+    print(f"Wrote {len(bundle['countries'])} countries, {points} points to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""
+Micro-benchmarks for the ETL normalizers.
+
+Feeds deterministic synthetic payloads (shaped like the upstream stand-in responses) through
+`normalize` of every provider and through the eBird dedupe step of `run_etl`, and reports records
+per second (best of `--repeat` runs) and the peak memory allocated while normalizing, measured with
+tracemalloc in a separate run so tracing does not skew the timings.
+
+    # Compare against the stored baseline, exit code 1 on a regression
+    python -m app.devtools.normalize_benchmark
+
+    # Quick run on small payloads only
+    python -m app.devtools.normalize_benchmark --sizes 1000 --only ebird
+
+    # Accept the current numbers as the new baseline
+    python -m app.devtools.normalize_benchmark --update-baseline
+
+Throughput depends on the machine, so compare baselines recorded on the same hardware;
+peak memory is mostly machine independent.
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+from app.devtools.upstream_standin import COUNTRY_CODES, SPECIES, Synthesizer
+from app.services.disl import EBirdProvider, NinjasProvider, OpenStreetMapsProvider, WildlifeProvider
+
+DEFAULT_BASELINE = Path(__file__).parent / "normalize_baseline.json"
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+# Share of repeated observations in the dedupe payload, as seen when regions overlap
+DUPLICATE_RATIO = 0.25
+
+
+def ebird_payload(size: int, seed: int) -> list[dict]:
+    return Synthesizer(seed).ebird_observations(random.Random(seed), "XX", None, {"maxResults": size, "back": 30})
+
+
+def ebird_duplicated_payload(size: int, seed: int) -> list[dict]:
+    unique = ebird_payload(size - int(size * DUPLICATE_RATIO), seed)
+    duplicates = random.Random(seed).choices(unique, k=size - len(unique))
+    return unique + duplicates
+
+
+def ninjas_payload(size: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    continents = ["Africa", "Asia", "Europe", "North-America", "South-America", "Oceania"]
+    return [
+        {
+            "name": com,
+            "taxonomy": {"kingdom": "Animalia", "class": "Aves", "scientific_name": sci},
+            "locations": rng.sample(continents, k=2),
+            "characteristics": {"diet": rng.choice(["Carnivore", "Herbivore", "Omnivore"]), "prey": "Insects", "lifespan": f"{rng.randint(2, 20)} years"},
+        }
+        for _, com, sci in (rng.choice(SPECIES) for _ in range(size))
+    ]
+
+
+def photon_payload(size: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [round(rng.uniform(-180, 180), 5), round(rng.uniform(-60, 70), 5)]},
+                "properties": {"name": f"Place {i}", "countrycode": rng.choice(COUNTRY_CODES), "osm_id": rng.randint(1, 10**9), "osm_key": "place", "osm_value": "city"},
+            }
+            for i in range(size)
+        ],
+    }
+
+
+def wildlife_payload(size: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    annotations = []
+    for i in range(size):
+        _, com, sci = rng.choice(SPECIES)
+        genus, species = sci.split(" ")
+        annotations.append({
+            "id": i,
+            "label": com,
+            "score": round(rng.uniform(0.5, 0.99), 3),
+            "taxonomy": {"class": "Aves", "genus": genus, "species": species},
+            "bbox": [round(rng.uniform(0, 0.5), 3), round(rng.uniform(0, 0.5), 3), 0.4, 0.4],
+        })
+    return {"annotations": annotations}
+
+
+def ebird_dedupe(provider: EBirdProvider, payload: list[dict]) -> list[dict]:
+    seen: set = set()
+    return [item for item in payload if provider.is_unseen(item, seen)]
+
+
+# name -> (payload builder, function normalizing the payload)
+BENCHMARKS: dict[str, tuple[Callable[[int, int], Any], Callable[[Any], Any]]] = {
+    "ebird.normalize": (ebird_payload, EBirdProvider().normalize),
+    "ebird.normalize_batch": (ebird_payload, EBirdProvider().normalize_batch),
+    "ebird.normalize_batch.to_records": (ebird_payload, lambda payload: EBirdProvider().normalize_batch(payload).to_records()),
+    "ebird.dedupe": (ebird_duplicated_payload, lambda payload: ebird_dedupe(EBirdProvider(), payload)),
+    "ninjas.normalize": (ninjas_payload, NinjasProvider().normalize),
+    "maps.normalize": (photon_payload, OpenStreetMapsProvider().normalize),
+    "wildlife.normalize": (wildlife_payload, WildlifeProvider().normalize),
+}
+
+
+def measure(fn: Callable[[Any], Any], payload: Any, size: int, repeat: int) -> dict:
+    gc.collect()
+    gc.disable()
+    try:
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = fn(payload)
+            best = min(best, time.perf_counter() - started)
+            del result
+    finally:
+        gc.enable()
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = fn(payload)
+        _, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+    return {"records_per_second": round(size / best), "peak_bytes": peak}
+
+
+def compare(name: str, current: dict, baseline: dict | None, tolerance: float) -> list[str]:
+    if not baseline:
+        return []
+    regressions = []
+    if current["records_per_second"] < baseline["records_per_second"] * (1 - tolerance):
+        regressions.append(
+            f"{name}: {current['records_per_second']:,} rec/s is below the baseline {baseline['records_per_second']:,} rec/s"
+        )
+    if current["peak_bytes"] > baseline["peak_bytes"] * (1 + tolerance):
+        regressions.append(f"{name}: peak {current['peak_bytes']:,} B is above the baseline {baseline['peak_bytes']:,} B")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the ETL normalizers against a stored baseline")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--only", nargs="+", help="Benchmark name prefixes, e.g. ebird maps.normalize")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown / memory growth")
+    parser.add_argument("--update-baseline", action="store_true", help="Store the results as the new baseline")
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"results": {}}
+    results: dict[str, dict] = {}
+    regressions: list[str] = []
+
+    print(f"{'benchmark':<40} {'records/s':>14} {'peak MB':>10} {'vs baseline':>12}")
+    for name, (build, fn) in BENCHMARKS.items():
+        if args.only and not any(name.startswith(prefix) for prefix in args.only):
+            continue
+        for size in args.sizes:
+            key = f"{name}@{size}"
+            payload = build(size, args.seed)
+            current = results[key] = measure(fn, payload, size, args.repeat)
+            del payload
+            previous = baseline["results"].get(key)
+            ratio = f"{current['records_per_second'] / previous['records_per_second']:.2f}x" if previous else "-"
+            print(f"{key:<40} {current['records_per_second']:>14,} {current['peak_bytes'] / 2**20:>10.1f} {ratio:>12}")
+            regressions.extend(compare(key, current, previous, args.tolerance))
+
+    if args.update_baseline:
+        baseline["results"].update(results)
+        baseline["meta"] = {"python": platform.python_version(), "machine": platform.machine(), "processor": platform.processor()}
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
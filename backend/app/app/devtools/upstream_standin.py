@@ -0,0 +1,409 @@
+"""
+Local stand-in for the upstream APIs (eBird, API Ninjas, Photon, animaldetect).
+
+Replays recorded responses (fixtures) with configurable latency, injected errors and rate
+limits, so the ETL and API paths can be load-tested and benchmarked without network access
+or API quota. Responses without a fixture are synthesized deterministically from the request
+and the seed, and every random decision (latency jitter, injected errors) is derived from
+the seed, the request and its occurrence number, so runs are reproducible regardless of
+request interleaving.
+
+    # Replay (default) on port 8099, 50ms +-20ms latency, 1% errors
+    python -m app.devtools.upstream_standin --latency-ms 50 --jitter-ms 20 --error-rate 0.01
+
+    # Record real responses into the fixtures directory while proxying
+    python -m app.devtools.upstream_standin --record
+
+Point the app at it with the environment variables printed on start-up (see `settings_overrides`).
+Per-upstream profiles can be given as JSON with `--config`:
+
+    {"seed": 7, "upstreams": {"photon": {"latency_ms": 120, "rate_limit": 2, "burst": 2}}}
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+from fastapi import FastAPI, Request, Response
+
+logger = logging.getLogger(__name__)
+
+# Real upstream base URLs, used for recording
+UPSTREAM_URLS = {
+    "ebird": "https://api.ebird.org",
+    "ninjas": "https://api.api-ninjas.com",
+    "photon": "https://photon.komoot.io",
+    "wildlife": "https://www.animaldetect.com/api",
+}
+
+DEFAULT_FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# Request headers never written to fixtures or used in fixture keys
+SECRET_HEADERS = {"x-ebirdapitoken", "x-api-key", "authorization"}
+
+
+def settings_overrides(base_url: str) -> dict[str, str]:
+    """Environment variables that point `Settings` at a stand-in listening on `base_url`."""
+    base_url = base_url.rstrip("/")
+    return {
+        "EBIRD_API_URL": f"{base_url}/ebird/v2/data/obs/",
+        "EBIRD_TAXONOMY_URL": f"{base_url}/ebird/v2/ref/taxonomy/ebird",
+        "NINJAS_API_URL": f"{base_url}/ninjas/v1/animals",
+        "PHOTON_API_URL": f"{base_url}/photon/api",
+        "PHOTON_REVERSE_API_URL": f"{base_url}/photon/reverse",
+        "WILDLIFE_API_URL": f"{base_url}/wildlife",
+    }
+
+
+class UpstreamProfile:
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        rate_limit: float = 0.0,
+        burst: int = 1,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        # Requests per second before answering 429, 0 disables
+        self.rate_limit = rate_limit
+        self.burst = burst
+
+
+class StandinConfig:
+    def __init__(
+        self,
+        fixtures_dir: Path = DEFAULT_FIXTURES_DIR,
+        seed: int = 0,
+        record: bool = False,
+        synthesize: bool = True,
+        default: Optional[UpstreamProfile] = None,
+        upstreams: Optional[dict[str, UpstreamProfile]] = None,
+    ):
+        self.fixtures_dir = Path(fixtures_dir)
+        self.seed = seed
+        self.record = record
+        # Synthesize responses without a fixture; otherwise answer 404
+        self.synthesize = synthesize
+        self.default = default or UpstreamProfile()
+        self.upstreams = upstreams or {}
+
+    def profile(self, upstream: str) -> UpstreamProfile:
+        return self.upstreams.get(upstream, self.default)
+
+    def load_file(self, path: Path):
+        """Apply a JSON config file: top-level options plus per-upstream profiles."""
+        data = json.loads(Path(path).read_text())
+        self.seed = data.get("seed", self.seed)
+        self.synthesize = data.get("synthesize", self.synthesize)
+        if "fixtures_dir" in data:
+            self.fixtures_dir = Path(data["fixtures_dir"])
+        for upstream, profile in data.get("upstreams", {}).items():
+            self.upstreams[upstream] = UpstreamProfile(**{**vars(self.default), **profile})
+
+
+class FixtureStore:
+    """One JSON file per distinct request under `<fixtures_dir>/<upstream>/`."""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    @staticmethod
+    def key(method: str, path: str, params: dict) -> str:
+        query = "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+        return f"{method.upper()} {path}?{query}"
+
+    def path_for(self, upstream: str, key: str) -> Path:
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", key.split("?")[0]).strip("-")[:60]
+        digest = hashlib.sha1(key.encode()).hexdigest()[:10]
+        return self.root / upstream / f"{slug}-{digest}.json"
+
+    def load(self, upstream: str, key: str) -> Optional[dict]:
+        path = self.path_for(upstream, key)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def save(self, upstream: str, key: str, status: int, content_type: str, body: bytes):
+        path = self.path_for(upstream, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fixture: dict[str, Any] = {"key": key, "status": status, "content_type": content_type}
+        try:
+            fixture["json"] = json.loads(body)
+        except ValueError:
+            fixture["body_b64"] = base64.b64encode(body).decode()
+        path.write_text(json.dumps(fixture, indent=1))
+
+    @staticmethod
+    def to_response(fixture: dict) -> Response:
+        if "json" in fixture:
+            body = json.dumps(fixture["json"]).encode()
+        else:
+            body = base64.b64decode(fixture.get("body_b64", ""))
+        return Response(content=body, status_code=fixture["status"], media_type=fixture.get("content_type") or "application/json")
+
+
+class _Bucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+SPECIES = [
+    ("amerob", "American Robin", "Turdus migratorius"),
+    ("houspa", "House Sparrow", "Passer domesticus"),
+    ("eurbla", "Eurasian Blackbird", "Turdus merula"),
+    ("grtti1", "Great Tit", "Parus major"),
+    ("barswa", "Barn Swallow", "Hirundo rustica"),
+    ("mallar3", "Mallard", "Anas platyrhynchos"),
+    ("rocpig", "Rock Pigeon", "Columba livia"),
+    ("comsta", "Common Starling", "Sturnus vulgaris"),
+]
+
+COUNTRY_CODES = ["US", "ES", "GB", "FR", "DE", "IT", "CA", "AU", "BR", "MX", "ZA", "IN", "JP"]
+
+
+class Synthesizer:
+    """Deterministic fake responses shaped like the real APIs, seeded by the request."""
+
+    def __init__(self, seed: int):
+        self.seed = seed
+
+    def _rng(self, key: str) -> random.Random:
+        return random.Random(f"{self.seed}:{key}")
+
+    def response(self, upstream: str, method: str, path: str, params: dict, key: str) -> Optional[Any]:
+        rng = self._rng(key)
+        if upstream == "ebird":
+            if path.startswith("/v2/ref/taxonomy"):
+                return [
+                    {"speciesCode": code, "comName": com, "sciName": sci, "taxonOrder": i + 1, "category": "species"}
+                    for i, (code, com, sci) in enumerate(SPECIES)
+                ]
+            match = re.match(r"/v2/data/obs/geo/recent(?:/(?P<species>[^/]+))?$", path)
+            if match:
+                # Spread over the requested circle (degrees of latitude ~ 111km)
+                spread = float(params.get("dist", 25)) / 111 / 1.5
+                center = (float(params.get("lat", 0)), float(params.get("lng", 0)))
+                return self.ebird_observations(rng, "geo", match["species"], params, center=center, spread=spread)
+            match = re.match(r"/v2/data/obs/(?P<region>[^/]+)/recent(?:/(?P<species>[^/]+))?$", path)
+            if match:
+                return self.ebird_observations(rng, match["region"], match["species"], params)
+        elif upstream == "ninjas" and path.startswith("/v1/animals"):
+            name = params.get("name", "animal")
+            return [{
+                "name": name.title(),
+                "taxonomy": {"kingdom": "Animalia", "class": "Mammalia", "scientific_name": name.title()},
+                "locations": rng.sample(["Africa", "Asia", "Europe", "North-America", "South-America", "Oceania"], k=2),
+                "characteristics": {"diet": rng.choice(["Carnivore", "Herbivore", "Omnivore"]), "habitat": rng.choice(["Forest", "Grassland", "Urban"])},
+            }]
+        elif upstream == "photon":
+            country = rng.choice(COUNTRY_CODES)
+            if path.startswith("/reverse"):
+                lat, lon = float(params.get("lat", 0)), float(params.get("lon", 0))
+                name = country
+            else:
+                lat, lon = round(rng.uniform(-60, 70), 5), round(rng.uniform(-180, 180), 5)
+                name = params.get("q", "")
+            return {
+                "type": "FeatureCollection",
+                "features": [{
+                    "type": "Feature",
+                    "geometry": {"type": "Point", "coordinates": [lon, lat]},
+                    "properties": {"name": name, "countrycode": country, "osm_id": rng.randint(1, 10**9), "osm_key": "place", "osm_value": "country"},
+                }],
+            }
+        elif upstream == "wildlife" and path.endswith("/detect"):
+            code, com, sci = rng.choice(SPECIES)
+            genus, species = sci.split(" ")
+            return {"annotations": [{
+                "id": 1,
+                "label": com,
+                "score": round(rng.uniform(0.6, 0.99), 3),
+                "taxonomy": {"class": "Aves", "genus": genus, "species": species},
+                "bbox": [round(rng.uniform(0, 0.5), 3), round(rng.uniform(0, 0.5), 3), 0.4, 0.4],
+            }]}
+        return None
+
+    def ebird_observations(
+        self,
+        rng: random.Random,
+        region: str,
+        species_code: Optional[str],
+        params: dict,
+        center: Optional[tuple[float, float]] = None,
+        spread: float = 5.0,
+    ) -> list[dict]:
+        count = int(params.get("maxResults", 100))
+        back = int(params.get("back", 14))
+        # Anchored to today so incremental windows behave, stable within a day
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        lat0, lng0 = center or (rng.uniform(-40, 60), rng.uniform(-120, 140))
+        items = []
+        for i in range(count):
+            code, com, sci = next((s for s in SPECIES if s[0] == species_code), None) or rng.choice(SPECIES)
+            obs_dt = today - timedelta(days=rng.randrange(max(1, back)), minutes=rng.randrange(24 * 60))
+            items.append({
+                "speciesCode": species_code or code,
+                "comName": com,
+                "sciName": sci,
+                "locId": f"L{rng.randrange(10**6)}",
+                "locName": f"{region} site {rng.randrange(500)}",
+                "obsDt": obs_dt.strftime("%Y-%m-%d %H:%M"),
+                "howMany": rng.randint(1, 20),
+                "lat": round(lat0 + rng.uniform(-spread, spread), 5),
+                "lng": round(lng0 + rng.uniform(-spread, spread), 5),
+                "obsValid": True,
+                "obsReviewed": False,
+                "locationPrivate": False,
+                "subId": f"S{region}{rng.randrange(10**8)}",
+            })
+        return items
+
+
+def create_app(config: StandinConfig) -> FastAPI:
+    app = FastAPI(title="Upstream stand-in")
+    fixtures = FixtureStore(config.fixtures_dir)
+    synthesizer = Synthesizer(config.seed)
+    buckets: dict[str, _Bucket] = {}
+    occurrences: dict[str, int] = defaultdict(int)
+    stats: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    recorder: dict[str, httpx.AsyncClient] = {}
+
+    def bucket(upstream: str) -> Optional[_Bucket]:
+        profile = config.profile(upstream)
+        if not profile.rate_limit:
+            return None
+        if upstream not in buckets:
+            buckets[upstream] = _Bucket(profile.rate_limit, profile.burst)
+        return buckets[upstream]
+
+    @app.get("/_standin/stats")
+    async def get_stats():
+        return {upstream: dict(counts) for upstream, counts in stats.items()}
+
+    @app.post("/_standin/reset")
+    async def reset():
+        """Forget counters, rate-limit state and occurrence numbers, so the next run replays identically."""
+        buckets.clear()
+        occurrences.clear()
+        stats.clear()
+        return {"status": "reset"}
+
+    @app.api_route("/{upstream}/{path:path}", methods=["GET", "POST"])
+    async def proxy(upstream: str, path: str, request: Request):
+        if upstream not in UPSTREAM_URLS:
+            return Response(status_code=404, content=f"Unknown upstream {upstream}")
+        path = "/" + path
+        params = dict(request.query_params)
+        key = FixtureStore.key(request.method, path, params)
+        profile = config.profile(upstream)
+        counts = stats[upstream]
+        counts["requests"] += 1
+
+        occurrences[key] += 1
+        rng = random.Random(f"{config.seed}:{key}:{occurrences[key]}")
+        delay = max(0.0, profile.latency_ms + rng.uniform(-profile.jitter_ms, profile.jitter_ms)) / 1000
+        if delay:
+            await asyncio.sleep(delay)
+
+        limiter = bucket(upstream)
+        if limiter is not None and not limiter.take():
+            counts["throttled"] += 1
+            return Response(status_code=429, headers={"Retry-After": "1"}, content="Too Many Requests")
+        if profile.error_rate and rng.random() < profile.error_rate:
+            counts["errors"] += 1
+            return Response(status_code=profile.error_status, content="Injected stand-in error")
+
+        if config.record:
+            client = recorder.get("client")
+            if client is None:
+                client = recorder["client"] = httpx.AsyncClient(timeout=60)
+            headers = {k: v for k, v in request.headers.items() if k.lower() not in ("host", "content-length")}
+            upstream_response = await client.request(
+                request.method, UPSTREAM_URLS[upstream] + path, params=params, headers=headers, content=await request.body()
+            )
+            content_type = upstream_response.headers.get("content-type", "application/json")
+            if upstream_response.status_code < 500:
+                fixtures.save(upstream, key, upstream_response.status_code, content_type, upstream_response.content)
+                counts["recorded"] += 1
+            return Response(content=upstream_response.content, status_code=upstream_response.status_code, media_type=content_type)
+
+        fixture = fixtures.load(upstream, key)
+        if fixture is not None:
+            counts["fixture_hits"] += 1
+            return FixtureStore.to_response(fixture)
+        if config.synthesize:
+            body = synthesizer.response(upstream, request.method, path, params, key)
+            if body is not None:
+                counts["synthesized"] += 1
+                return Response(content=json.dumps(body), media_type="application/json")
+        counts["misses"] += 1
+        return Response(status_code=404, content=f"No fixture for {key}")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record/replay stand-in for the upstream APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--fixtures", type=Path, default=DEFAULT_FIXTURES_DIR)
+    parser.add_argument("--config", type=Path, help="JSON file with seed and per-upstream profiles")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--record", action="store_true", help="Proxy to the real upstreams and save fixtures")
+    parser.add_argument("--no-synthesize", action="store_true", help="Answer 404 when no fixture matches")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requests/second per upstream before 429")
+    parser.add_argument("--burst", type=int, default=1)
+    args = parser.parse_args()
+
+    config = StandinConfig(
+        fixtures_dir=args.fixtures,
+        seed=args.seed,
+        record=args.record,
+        synthesize=not args.no_synthesize,
+        default=UpstreamProfile(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, args.rate_limit, args.burst),
+    )
+    if args.config:
+        config.load_file(args.config)
+
+    import uvicorn
+
+    logging.basicConfig(level=logging.INFO)
+    print("Point the app at the stand-in with:")
+    for name, value in settings_overrides(f"http://{args.host}:{args.port}").items():
+        print(f"  export {name}={value}")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
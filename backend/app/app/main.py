@@ -6,7 +6,15 @@ from contextlib import asynccontextmanager
 
 from app.api.api_v1.api import api_router
 from app.core.config import settings
-from app.core.scheduler import setup_scheduler
+from app.services.disl.batch_writer import batch_writers
+from app.services.disl.countries import country_boundaries
+from app.services.disl.ebird_store import EBirdObservationStore
+from app.services.disl.geocode_cache import geocode_cache
+from app.services.disl.http_clients import http_clients
+from app.services.disl.job_queue import EtlJobQueue
+from app.services.disl.observation_store import ObservationStore
+from app.services.disl.raw_store import RawPayloadStore
+from app.services.disl.taxonomy import taxonomy_index
 
 # Global logging setup
 logging.basicConfig(
@@ -21,17 +29,43 @@ async def app_init(app: FastAPI):
     # Initialize API router
     app.include_router(api_router, prefix=settings.API_V1_STR)
     
-    # Initialize and start APScheduler for background tasks
-    logger.info("Starting APScheduler for background ETL tasks")
-    scheduler = setup_scheduler()
-    scheduler.start()
-    logger.info("APScheduler started successfully")
+    # Open pooled HTTP clients shared by all DISL providers
+    http_clients.open()
+    
+    # Make sure ETL collections are indexed (TTL retention included)
+    for store in (EBirdObservationStore(), ObservationStore(), RawPayloadStore(), EtlJobQueue(), geocode_cache):
+        try:
+            await store.ensure_indexes()
+        except Exception as e:
+            logger.error(f"Failed to create indexes for {type(store).__name__}: {str(e)}")
+    
+    # Observations saved before they carried a GeoJSON location
+    try:
+        await ObservationStore().migrate_locations()
+    except Exception as e:
+        logger.error(f"Failed to migrate observation locations: {str(e)}")
+    
+    # Load the eBird taxonomy index so species lookups stay off the network
+    try:
+        await taxonomy_index.ensure_loaded()
+    except Exception as e:
+        logger.error(f"Failed to load eBird taxonomy index: {str(e)}")
+    
+    # Index the bundled country boundaries up front rather than on the first reverse geocode
+    try:
+        country_boundaries.ensure_loaded()
+    except Exception as e:
+        logger.error(f"Failed to load country boundaries: {str(e)}")
+    
+    # Scheduled ETL jobs run in the worker process (app/worker.py), not here
     
     yield
     
-    # Shutdown scheduler on app exit
-    logger.info("Shutting down APScheduler")
-    scheduler.shutdown()
+    logger.info("Flushing buffered ETL writes")
+    await batch_writers.close()
+    
+    logger.info("Closing shared HTTP clients")
+    await http_clients.aclose()
 
 
 app = FastAPI(
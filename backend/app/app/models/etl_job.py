@@ -0,0 +1,36 @@
+from datetime import datetime
+from typing import Any, List, Optional
+from pydantic import Field
+from enum import Enum
+
+from app.db.base_class import Base
+
+class EtlJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class EtlJobKind(str, Enum):
+    EBIRD_RUN_ETL = "ebird_run_etl"
+    NINJAS_FETCH = "ninjas_fetch"
+    PROVIDER_QUERY = "provider_query"
+    ANIMAL_MAP = "animal_map"
+
+class EtlJob(Base):
+    kind: EtlJobKind
+    params: dict = Field(default_factory=dict)
+    status: EtlJobStatus = EtlJobStatus.QUEUED
+    priority: int = 0
+    attempts: int = 0
+    max_attempts: int = 3
+    result: Any = None
+    error: Optional[str] = None
+    worker_id: Optional[str] = None
+    # Users that enqueued or joined the job; only they (and superusers) may read it
+    user_ids: List[str] = Field(default_factory=list)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    available_at: Optional[datetime] = None
+    lease_expires_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -14,4 +14,6 @@ class Observation(Base):
     image_mime_type: str = "image/jpeg"
     latitude: Optional[float] = None
     longitude: Optional[float] = None
+    # GeoJSON Point of latitude/longitude, 2dsphere indexed (see services/disl/observation_store.py)
+    location: Optional[dict] = None
     country_code: Optional[str] = None
@@ -1,17 +1,208 @@
+import asyncio
+import inspect
 import logging
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Optional
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Iterable, Optional, Union
 from datetime import datetime
 import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+from app.core.config import settings
 from app.models.raw_data import RawData, DataSource, ETLStatus
 from app.db.session import MongoDatabase
+from app.services.disl.batch_writer import batch_writers
+from app.services.disl.http_clients import Upstream, http_clients
+from app.services.disl.rate_limit import rate_limiters
+from app.services.disl.raw_store import RawPayloadStore
 from bson import ObjectId
 
 logger = logging.getLogger(__name__)
 
+# End-of-stream marker passed between pipeline stages
+_DONE = object()
+
+
+class StageStats:
+    def __init__(self, name: str, concurrency: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.items_in = 0
+        self.items_out = 0
+        # Time spent inside the stage function, excluding waits on the neighbouring queues
+        self.busy_seconds = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "concurrency": self.concurrency,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "busy_seconds": round(self.busy_seconds, 4),
+        }
+
+
+class _Stage:
+    def __init__(self, name: str, fn: Callable, concurrency: int, batch_size: Optional[int]):
+        self.name = name
+        self.fn = fn
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.stats = StageStats(name, concurrency)
+
+
+class Pipeline:
+    """
+    Streaming ETL pipeline: a source followed by stages, joined by bounded queues.
+
+    A stage function receives one item (or a list of up to `batch_size` items) and may be an
+    async generator yielding any number of outputs, a coroutine or a plain function returning
+    one output; `None` drops the item. Each stage runs `concurrency` workers, so fetching the
+    next page overlaps with normalizing and storing the previous one, and a full queue makes
+    the upstream stages wait (backpressure). Order is only preserved with a concurrency of 1.
+    The first stage error cancels the whole pipeline and is re-raised by `run()`.
+
+        pipeline = Pipeline("ninjas-etl").source("fetch", pages).stage("normalize", normalize).stage("store", save)
+        async for item in pipeline.run(): ...
+    """
+
+    def __init__(self, name: str, queue_size: Optional[int] = None):
+        self.name = name
+        self.queue_size = queue_size or settings.ETL_PIPELINE_QUEUE_SIZE
+        self._source: Optional[tuple[str, Union[Iterable, AsyncIterable]]] = None
+        self._stages: list[_Stage] = []
+        self.source_stats: Optional[StageStats] = None
+        self.elapsed = 0.0
+
+    def source(self, name: str, items: Union[Iterable, AsyncIterable]) -> "Pipeline":
+        self._source = (name, items)
+        self.source_stats = StageStats(name, 1)
+        return self
+
+    def stage(self, name: str, fn: Callable, concurrency: int = 1, batch_size: Optional[int] = None) -> "Pipeline":
+        self._stages.append(_Stage(name, fn, max(1, concurrency), batch_size))
+        return self
+
+    @property
+    def stats(self) -> list[dict]:
+        stats = [self.source_stats] if self.source_stats else []
+        return [s.as_dict() for s in stats + [stage.stats for stage in self._stages]]
+
+    @staticmethod
+    async def _timed(stats: StageStats, outputs: AsyncIterator) -> AsyncIterator:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = await outputs.__anext__()
+            except StopAsyncIteration:
+                stats.busy_seconds += time.perf_counter() - started
+                return
+            stats.busy_seconds += time.perf_counter() - started
+            yield item
+
+    @staticmethod
+    def _outputs(fn: Callable, item: Any) -> AsyncIterator:
+        if inspect.isasyncgenfunction(fn):
+            return fn(item).__aiter__()
+
+        async def single():
+            result = fn(item)
+            if inspect.isawaitable(result):
+                result = await result
+            if result is not None:
+                yield result
+
+        return single()
+
+    async def _run_source(self, out: asyncio.Queue):
+        name, items = self._source
+        if not isinstance(items, AsyncIterable):
+            async def wrap(it=items):
+                for item in it:
+                    yield item
+            items = wrap()
+        async for item in self._timed(self.source_stats, items.__aiter__()):
+            self.source_stats.items_out += 1
+            await out.put(item)
+        await out.put(_DONE)
+
+    async def _run_stage(self, stage: _Stage, inbox: asyncio.Queue, out: asyncio.Queue):
+        async def process(item):
+            async for result in self._timed(stage.stats, self._outputs(stage.fn, item)):
+                stage.stats.items_out += 1
+                await out.put(result)
+
+        async def worker():
+            batch = []
+            while (item := await inbox.get()) is not _DONE:
+                stage.stats.items_in += 1
+                if stage.batch_size is None:
+                    await process(item)
+                    continue
+                batch.append(item)
+                if len(batch) >= stage.batch_size:
+                    await process(batch)
+                    batch = []
+            # Hand the marker on so the other workers of this stage stop too
+            await inbox.put(_DONE)
+            if batch:
+                await process(batch)
+
+        await asyncio.gather(*(worker() for _ in range(stage.concurrency)))
+        await out.put(_DONE)
+
+    async def run(self) -> AsyncIterator[Any]:
+        """Run the pipeline and yield the outputs of the last stage as they are produced."""
+        if self._source is None:
+            raise ValueError(f"Pipeline {self.name} has no source")
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(len(self._stages) + 1)]
+        tasks = [asyncio.create_task(self._run_source(queues[0]))]
+        for stage, inbox, out in zip(self._stages, queues, queues[1:]):
+            tasks.append(asyncio.create_task(self._run_stage(stage, inbox, out)))
+        final = queues[-1]
+        error: list[BaseException] = []
+
+        async def supervise():
+            try:
+                await asyncio.gather(*tasks)
+            except Exception as e:
+                error.append(e)
+                for task in tasks:
+                    task.cancel()
+                # Make room for the end marker; the pipeline has failed, pending outputs are moot
+                while final.full():
+                    final.get_nowait()
+                final.put_nowait(_DONE)
+
+        started = time.perf_counter()
+        supervisor = asyncio.create_task(supervise())
+        try:
+            while (item := await final.get()) is not _DONE:
+                yield item
+            await supervisor
+            if error:
+                raise error[0]
+        finally:
+            for task in tasks + [supervisor]:
+                task.cancel()
+            self.elapsed = time.perf_counter() - started
+            logger.info(
+                f"[PIPELINE] {self.name} finished in {self.elapsed:.2f}s: "
+                + ", ".join(f"{s['name']} {s['items_in']}->{s['items_out']} busy {s['busy_seconds']:.2f}s x{s['concurrency']}" for s in self.stats)
+            )
+
+    async def drain(self) -> int:
+        """Run the pipeline for its side effects; returns the number of items out of the last stage."""
+        count = 0
+        async for _ in self.run():
+            count += 1
+        return count
+
+
 class ETLProvider(ABC):
+    # Upstream whose pooled HTTP client this provider uses
+    upstream: Upstream
+
     def __init__(self, source: DataSource):
         self.source = source
         self.db = MongoDatabase()
@@ -27,7 +218,7 @@ class ETLProvider(ABC):
         pass
 
     async def store(self, data: Any, status: ETLStatus, error: Optional[str] = None, metadata: Optional[dict] = None):
-        """Store the data in the database."""
+        """Queue the data for a batched write to the database; see `flush()`."""
         raw_data_doc = {
             "source": self.source.value,
             "data": data,
@@ -36,18 +227,48 @@ class ETLProvider(ABC):
             "error_message": error,
             "metadata": metadata or {}
         }
-        await self.db["raw_data"].insert_one(raw_data_doc)
-        logger.info(f"Stored data for {self.source} with status {status}")
+        batch_writers.get("raw_data").add(raw_data_doc)
+        logger.info(f"Queued data for {self.source} with status {status}")
+
+    async def store_raw(self, payload: Any, metadata: Optional[dict] = None):
+        """Store an unmodified upstream payload in the compressed raw tier."""
+        await RawPayloadStore().put(self.source.value, payload, metadata={"type": "raw", **(metadata or {})})
 
-    async def run(self):
+    @staticmethod
+    async def flush():
+        """Write out every buffered document now instead of waiting for the size/time trigger."""
+        await batch_writers.flush()
+
+    async def fetch_pages(self, *args, **kwargs) -> AsyncIterator[Any]:
+        """Yield raw payloads page by page. Single-response providers yield the result of `fetch()`."""
+        yield await self.fetch(*args, **kwargs)
+
+    async def save(self, raw_data: Any, normalized_data: Any):
+        """Persist one normalized page. Providers with their own storage override this."""
+        await self.store(normalized_data, ETLStatus.SUCCESS)
+
+    def build_pipeline(self, *args, **kwargs) -> Pipeline:
+        """fetch -> normalize -> store pipeline yielding `(raw, normalized)` per page; arguments go to `fetch_pages`."""
+        async def save_page(page):
+            await self.save(*page)
+            return page
+
+        return (
+            Pipeline(f"{self.source.value}-etl")
+            .source("fetch", self.fetch_pages(*args, **kwargs))
+            .stage("normalize", lambda raw: (raw, self.normalize(raw)))
+            .stage("store", save_page)
+        )
+
+    async def run(self, *args, **kwargs):
         """Run the full ETL process."""
         self.log_info(f"Starting ETL for {self.source}")
         try:
-            raw_data = await self.fetch()
-            normalized_data = self.normalize(raw_data)
-            await self.store(normalized_data, ETLStatus.SUCCESS)
-            self.log_info(f"ETL completed successfully with {len(normalized_data) if isinstance(normalized_data, list) else 1} items")
-            return {"status": "success", "data_count": len(normalized_data) if isinstance(normalized_data, list) else 1}
+            data_count = 0
+            async for _, normalized_data in self.build_pipeline(*args, **kwargs).run():
+                data_count += len(normalized_data) if isinstance(normalized_data, list) else 1
+            self.log_info(f"ETL completed successfully with {data_count} items")
+            return {"status": "success", "data_count": data_count}
         except Exception as e:
             self.log_error(f"ETL failed: {str(e)}")
             await self.store(None, ETLStatus.FAILED, error=str(e))
@@ -66,11 +287,10 @@ class ETLProvider(ABC):
     def log_error(self, message: str):
         self.get_logger().error(f"[{self.source.value}] {message}")
 
-    @staticmethod
-    def get_client() -> httpx.AsyncClient:
-        return httpx.AsyncClient(
-            timeout=60.0,
-            headers={
-                "User-Agent": "Mozilla/5.0 (compatible; AnimalToMap/1.0; +https://github.com/Anna-Marin/DC-animal-to-map)"
-            }
-        )
+    async def throttle(self):
+        """Wait for this upstream's rate limiter; the lane follows the caller's `request_priority`."""
+        await rate_limiters.get(self.upstream).acquire()
+
+    def get_client(self) -> httpx.AsyncClient:
+        """Shared, pooled client for this provider's upstream. Do not close it."""
+        return http_clients.get(self.upstream)
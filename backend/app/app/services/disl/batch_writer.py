@@ -0,0 +1,131 @@
+import asyncio
+import logging
+from typing import Optional
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.core.config import settings
+from app.db.session import MongoDatabase
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+class BatchWriter:
+    """
+    Write-behind buffer for one collection.
+
+    `add()` returns immediately; buffered documents are flushed with a single unordered
+    `insert_many` once `max_batch` documents are waiting or `max_delay` seconds after the
+    first one arrived, whichever comes first. Call `close()` on shutdown to flush the rest.
+    Documents whose write failed are queued again and retried after `max_delay`, up to
+    ETL_WRITE_MAX_RETRIES times; ids are assigned on `add()`, so a retry never duplicates them.
+    """
+
+    def __init__(self, collection_name: str, max_batch: Optional[int] = None, max_delay: Optional[float] = None):
+        self.collection_name = collection_name
+        self.max_batch = max_batch or settings.ETL_WRITE_BATCH_SIZE
+        self.max_delay = max_delay if max_delay is not None else settings.ETL_WRITE_FLUSH_SECONDS
+        self._buffer: list[dict] = []
+        self._timer: Optional[asyncio.Task] = None
+        self._flushes: set[asyncio.Task] = set()
+        self._lock = asyncio.Lock()
+        # Failed writes per document id, for documents waiting to be retried
+        self._attempts: dict[ObjectId, int] = {}
+
+    def add(self, doc: dict):
+        doc.setdefault("_id", ObjectId())
+        self._buffer.append(doc)
+        if len(self._buffer) >= self.max_batch:
+            self._spawn_flush()
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    def _spawn_flush(self):
+        self._spawn(self.flush())
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        # Keep a reference until done so the task is not garbage collected mid-write
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.max_delay)
+        await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+            try:
+                await MongoDatabase()[self.collection_name].insert_many(batch, ordered=False)
+                logger.debug(f"[BATCH-WRITER] Flushed {len(batch)} documents to {self.collection_name}")
+                failed = []
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                # A duplicate id was written by an earlier attempt whose reply was lost
+                failed = [batch[error["index"]] for error in errors if error.get("code") != DUPLICATE_KEY]
+                if failed:
+                    logger.error(f"[BATCH-WRITER] Partial write to {self.collection_name}: {errors[:3]}")
+            except Exception as e:
+                failed = batch
+                logger.error(f"[BATCH-WRITER] Failed to flush {len(batch)} documents to {self.collection_name}: {e}")
+            if self._attempts:
+                failed_ids = {doc["_id"] for doc in failed}
+                for doc in batch:
+                    if doc["_id"] not in failed_ids:
+                        self._attempts.pop(doc["_id"], None)
+            if failed:
+                self._requeue(failed)
+
+    def _requeue(self, docs: list[dict]):
+        retry = []
+        for doc in docs:
+            attempts = self._attempts.get(doc["_id"], 0) + 1
+            if attempts <= settings.ETL_WRITE_MAX_RETRIES:
+                self._attempts[doc["_id"]] = attempts
+                retry.append(doc)
+            else:
+                self._attempts.pop(doc["_id"], None)
+        if len(retry) < len(docs):
+            logger.error(
+                f"[BATCH-WRITER] Dropped {len(docs) - len(retry)} documents for {self.collection_name} "
+                f"after {settings.ETL_WRITE_MAX_RETRIES} retries"
+            )
+        if retry:
+            self._buffer[:0] = retry
+            self._spawn(self._flush_later())
+
+    async def close(self):
+        if self._timer is not None and not self._timer.done():
+            self._timer.cancel()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        await self.flush()
+
+
+class BatchWriterRegistry:
+    def __init__(self):
+        self._writers: dict[str, BatchWriter] = {}
+
+    def get(self, collection_name: str) -> BatchWriter:
+        writer = self._writers.get(collection_name)
+        if writer is None:
+            writer = self._writers[collection_name] = BatchWriter(collection_name)
+        return writer
+
+    async def flush(self):
+        for writer in list(self._writers.values()):
+            await writer.flush()
+
+    async def close(self):
+        writers, self._writers = self._writers, {}
+        for writer in writers.values():
+            await writer.close()
+
+
+batch_writers = BatchWriterRegistry()
@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Hashable, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.disl.ebird_store import EBirdObservationStore
+from app.services.disl.observation_store import ObservationStore
+from app.services.disl.singleflight import single_flight
+
+logger = logging.getLogger(__name__)
+
+# Clusters are grid cells of 1/2**CELL_BITS tile: 64px on 256px tiles
+CELL_BITS = 2
+# Web Mercator is undefined at the poles
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def mercator_x(lon: np.ndarray) -> np.ndarray:
+    return (lon + 180.0) / 360.0
+
+
+def mercator_y(lat: np.ndarray) -> np.ndarray:
+    sin = np.sin(np.radians(np.clip(lat, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)))
+    return 0.5 - np.log((1 + sin) / (1 - sin)) / (4 * math.pi)
+
+
+def mercator_lat(y: np.ndarray) -> np.ndarray:
+    return np.degrees(np.arctan(np.sinh(math.pi * (1 - 2 * y))))
+
+
+class ClusterLevel:
+    """Clusters of one zoom level as columns; `first` is the row of a representative point."""
+
+    def __init__(self, keys, x, y, count, first, expansion_zoom):
+        self.keys = keys
+        self.count = count
+        self.first = first
+        self.expansion_zoom = expansion_zoom
+        self.x = x
+        self.y = y
+        self.lat = mercator_lat(y)
+        self.lon = x * 360.0 - 180.0
+
+
+class ClusterIndex:
+    """
+    Hierarchical grid clustering of points for map markers, in the spirit of supercluster.
+
+    Points are projected to Web Mercator and snapped to a grid of 2**(max_zoom + CELL_BITS) cells
+    per side. The clusters of zoom z are the non-empty cells of that grid coarsened to
+    2**(z + CELL_BITS) per side, so every level is built from the one below by halving the cell
+    coordinates, and a cluster knows the zoom at which it first splits (`expansion_zoom`).
+    A viewport never holds more than a few hundred cells, whatever the number of points.
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, point_properties: Callable[[int], dict], max_zoom: Optional[int] = None):
+        started = time.perf_counter()
+        self.max_zoom = settings.MAP_CLUSTER_MAX_ZOOM if max_zoom is None else max_zoom
+        self.point_properties = point_properties
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        rows = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+        self.size = len(rows)
+
+        bits = self.max_zoom + CELL_BITS
+        side = 1 << bits
+        x = mercator_x(lon[rows])
+        y = mercator_y(lat[rows])
+        ix = np.minimum((x * side).astype(np.int64), side - 1)
+        iy = np.minimum((y * side).astype(np.int64), side - 1)
+
+        # Finest level: one cluster per occupied cell
+        keys, first, inverse = np.unique((ix << bits) | iy, return_index=True, return_inverse=True)
+        count = np.bincount(inverse, minlength=len(keys))
+        sum_x = np.bincount(inverse, weights=x, minlength=len(keys))
+        sum_y = np.bincount(inverse, weights=y, minlength=len(keys))
+        # Cells still holding several points at max_zoom never split
+        expansion = np.full(len(keys), -1, dtype=np.int64)
+        self.levels: List[ClusterLevel] = [None] * (self.max_zoom + 1)
+        self.levels[self.max_zoom] = ClusterLevel(keys, sum_x / count, sum_y / count, count, rows[first], expansion)
+
+        for zoom in range(self.max_zoom - 1, -1, -1):
+            child_bits = zoom + 1 + CELL_BITS
+            child_ix, child_iy = keys >> child_bits, keys & ((1 << child_bits) - 1)
+            parent_bits = child_bits - 1
+            parent_keys, first_child, inverse, children = np.unique(
+                ((child_ix >> 1) << parent_bits) | (child_iy >> 1), return_index=True, return_inverse=True, return_counts=True,
+            )
+            expansion = np.where(children > 1, zoom + 1, expansion[first_child])
+            sum_x = np.bincount(inverse, weights=sum_x, minlength=len(parent_keys))
+            sum_y = np.bincount(inverse, weights=sum_y, minlength=len(parent_keys))
+            count = np.bincount(inverse, weights=count, minlength=len(parent_keys)).astype(np.int64)
+            first = self.levels[zoom + 1].first[first_child]
+            keys = parent_keys
+            self.levels[zoom] = ClusterLevel(keys, sum_x / count, sum_y / count, count, first, expansion)
+
+        logger.info(
+            f"[CLUSTERS] Indexed {self.size} points, {len(self.levels[self.max_zoom].keys)} cells at zoom {self.max_zoom} "
+            f"in {time.perf_counter() - started:.3f}s"
+        )
+
+    def clusters(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float, zoom: float, limit: int = 0) -> List[dict]:
+        """
+        Clusters and single points of `zoom` within the box (`min_lon > max_lon` crosses the
+        antimeridian), largest first. Single points carry their properties.
+        """
+        z = min(self.max_zoom, max(0, int(zoom)))
+        level = self.levels[z]
+        in_lon = (level.lon >= min_lon) & (level.lon <= max_lon) if min_lon <= max_lon else (level.lon >= min_lon) | (level.lon <= max_lon)
+        selected = np.flatnonzero(in_lon & (level.lat >= min_lat) & (level.lat <= max_lat))
+        selected = selected[np.argsort(-level.count[selected], kind="stable")]
+        if limit:
+            selected = selected[:limit]
+
+        results = []
+        for i, lat, lon, count, first, expansion in zip(
+            selected.tolist(), level.lat[selected].tolist(), level.lon[selected].tolist(),
+            level.count[selected].tolist(), level.first[selected].tolist(), level.expansion_zoom[selected].tolist(),
+        ):
+            if count == 1:
+                results.append({"type": "point", **self.point_properties(first)})
+            else:
+                results.append({
+                    "type": "cluster",
+                    "id": f"{z}:{int(level.keys[i])}",
+                    "lat": round(lat, 6),
+                    "lon": round(lon, 6),
+                    "count": count,
+                    "expansion_zoom": expansion if expansion >= 0 else None,
+                })
+        return results
+
+
+class ClusterIndexCache:
+    """
+    Process-wide LRU of built cluster indexes with a time to live, so panning and zooming reuse
+    the index of a species instead of reloading its points. Concurrent builds of the same key
+    share one build. Empty indexes are not kept: their points may be still being collected.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or settings.MAP_CLUSTER_CACHE_SIZE
+        self._entries: OrderedDict[Hashable, tuple[ClusterIndex, float]] = OrderedDict()
+        self.hits = 0
+        self.builds = 0
+
+    async def get(self, key: Hashable, build: Callable[[], Awaitable[ClusterIndex]]) -> ClusterIndex:
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        return await single_flight.do(("clusters", key), lambda: self._build(key, build))
+
+    async def _build(self, key: Hashable, build: Callable[[], Awaitable[ClusterIndex]]) -> ClusterIndex:
+        index = await build()
+        self.builds += 1
+        if not index.size:
+            return index
+        self._entries[key] = (index, time.monotonic() + settings.MAP_CLUSTER_TTL_MINUTES * 60)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return index
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+
+cluster_indexes = ClusterIndexCache()
+
+
+# eBird fields shown for single points
+EBIRD_POINT_FIELDS = ["obs_id", "species", "sci_name", "lat", "lon", "location", "how_many"]
+
+
+async def build_cluster_index(lat: np.ndarray, lon: np.ndarray, point_properties: Callable[[int], dict]) -> ClusterIndex:
+    """`ClusterIndex` built in the default executor: large indexes take a noticeable CPU time."""
+    return await asyncio.get_running_loop().run_in_executor(None, ClusterIndex, lat, lon, point_properties)
+
+
+async def ebird_cluster_index(species: str, days_back: int) -> ClusterIndex:
+    """
+    Cluster index over the stored eBird observations of a species; never collects from eBird,
+    so an empty index means the species has to be collected first (see `EtlJobKind.EBIRD_RUN_ETL`).
+    """
+    async def build() -> ClusterIndex:
+        batch = await EBirdObservationStore().find_batch(
+            fields=EBIRD_POINT_FIELDS, limit=settings.MAP_CLUSTER_MAX_POINTS,
+            species=species, obs_since=datetime.utcnow() - timedelta(days=days_back),
+        )
+
+        def point(row: int) -> dict:
+            return {
+                "obs_id": batch.obs_id[row],
+                "species": batch.species[row],
+                "sci_name": batch.sci_name[row],
+                "lat": float(batch.lat[row]),
+                "lon": float(batch.lon[row]),
+                "date": batch.date[row],
+                "location": batch.location[row],
+                "how_many": batch.how_many[row],
+            }
+
+        return await build_cluster_index(batch.lat, batch.lon, point)
+
+    return await cluster_indexes.get(("ebird", species.strip().casefold(), days_back), build)
+
+
+async def local_cluster_index(species: Optional[str]) -> ClusterIndex:
+    """Cluster index over the user observations of a species (all species if None), without images."""
+    async def build() -> ClusterIndex:
+        query = ObservationStore.build_query(species=species, location={"$exists": True})
+        records = await ObservationStore().find(query, limit=settings.MAP_CLUSTER_MAX_POINTS, include_image=False)
+        lat = np.array([record["lat"] for record in records], dtype=np.float64)
+        lon = np.array([record["lon"] for record in records], dtype=np.float64)
+        return await build_cluster_index(lat, lon, records.__getitem__)
+
+    return await cluster_indexes.get(("local", (species or "").strip().casefold()), build)
@@ -0,0 +1,190 @@
+import json
+import logging
+import math
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import List, Optional
+
+from app.core.config import settings
+from app.services.disl.geo import KM_PER_DEGREE
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_PATH = Path(__file__).parent / "data" / "country_boundaries.json"
+# Side of the square grid cells boundary segments are indexed by, in degrees
+GRID_DEGREES = 1.0
+ROWS = int(180 / GRID_DEGREES)
+COLS = int(360 / GRID_DEGREES)
+# Containment is precomputed for one reference point per cell, the cell center nudged off the
+# rounded coordinates of the bundle so that no boundary can pass exactly through it
+REFERENCE_OFFSET = math.pi * 1e-4
+
+
+def _cell(lat: float, lon: float) -> int:
+    row = min(ROWS - 1, max(0, int((lat + 90) // GRID_DEGREES)))
+    col = min(COLS - 1, max(0, int((lon + 180) // GRID_DEGREES)))
+    return row * COLS + col
+
+
+def _reference(cell: int) -> tuple[float, float]:
+    row, col = divmod(cell, COLS)
+    return (row + 0.5) * GRID_DEGREES - 90 + REFERENCE_OFFSET, (col + 0.5) * GRID_DEGREES - 180 + REFERENCE_OFFSET
+
+
+def _first_index(value: float, origin: float) -> int:
+    """First row/column whose reference coordinate is above `value`."""
+    return math.ceil((value + origin - REFERENCE_OFFSET) / GRID_DEGREES - 0.5)
+
+
+def _last_index(value: float, origin: float) -> int:
+    """Last row/column whose reference coordinate is below `value`."""
+    return math.floor((value + origin - REFERENCE_OFFSET) / GRID_DEGREES - 0.5)
+
+
+class CountryBoundaries:
+    """
+    Offline reverse geocoding to ISO country codes over the bundled Natural Earth boundaries
+    (built by `app.devtools.build_country_boundaries`).
+
+    Boundary segments are indexed in a 1-degree grid, together with the country containing a
+    reference point near every cell center (found with one scanline pass at load). A lookup only
+    walks the segments of the point's cell: crossings between the point and the reference decide
+    containment, and segments closer than COUNTRY_BORDER_MARGIN_KM make the answer ambiguous. The simplified
+    boundaries are only trusted when exactly one country is in reach; otherwise `lookup` returns
+    None and callers fall back to the online geocoder.
+    """
+
+    def __init__(self, path: Path = BUNDLE_PATH):
+        self.path = path
+        self.codes: List[Optional[str]] = []
+        self.names: List[Optional[str]] = []
+        self.continents: List[Optional[str]] = []
+        self.unresolved_areas: dict[str, tuple[float, float, float, float]] = {}
+        # cell -> [(x1, y1, x2, y2, country), ...] for segments within the margin of the cell
+        self._segments: dict[int, List[tuple]] = {}
+        # cell -> country containing the cell's reference point
+        self._references: dict[int, int] = {}
+        self.margin_km = settings.COUNTRY_BORDER_MARGIN_KM
+        self.counters: dict[str, int] = defaultdict(int)
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.codes)
+
+    def load(self):
+        started = time.perf_counter()
+        bundle = json.loads(self.path.read_text(encoding="utf-8"))
+        codes, names, continents = [], [], []
+        segments: dict[int, List[tuple]] = defaultdict(list)
+        # row -> country -> x of the ring crossings of the row's reference latitude
+        crossings: dict[int, dict[int, List[float]]] = defaultdict(lambda: defaultdict(list))
+        margin_lat = self.margin_km / KM_PER_DEGREE
+
+        for country, entry in enumerate(bundle["countries"]):
+            codes.append(entry["code"])
+            names.append(entry["name"])
+            continents.append(entry["continent"])
+            for flat in entry["rings"]:
+                points = list(zip(flat[0::2], flat[1::2]))
+                for (x1, y1), (x2, y2) in zip(points, points[1:]):
+                    segment = (x1, y1, x2, y2, country)
+                    cos_lat = max(0.01, math.cos(math.radians(min(89.9, max(abs(y1), abs(y2)) + margin_lat))))
+                    margin_lon = margin_lat / cos_lat
+                    first = _cell(min(y1, y2) - margin_lat, min(x1, x2) - margin_lon)
+                    last = _cell(max(y1, y2) + margin_lat, max(x1, x2) + margin_lon)
+                    for row in range(first // COLS, last // COLS + 1):
+                        for col in range(first % COLS, last % COLS + 1):
+                            segments[row * COLS + col].append(segment)
+                    row_first = max(0, _first_index(min(y1, y2), 90))
+                    row_last = min(ROWS - 1, _last_index(max(y1, y2), 90))
+                    for row in range(row_first, row_last + 1):
+                        y = (row + 0.5) * GRID_DEGREES - 90 + REFERENCE_OFFSET
+                        if (y1 > y) != (y2 > y):
+                            crossings[row][country].append(x1 + (y - y1) * (x2 - x1) / (y2 - y1))
+
+        references: dict[int, int] = {}
+        for row, by_country in crossings.items():
+            for country, xs in by_country.items():
+                xs.sort()
+                for west, east in zip(xs[0::2], xs[1::2]):
+                    col_first = max(0, _first_index(west, 180))
+                    col_last = min(COLS - 1, _last_index(east, 180))
+                    for col in range(col_first, col_last + 1):
+                        references[row * COLS + col] = country
+
+        # Swap in one go so concurrent readers never see a half-built index
+        self.codes, self.names, self.continents = codes, names, continents
+        self.unresolved_areas = {code: tuple(box) for code, box in bundle.get("unresolved_areas", {}).items()}
+        self._segments, self._references = dict(segments), references
+        logger.info(
+            f"[COUNTRIES] Indexed {len(codes)} countries, {sum(map(len, segments.values()))} cell segments "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def countries_in_reach(self, lat: float, lon: float) -> set[int]:
+        """Countries containing the point or with a boundary closer than the margin."""
+        cell = _cell(lat, lon)
+        reference = self._references.get(cell)
+        inside = {reference} if reference is not None else set()
+        near = set()
+        cy, cx = _reference(cell)
+        kx = math.cos(math.radians(lat)) * KM_PER_DEGREE
+        margin_sq = self.margin_km ** 2
+        for x1, y1, x2, y2, country in self._segments.get(cell, ()):
+            # Walk from the point to the reference: east/west at the point's latitude, then north/south.
+            # Every crossed boundary toggles being inside its country; the half-open tests match
+            # ray casting towards the east, so vertices on the way are counted once
+            if (y1 > lat) != (y2 > lat):
+                x = x1 + (lat - y1) * (x2 - x1) / (y2 - y1)
+                if min(lon, cx) < x <= max(lon, cx):
+                    inside ^= {country}
+            if (x1 > cx) != (x2 > cx):
+                y = y1 + (cx - x1) * (y2 - y1) / (x2 - x1)
+                if min(lat, cy) < y < max(lat, cy):
+                    inside ^= {country}
+            if country not in near:
+                # Point to segment distance in a local equirectangular projection, in km
+                ax, ay = (x1 - lon) * kx, (y1 - lat) * KM_PER_DEGREE
+                bx, by = (x2 - lon) * kx, (y2 - lat) * KM_PER_DEGREE
+                dx, dy = bx - ax, by - ay
+                length_sq = dx * dx + dy * dy
+                t = 0.0 if length_sq == 0 else min(1.0, max(0.0, -(ax * dx + ay * dy) / length_sq))
+                px, py = ax + t * dx, ay + t * dy
+                if px * px + py * py <= margin_sq:
+                    near.add(country)
+        return inside | near
+
+    def lookup(self, lat: float, lon: float) -> Optional[str]:
+        """
+        ISO 3166-1 alpha-2 code of the country at (lat, lon), or None when the bundled boundaries
+        cannot tell for sure (near a border or coast shared with another country, outside every
+        country, disputed areas, microstates below the bundle resolution).
+        """
+        self.ensure_loaded()
+        for min_lat, min_lon, max_lat, max_lon in self.unresolved_areas.values():
+            if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                self.counters["unresolved_area"] += 1
+                return None
+        countries = self.countries_in_reach(lat, lon)
+        if len(countries) != 1:
+            self.counters["border" if countries else "outside"] += 1
+            return None
+        code = self.codes[countries.pop()]
+        self.counters["resolved" if code else "disputed"] += 1
+        return code
+
+    def stats(self) -> dict:
+        lookups = sum(self.counters.values())
+        return {
+            **self.counters,
+            "lookups": lookups,
+            "offline_rate": round(self.counters["resolved"] / lookups, 3) if lookups else None,
+        }
+
+
+country_boundaries = CountryBoundaries()
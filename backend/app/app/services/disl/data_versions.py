@@ -0,0 +1,44 @@
+import logging
+from datetime import datetime
+
+from pymongo import ReturnDocument
+
+from app.db.session import MongoDatabase
+
+logger = logging.getLogger(__name__)
+
+DATA_VERSIONS_COLLECTION = "map_data_versions"
+
+# Sources whose derived map data (vector tiles) is versioned
+EBIRD = "ebird"
+LOCAL = "local"
+
+
+class DataVersionStore:
+    """
+    A counter per observation source in `map_data_versions`, bumped whenever new observations
+    are stored. Derived artifacts (e.g. cached vector tiles) embed the versions they were built
+    from, so new data invalidates them everywhere without tracking individual files.
+    """
+
+    def __init__(self):
+        self.collection = MongoDatabase()[DATA_VERSIONS_COLLECTION]
+
+    async def bump(self, source: str) -> int:
+        doc = await self.collection.find_one_and_update(
+            {"_id": source},
+            {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc["version"]
+
+    async def current(self) -> dict[str, int]:
+        return {doc["_id"]: doc["version"] async for doc in self.collection.find()}
+
+    async def safe_bump(self, source: str):
+        """`bump` for ingestion paths, where a failed bump must not fail the write it follows."""
+        try:
+            await self.bump(source)
+        except Exception as e:
+            logger.error(f"[DATA-VERSIONS] Failed to bump {source}: {e}")
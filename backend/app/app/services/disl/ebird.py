@@ -1,264 +1,391 @@
 import asyncio
 import logging
-from typing import Any, List
-from app.services.disl.base import ETLProvider
-from app.models.raw_data import DataSource, ETLStatus
+import numpy as np
+from datetime import datetime
+from typing import Any, AsyncIterator, List
+from app.services.disl import data_versions
+from app.services.disl.base import ETLProvider, Pipeline
+from app.services.disl.data_versions import DataVersionStore
+from app.services.disl.http_clients import Upstream
+from app.services.disl.raw_store import RawPayloadStore
+from app.services.disl.ebird_batch import ObservationBatch
+from app.services.disl.streaming import iter_json_items
+from app.services.disl.ebird_store import EBirdObservationStore, EBirdWatermarkStore, observation_key, parse_obs_dt
+from app.services.disl.geo import bounding_box
+from app.services.disl.singleflight import coalesce
+from app.services.disl.taxonomy import taxonomy_index
+from app.models.raw_data import DataSource
 from app.core.config import settings
-import httpx
+
+# Major countries queried for global ("world") coverage
+WORLD_COUNTRY_CODES = [
+    "US", "CA", "GB", "DE", "FR", "ES", "IT", "AU", "BR", "IN", "CN", "RU", "ZA", "MX", "AR", "JP"
+]
+
+# eBird only serves recent observations up to 30 days back
+EBIRD_MAX_BACK_DAYS = 30
+
+# Largest radius accepted by the eBird geo endpoints
+EBIRD_MAX_GEO_DIST_KM = 50
+
+# Region key of geo (lat/lng radius) requests in `last_errors`
+GEO_REGION = "geo"
 
 class EBirdProvider(ETLProvider):
-    def __init__(self):
+    upstream = Upstream.EBIRD
+
+    def __init__(self, concurrency: int | None = None):
         super().__init__(DataSource.EBIRD)
         self.api_key = settings.EBIRD_API_KEY
-        self.base_url = "https://api.ebird.org/v2/data/obs/"
-        self.taxonomy_url = "https://api.ebird.org/v2/ref/taxonomy/ebird"
+        self.base_url = settings.EBIRD_API_URL
         self.logger = logging.getLogger("app.services.disl.ebird")
-        self.taxonomy_cache = None
+        self.concurrency = concurrency or settings.EBIRD_FETCH_CONCURRENCY
+        # Per-region errors from the last fetch, so callers can report partial results
+        self.last_errors: dict[str, str] = {}
 
     async def get_species_codes(self, common_name: str, limit: int = 5) -> List[str]:
-        if not self.taxonomy_cache:
-            async with httpx.AsyncClient(timeout=10) as client:
-                resp = await client.get(self.taxonomy_url, params={"fmt": "json"})
-                resp.raise_for_status()
-                self.taxonomy_cache = resp.json()
-        
-        name_l = common_name.lower()
-        matches = []
-        
-        # Search for any species containing the name in common name
-        for species in self.taxonomy_cache:
-            # Prioritize exact match if possible, but collect all partials
-            if name_l in species.get("comName", "").lower():
-                matches.append(species)
-            elif name_l in species.get("sciName", "").lower():
-                matches.append(species)
-        
-        matches.sort(key=lambda x: (
-            x.get("comName", "").lower() != name_l, # Exact match first (False < True)
-            len(x.get("comName", "")) # Then shorter names
-        ))
-        
-        codes = []
-        seen = set()
-        for m in matches:
-            code = m.get("speciesCode")
-            if code and code not in seen:
-                codes.append(code)
-                seen.add(code)
-                if len(codes) >= limit:
-                    break
-                    
+        await taxonomy_index.ensure_loaded()
+        codes = taxonomy_index.search(common_name, limit=limit)
         if not codes:
             raise ValueError(f"Species '{common_name}' not found in eBird taxonomy.")
-            
         return codes
 
-    async def fetch(self, region_code: str = "world", species_code: str = "", max_results: int = 100) -> Any:
-        print(f"[DEBUG][EBIRD-ETL] Fetching eBird data for region: {region_code}, species: {species_code}, max_results: {max_results}")
+    @staticmethod
+    def _region_url(base_url: str, region_code: str, species_code: str) -> str:
+        return f"{base_url}{region_code}/recent/{species_code}" if species_code else f"{base_url}{region_code}/recent"
+
+    @staticmethod
+    def _geo_url(base_url: str, species_code: str) -> str:
+        return f"{base_url}geo/recent/{species_code}" if species_code else f"{base_url}geo/recent"
+
+    @staticmethod
+    def _dedupe_key(item: dict) -> str | None:
+        return observation_key(item) or item.get("obsId")
+
+    async def _stream(self, region_code: str, url: str, params: dict, semaphore: asyncio.Semaphore) -> AsyncIterator[dict]:
+        """
+        Stream one eBird request item by item, retrying with backoff.
+        The semaphore is only held while a request is in flight so backoff sleeps do not block other regions.
+        A retry after a partial response may repeat items; consumers dedupe by observation key.
+        Raises the last error once all attempts are exhausted.
+        """
         headers = {"X-eBirdApiToken": self.api_key}
-        params = {"maxResults": max_results}
-        retries = 3
-        if region_code.lower() == "world":
-            # List of major countries for global coverage
-            country_codes = [
-                "US", "CA", "GB", "DE", "FR", "ES", "IT", "AU", "BR", "IN", "CN", "RU", "ZA", "MX", "AR", "JP"
-            ]
-            all_results = []
-            seen_obs = set()
-            for country in country_codes:
-                url = f"{self.base_url}{country}/recent/{species_code}" if species_code else f"{self.base_url}{country}/recent"
-                for attempt in range(retries):
-                    print(f"[DEBUG][EBIRD-ETL] Fetch attempt {attempt+1} for {country}")
-                    try:
-                        async with httpx.AsyncClient(timeout=10) as client:
-                            resp = await client.get(url, headers=headers, params=params)
-                            resp.raise_for_status()
-                            data = resp.json()
-                            print(f"[DEBUG][EBIRD-ETL] {country}: {len(data)} records")
-                            self.logger.info(f"[EBIRD-ETL] Fetched {len(data)} records from eBird for {country}")
-                            # Deduplicate by obsId
-                            for item in data:
-                                obs_id = item.get("obsId") or item.get("subId")
-                                if obs_id and obs_id not in seen_obs:
-                                    seen_obs.add(obs_id)
-                                    all_results.append(item)
-                            break  # Success, break retry loop
-                    except Exception as e:
-                        print(f"[DEBUG][EBIRD-ETL] Fetch attempt {attempt+1} failed for {country}: {e}")
-                        self.logger.warning(f"[EBIRD-ETL] Fetch attempt {attempt+1} failed for {country}: {e}")
-                        await asyncio.sleep(2 * (attempt + 1))
-            print(f"[DEBUG][EBIRD-ETL] Aggregated {len(all_results)} unique records from major countries.")
-            return all_results
-        else:
-            url = f"{self.base_url}{region_code}/recent/{species_code}" if species_code else f"{self.base_url}{region_code}/recent"
-            for attempt in range(retries):
-                print(f"[DEBUG][EBIRD-ETL] Fetch attempt {attempt+1} for {region_code}")
-                try:
-                    async with httpx.AsyncClient(timeout=10) as client:
-                        resp = await client.get(url, headers=headers, params=params)
+        max_results = params["maxResults"]
+        retries = settings.EBIRD_FETCH_RETRIES
+        for attempt in range(retries):
+            try:
+                count = 0
+                async with semaphore:
+                    await self.throttle()
+                    async with self.get_client().stream("GET", url, headers=headers, params=params, timeout=10) as resp:
                         resp.raise_for_status()
-                        print(f"[DEBUG][EBIRD-ETL] Response status: {resp.status_code}")
-                        print(f"[DEBUG][EBIRD-ETL] Response JSON length: {len(resp.json())}")
-                        self.logger.info(f"[EBIRD-ETL] Fetched {len(resp.json())} records from eBird for {region_code}")
-                        return resp.json()
-                except Exception as e:
-                    print(f"[DEBUG][EBIRD-ETL] Fetch attempt {attempt+1} failed: {e}")
-                    self.logger.warning(f"[EBIRD-ETL] Fetch attempt {attempt+1} failed: {e}")
-                    await asyncio.sleep(2 * (attempt + 1))
-            print(f"[DEBUG][EBIRD-ETL] All fetch attempts failed for {region_code}")
-            self.logger.error(f"[EBIRD-ETL] All fetch attempts failed for {region_code}")
-            return []
+                        async for item in iter_json_items(resp):
+                            count += 1
+                            yield item
+                self.logger.info(f"[EBIRD-ETL] Fetched {count} records from eBird for {region_code}")
+                if count >= max_results:
+                    self.logger.warning(f"[EBIRD-ETL] {region_code} hit maxResults={max_results}, older observations may be missing")
+                return
+            except Exception as e:
+                self.logger.warning(f"[EBIRD-ETL] Fetch attempt {attempt+1} failed for {region_code}: {e}")
+                if attempt + 1 == retries:
+                    raise
+                await asyncio.sleep(2 * (attempt + 1))
+
+    def _request_pipeline(self, requests: List[tuple[str, str, str, dict]]) -> Pipeline:
+        """
+        requests -> fetch -> dedupe pipeline over `(region_code, species_code, url, params)` requests,
+        yielding raw items as responses are parsed, each observation once. Failed requests do not abort
+        the run; they are collected per region in `self.last_errors`, which is complete once the
+        pipeline has been drained.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        errors = self.last_errors = {}
+        seen = set()
+
+        async def fetch_request(request: tuple[str, str, str, dict]):
+            region_code, species_code, url, params = request
+            try:
+                async for item in self._stream(region_code, url, params, semaphore):
+                    yield item
+            except Exception as e:
+                message = f"{species_code}: {e}" if species_code else str(e)
+                errors[region_code] = f"{errors[region_code]}; {message}" if region_code in errors else message
+                self.logger.error(f"[EBIRD-ETL] All fetch attempts failed for {region_code} {species_code}: {e}")
+
+        return (
+            Pipeline("ebird-observations", queue_size=settings.EBIRD_STREAM_QUEUE_SIZE)
+            .source("requests", requests)
+            # Every request starts at once; the semaphore bounds requests in flight so backoff sleeps do not hold a slot
+            .stage("fetch", fetch_request, concurrency=len(requests))
+            .stage("dedupe", lambda item: item if self.is_unseen(item, seen) else None)
+        )
+
+    def observation_pipeline(self, region_codes: List[str], species_codes: List[str], max_results: int = 100, back: int | None = None) -> Pipeline:
+        """
+        Recent observations of every region/species combination; see `_request_pipeline`.
+        Normalization is left to the consumer, in bulk with `normalize_batch`.
+        """
+        params = {"maxResults": max_results}
+        if back:
+            params["back"] = back
+        requests = [
+            (region_code, species_code, self._region_url(self.base_url, region_code, species_code), params)
+            for species_code in species_codes
+            for region_code in region_codes
+        ]
+        return self._request_pipeline(requests)
+
+    def geo_pipeline(self, lat: float, lng: float, dist_km: float | None = None, species_codes: List[str] | None = None, max_results: int = 100, back: int | None = None) -> Pipeline:
+        """
+        Recent observations within `dist_km` of a point (eBird `geo/recent`), one request per species
+        code instead of one per country. Errors are reported under the `GEO_REGION` key.
+        """
+        dist_km = min(dist_km or settings.EBIRD_GEO_DEFAULT_DIST_KM, EBIRD_MAX_GEO_DIST_KM)
+        params = {"lat": round(lat, 2), "lng": round(lng, 2), "dist": round(dist_km), "maxResults": max_results}
+        if back:
+            params["back"] = back
+        requests = [
+            (GEO_REGION, species_code, self._geo_url(self.base_url, species_code), params)
+            for species_code in species_codes or [""]
+        ]
+        return self._request_pipeline(requests)
+
+    @staticmethod
+    def geo_area(lat: float, lng: float, dist_km: float | None = None) -> tuple[float, float, float, float]:
+        """Bounding box of the circle a `geo_pipeline` searches."""
+        return bounding_box(lat, lng, min(dist_km or settings.EBIRD_GEO_DEFAULT_DIST_KM, EBIRD_MAX_GEO_DIST_KM))
+
+    async def fetch_many(self, region_codes: List[str], species_codes: List[str], max_results: int = 100, back: int | None = None) -> tuple[List[dict], dict[str, str]]:
+        """
+        Fetch every region/species combination concurrently and collect the deduplicated raw items.
+        Failed regions are reported in the returned `{region_code: error}` mapping next to the partial results.
+        """
+        pipeline = self.observation_pipeline(region_codes, species_codes, max_results, back)
+        results = [item async for item in pipeline.run()]
+        return results, self.last_errors
+
+    async def fetch(self, region_code: str = "world", species_code: str = "", max_results: int = 100) -> Any:
+        self.logger.info(f"[EBIRD-ETL] Fetching eBird data for region: {region_code}, species: {species_code}, max_results: {max_results}")
+        region_codes = WORLD_COUNTRY_CODES if region_code.lower() == "world" else [region_code]
+        results, self.last_errors = await self.fetch_many(region_codes, [species_code or ""], max_results)
+        return results
+
+    def normalize_item(self, item: dict) -> dict | None:
+        obs_id = self._dedupe_key(item)
+        if not obs_id:
+            return None
+        # Always fill 'species' with comName, sciName, or empty string
+        species = item.get("comName") or item.get("sciName") or ""
+        return {
+            "species": species,
+            "sci_name": item.get("sciName"),
+            "lat": item.get("lat"),
+            "lon": item.get("lng"),
+            "date": item.get("obsDt"),
+            "location": item.get("locName"),
+            "how_many": item.get("howMany"),
+            "species_code": item.get("speciesCode"),
+            "sub_id": item.get("subId"),
+            "obs_id": obs_id
+        }
+
+    def is_unseen(self, item: dict, seen: set) -> bool:
+        """True the first time an observation key is met, adding it to `seen`; the dedupe step of `observation_pipeline`."""
+        key = self._dedupe_key(item)
+        if key and key not in seen:
+            seen.add(key)
+            return True
+        return False
+
+    def normalize_batch(self, raw_data: List[dict]) -> ObservationBatch:
+        """Columnar `normalize` for bulk paths; `to_records()` gives the same records as `normalize`."""
+        return ObservationBatch.from_items(raw_data)
 
     def normalize(self, raw_data: Any) -> List[dict]:
-        print(f"[DEBUG][EBIRD-ETL] Normalizing raw data, input length: {len(raw_data) if raw_data else 0}")
         normalized = []
-        for idx, item in enumerate(raw_data):
-            if idx < 3:
-                print(f"[DEBUG][EBIRD-ETL] Raw item {idx}: {item}")
-            obs_id = item.get("subId") or item.get("obsId")
-            if not obs_id:
-                continue
-            # Always fill 'species' with comName, sciName, or empty string
-            species = item.get("comName") or item.get("sciName") or ""
-            normalized.append({
-                "species": species,
-                "sci_name": item.get("sciName"),
-                "lat": item.get("lat"),
-                "lon": item.get("lng"),
-                "date": item.get("obsDt"),
-                "location": item.get("locName"),
-                "how_many": item.get("howMany"),
-                "obs_id": obs_id
-            })
-        print(f"[DEBUG][EBIRD-ETL] Normalized {len(normalized)} records.")
-        self.logger.info(f"[EBIRD-ETL] Normalized {len(normalized)} records.")
+        for item in raw_data or []:
+            record = self.normalize_item(item)
+            if record:
+                normalized.append(record)
+        self.logger.debug(f"[EBIRD-ETL] Normalized {len(normalized)} records.")
+        return normalized
+
+    async def store_stream(self, pipeline: Pipeline, only_new: bool = False, collect: List[dict] | None = None) -> tuple[int, dict | None]:
+        """
+        Add a store stage to an `observation_pipeline` or `geo_pipeline` and drain it: observations are
+        normalized and upserted in columnar batches of `EBIRD_STREAM_BATCH_SIZE` and the raw items are
+        streamed into one compressed raw payload. With `only_new`, observations that are already stored
+        are skipped before any write. Normalized records are appended to `collect` if given.
+        Returns (number of new sightings, newest raw item received, stored before or not).
+        """
+        store = EBirdObservationStore()
+        raw_writer = RawPayloadStore().open_stream(self.source.value, metadata={"type": "raw"})
+        new_count = 0
+        newest, newest_dt = None, datetime.min
+
+        async def write(raw_items: List[dict]):
+            nonlocal new_count, newest, newest_dt
+            # The pipeline already dropped items without an observation key, so rows line up with raw_items
+            observations = self.normalize_batch(raw_items)
+            records = observations.to_records()
+            if collect is not None:
+                collect.extend(records)
+            # Before the only_new filter: a window of already stored sightings still moves the watermark
+            index = observations.newest()
+            if index is not None:
+                obs_dt = observations.obs_dt[index].astype("datetime64[us]").item()
+                if obs_dt > newest_dt:
+                    newest, newest_dt = raw_items[index], obs_dt
+            if only_new:
+                existing = await store.existing_keys(observations.obs_id.tolist())
+                if existing:
+                    keep = np.array([key not in existing for key in observations.obs_id], dtype=bool)
+                    raw_items = [raw for raw, kept in zip(raw_items, keep) if kept]
+                    records = [record for record, kept in zip(records, keep) if kept]
+                    observations = observations.take(keep)
+            for raw in raw_items:
+                raw_writer.add(raw)
+            new_count += await store.upsert_batch(observations, records)
+
+        await pipeline.stage("store", write, batch_size=settings.EBIRD_STREAM_BATCH_SIZE).drain()
+        await raw_writer.close()
+        return new_count, newest
+
+    async def run_etl(
+        self,
+        region_code: str = "world",
+        species: str = "",
+        max_results: int = 100,
+        lat: float | None = None,
+        lng: float | None = None,
+        dist_km: float | None = None,
+    ) -> List[dict]:
+        """
+        Fetch, store and return recent observations of a region, or, when `lat`/`lng` are given,
+        within `dist_km` of that point through the eBird geo endpoints (`region_code` is then ignored).
+        """
+        normalized, self.last_errors = await self._run_etl(region_code, species, max_results, lat, lng, dist_km)
         return normalized
 
-    async def run_etl(self, region_code: str = "world", species: str = "", max_results: int = 100) -> List[dict]:
-        print(f"[DEBUG][EBIRD-ETL] Starting ETL for region: {region_code}, species query: {species}")
-        self.logger.info(f"[EBIRD-ETL] Starting ETL for region: {region_code}, species query: {species}")
+    @coalesce
+    async def _run_etl(
+        self, region_code: str, species: str, max_results: int, lat: float | None, lng: float | None, dist_km: float | None
+    ) -> tuple[List[dict], dict[str, str]]:
+        """
+        Shared by concurrent identical `run_etl` calls; returns the per-region errors alongside
+        the results so every caller sees them, not only the one that started the run.
+        """
+        geo = lat is not None and lng is not None
+        area = f"{dist_km or settings.EBIRD_GEO_DEFAULT_DIST_KM}km around {lat},{lng}" if geo else f"region: {region_code}"
+        self.logger.info(f"[EBIRD-ETL] Starting ETL for {area}, species query: {species}")
         
         species_codes = []
         if species:
             try:
                 species_codes = await self.get_species_codes(species, limit=5)
-                print(f"[DEBUG][EBIRD-ETL] Resolved '{species}' to {len(species_codes)} codes: {species_codes}")
+                self.logger.debug(f"[EBIRD-ETL] Resolved '{species}' to {len(species_codes)} codes: {species_codes}")
             except Exception as e:
-                print(f"[ERROR][EBIRD-ETL] {e}")
+                self.logger.error(f"[EBIRD-ETL] {e}")
                 
         if not species_codes:
             if species:
-                return []
+                return [], {}
             else:
                 species_codes = [""]
 
-        # Aggregate results across all codes
-        aggregated_results = []
-        seen_global = set()
-
-        for sp_code in species_codes:
-            print(f"[DEBUG][EBIRD-ETL] Fetching for species code: {sp_code}")
-            
-            # If region_code is 'world', fetch from major countries
-            if region_code.lower() == "world":
-                country_codes = [
-                    "US", "CA", "GB", "DE", "FR", "ES", "IT", "AU", "BR", "IN", "CN", "RU", "ZA", "MX", "AR", "JP"
-                ]
-                results_for_code = []
-                for country in country_codes:
-                    raw = await self.fetch(country, sp_code, max_results)
-                    results_for_code.extend(raw)
-                
-                # Deduplicate this batch
-                for item in results_for_code:
-                    obs_id = item.get("subId") or item.get("obsId")
-                    if obs_id and obs_id not in seen_global:
-                        seen_global.add(obs_id)
-                        aggregated_results.append(item)
-            else:
-                 raw = await self.fetch(region_code, sp_code, max_results)
-                 for item in raw:
-                    obs_id = item.get("subId") or item.get("obsId")
-                    if obs_id and obs_id not in seen_global:
-                        seen_global.add(obs_id)
-                        aggregated_results.append(item)
-
-        print(f"[DEBUG][EBIRD-ETL] Total unique aggregated records: {len(aggregated_results)}")
-        
-        if not aggregated_results:
-             return []
+        if geo:
+            # One bounded request per species code instead of a fan-out over countries
+            pipeline = self.geo_pipeline(lat, lng, dist_km, species_codes, max_results)
+        else:
+            # Fan out across all species codes and regions at once, storing while parsing
+            region_codes = WORLD_COUNTRY_CODES if region_code.lower() == "world" else [region_code]
+            pipeline = self.observation_pipeline(region_codes, species_codes, max_results)
+        normalized: List[dict] = []
+        new_count, _ = await self.store_stream(pipeline, collect=normalized)
+        if new_count:
+            await DataVersionStore().safe_bump(data_versions.EBIRD)
 
-        normalized = self.normalize(aggregated_results)
-        await self.save_raw_data(aggregated_results)
-        await self.save_normalized_data(normalized)
-        
         self.logger.info(f"[EBIRD-ETL] ETL complete. Saved {len(normalized)} records.")
-        return normalized
+        return normalized, self.last_errors
+
+    @staticmethod
+    def _back_window(watermark: dict | None) -> int:
+        """
+        Days of history to request from eBird (`back`, 1-30). Starts one day before the watermark
+        so late-submitted checklists are still picked up, and widens automatically to backfill downtime.
+        """
+        if not watermark or not watermark.get("last_obs_dt"):
+            return EBIRD_MAX_BACK_DAYS
+        gap = datetime.utcnow() - watermark["last_obs_dt"]
+        return max(1, min(EBIRD_MAX_BACK_DAYS, gap.days + 2))
+
+    async def run_incremental(
+        self, region_code: str, species_code: str = "", max_results: int | None = None, bump_version: bool = True,
+    ) -> int:
+        """
+        Collect only what is new for a region/species since its watermark, streaming from fetch to store.
+        Nothing is written when the window holds no unseen observations. Returns the number of new sightings.
+        Runs of many regions pass `bump_version=False` and bump the eBird data version once at their end.
+        """
+        max_results = max_results or settings.EBIRD_INCREMENTAL_MAX_RESULTS
+        watermarks = EBirdWatermarkStore()
+        watermark = await watermarks.get(region_code, species_code)
+        back = self._back_window(watermark)
+
+        new_count, newest = await self.store_stream(
+            self.observation_pipeline([region_code], [species_code], max_results, back=back), only_new=True
+        )
+        if self.last_errors:
+            raise RuntimeError(self.last_errors[region_code])
+
+        if new_count:
+            self.logger.info(f"[EBIRD-ETL] {region_code}: {new_count} new observations (back={back}d)")
+            if bump_version:
+                await DataVersionStore().safe_bump(data_versions.EBIRD)
+        else:
+            self.logger.info(f"[EBIRD-ETL] {region_code}: nothing new in the last {back} days, skipping")
+
+        await watermarks.advance(
+            region_code,
+            species_code,
+            last_obs_dt=parse_obs_dt(newest.get("obsDt")) if newest else None,
+            last_sub_id=newest.get("subId") if newest else None,
+            new_count=new_count,
+        )
+        return new_count
 
     async def save_raw_data(self, raw_data: Any):
-        await self.store(raw_data, status=ETLStatus.SUCCESS, metadata={"type": "raw"})
+        await self.store_raw(raw_data)
 
-    async def save_normalized_data(self, normalized: List[dict]):
-        await self.store(normalized, status=ETLStatus.SUCCESS, metadata={"type": "normalized"})
+    async def save_observations(self, normalized: List[dict]) -> int:
+        return await EBirdObservationStore().upsert(normalized)
 
+    async def save(self, raw_data: Any, normalized: List[dict]):
+        """
+        Save the raw payload and upsert the normalized observations.
+        """
+        await self.save_raw_data(raw_data)
+        if await self.save_observations(normalized):
+            await DataVersionStore().safe_bump(data_versions.EBIRD)
+
+    @coalesce
     async def get_observations(self, species: str, days_back: int = 30) -> List[dict]:
-        from datetime import datetime, timedelta
-        from app.models.raw_data import RawData, DataSource
+        from datetime import timedelta
 
+        store = EBirdObservationStore()
+        now = datetime.utcnow()
+        obs_since = now - timedelta(days=days_back)
         # Use a shorter cache window (1 hour) to ensure fresh data
-        one_hour_ago = datetime.utcnow() - timedelta(hours=1)
-        
-        def extract_obs(raw_docs):
-            obs_list = []
-            species_lower = species.lower()
-            for r in raw_docs:
-                if r.metadata and r.metadata.get('type') != 'normalized':
-                    continue
-                if isinstance(r.data, list):
-                    for item in r.data:
-                        if isinstance(item, dict):
-                            item_species = (item.get('species') or '').lower()
-                            item_sci_name = (item.get('sci_name') or '').lower()
-                            if species_lower in item_species or species_lower in item_sci_name:
-                                obs_list.append(item)
-            return obs_list
-
-        cursor = self.db['raw_data'].find({
-            'source': DataSource.EBIRD.value,
-            'fetched_at': {'$gte': one_hour_ago}
-        }).sort('fetched_at', -1).limit(500)
-        
-        results = []
-        async for doc in cursor:
-            doc['id'] = str(doc['_id'])
-            del doc['_id']
-            results.append(RawData(**doc))
-        
-        observations = extract_obs(results)
-        
+        one_hour_ago = now - timedelta(hours=1)
+
+        observations = await store.find(species=species, obs_since=obs_since, seen_since=one_hour_ago)
+
         if not observations:
             self.logger.info(f"[EBIRD-PROVIDER] No cached observations for {species}, triggering ETL.")
             await self.run_etl(region_code='world', species=species, max_results=100)
-            
+
             # Re-query with the same 1-hour cache window
-            cursor = self.db['raw_data'].find({
-                'source': DataSource.EBIRD.value,
-                'fetched_at': {'$gte': one_hour_ago}
-            }).sort('fetched_at', -1).limit(500)
-            
-            results = []
-            async for doc in cursor:
-                doc['id'] = str(doc['_id'])
-                del doc['_id']
-                results.append(RawData(**doc))
-            observations = extract_obs(results)
-
-        unique_obs = []
-        seen = set()
-        for obs in observations:
-            obs_id = obs.get("obs_id")
-            if obs_id and obs_id not in seen:
-                seen.add(obs_id)
-                unique_obs.append(obs)
-                
-        return unique_obs
+            observations = await store.find(species=species, obs_since=obs_since, seen_since=one_hour_ago)
+
+        return observations
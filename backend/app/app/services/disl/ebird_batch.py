@@ -0,0 +1,225 @@
+from datetime import datetime
+from operator import itemgetter
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.disl.ebird_store import parse_obs_dt
+
+# datetime64 unit of `obs_dt`: eBird reports observation times to the minute
+OBS_DT_UNIT = "datetime64[m]"
+
+# Raw eBird fields read into a batch
+RAW_FIELDS = ("subId", "speciesCode", "comName", "sciName", "lat", "lng", "obsDt", "locName", "howMany")
+
+
+def parse_obs_dt_array(values: List[Optional[str]]) -> np.ndarray:
+    """Vectorized `parse_obs_dt`; falls back to parsing one by one if any value is not ISO formatted."""
+    try:
+        return np.array(values, dtype=OBS_DT_UNIT)
+    except ValueError:
+        return np.array([parse_obs_dt(value) for value in values], dtype=OBS_DT_UNIT)
+
+
+def _object_column(values: Sequence[Any]) -> np.ndarray:
+    return np.fromiter(values, dtype=object, count=len(values))
+
+
+def _categorize(values: Sequence[Optional[str]]) -> tuple[np.ndarray, np.ndarray]:
+    """Categories (in order of first appearance) and the int32 category index of every value."""
+    lookup = {value: position for position, value in enumerate(dict.fromkeys(values))}
+    index = np.fromiter(map(lookup.__getitem__, values), dtype=np.int32, count=len(values))
+    return np.array([value or "" for value in lookup], dtype=str), index
+
+
+def _column(items: List[dict], field: str) -> List[Any]:
+    try:
+        # eBird items nearly always carry the field: extract at C speed
+        return list(map(itemgetter(field), items))
+    except KeyError:
+        return [item.get(field) for item in items]
+
+
+class ObservationBatch:
+    """
+    Columnar batch of normalized eBird observations, for bulk paths (collection runs, backfills,
+    analytics) where building and re-parsing one dict per observation dominates the CPU time.
+
+    Coordinates are float64 (NaN when missing), `obs_dt` is datetime64[m] (NaT when missing or
+    unparseable) and species codes are categorical: `species_codes[species_index]`. The remaining
+    fields are object arrays holding the values as received.
+    """
+
+    def __init__(
+        self,
+        obs_id: np.ndarray,
+        species_codes: np.ndarray,
+        species_index: np.ndarray,
+        lat: np.ndarray,
+        lon: np.ndarray,
+        obs_dt: np.ndarray,
+        species: np.ndarray,
+        sci_name: np.ndarray,
+        date: np.ndarray,
+        location: np.ndarray,
+        how_many: np.ndarray,
+        sub_id: np.ndarray,
+    ):
+        self.obs_id = obs_id
+        self.species_codes = species_codes
+        self.species_index = species_index
+        self.lat = lat
+        self.lon = lon
+        self.obs_dt = obs_dt
+        self.species = species
+        self.sci_name = sci_name
+        self.date = date
+        self.location = location
+        self.how_many = how_many
+        self.sub_id = sub_id
+
+    def __len__(self) -> int:
+        return len(self.obs_id)
+
+    @classmethod
+    def from_items(cls, items: List[dict]) -> "ObservationBatch":
+        """Normalize raw eBird items; like `EBirdProvider.normalize_item`, items without an observation key are dropped."""
+        columns = [_column(items, field) for field in RAW_FIELDS]
+        keys = [f"{sub_id}:{code}" if sub_id and code else None for sub_id, code in zip(columns[0], columns[1])]
+        if None in keys:
+            keys = [key or item.get("obsId") for key, item in zip(keys, items)]
+            kept = [row for row, key in enumerate(keys) if key]
+            keys = [keys[row] for row in kept]
+            columns = [[column[row] for row in kept] for column in columns]
+        sub_ids, codes, com_names, sci_names, lats, lngs, dates, loc_names, how_many = columns
+        species_codes, species_index = _categorize(codes)
+        return cls(
+            obs_id=_object_column(keys),
+            species_codes=species_codes,
+            species_index=species_index,
+            lat=np.array(lats, dtype=np.float64),
+            lon=np.array(lngs, dtype=np.float64),
+            obs_dt=parse_obs_dt_array(dates),
+            species=_object_column([com_name or sci_name or "" for com_name, sci_name in zip(com_names, sci_names)]),
+            sci_name=_object_column(sci_names),
+            date=_object_column(dates),
+            location=_object_column(loc_names),
+            how_many=_object_column(how_many),
+            sub_id=_object_column(sub_ids),
+        )
+
+    @classmethod
+    def from_documents(cls, docs: List[dict]) -> "ObservationBatch":
+        """
+        Build a batch from `ebird_observations` documents or `normalize` records. Fields left out by a
+        projection (judged on the first document) become None columns.
+        """
+        present = docs[0].keys() if docs else ()
+
+        def objects(field: str) -> np.ndarray:
+            return _object_column(_column(docs, field)) if field in present else np.full(len(docs), None, dtype=object)
+
+        def floats(field: str) -> np.ndarray:
+            return np.array(_column(docs, field), dtype=np.float64) if field in present else np.full(len(docs), np.nan)
+
+        date = objects("date")
+        species_codes, species_index = _categorize(_column(docs, "species_code") if "species_code" in present else [None] * len(docs))
+        return cls(
+            obs_id=objects("obs_id"),
+            species_codes=species_codes,
+            species_index=species_index,
+            lat=floats("lat"),
+            lon=floats("lon"),
+            # Converting the stored datetimes is far slower than parsing the original strings again
+            obs_dt=parse_obs_dt_array(date.tolist()),
+            species=objects("species"),
+            sci_name=objects("sci_name"),
+            date=date,
+            location=objects("location"),
+            how_many=objects("how_many"),
+            sub_id=objects("sub_id"),
+        )
+
+    def take(self, indices: np.ndarray) -> "ObservationBatch":
+        """Rows selected by an index array or boolean mask; species categories are kept."""
+        return ObservationBatch(
+            obs_id=self.obs_id[indices],
+            species_codes=self.species_codes,
+            species_index=self.species_index[indices],
+            lat=self.lat[indices],
+            lon=self.lon[indices],
+            obs_dt=self.obs_dt[indices],
+            species=self.species[indices],
+            sci_name=self.sci_name[indices],
+            date=self.date[indices],
+            location=self.location[indices],
+            how_many=self.how_many[indices],
+            sub_id=self.sub_id[indices],
+        )
+
+    def unique(self) -> "ObservationBatch":
+        """First occurrence of every observation, in the original order."""
+        _, first = np.unique(self.obs_id.astype(str), return_index=True)
+        if len(first) == len(self):
+            return self
+        return self.take(np.sort(first))
+
+    @property
+    def species_code(self) -> np.ndarray:
+        return self.species_codes[self.species_index]
+
+    def obs_datetimes(self) -> List[Optional[datetime]]:
+        """`obs_dt` as Python datetimes (None for NaT), as stored in Mongo."""
+        return self.obs_dt.astype("datetime64[us]").tolist()
+
+    def newest(self) -> Optional[int]:
+        """Row index of the most recent observation, or None if no row has a valid `obs_dt`."""
+        valid = ~np.isnat(self.obs_dt)
+        if not valid.any():
+            return None
+        return int(np.flatnonzero(valid)[self.obs_dt[valid].argmax()])
+
+    def to_records(self) -> List[dict]:
+        """Normalized observation dicts, the shape returned by `EBirdProvider.normalize`."""
+        lat = self.lat.astype(object)
+        lat[np.isnan(self.lat)] = None
+        lon = self.lon.astype(object)
+        lon[np.isnan(self.lon)] = None
+        species_code = self.species_code.astype(object)
+        species_code[species_code == ""] = None
+        return [
+            {
+                "species": species,
+                "sci_name": sci_name,
+                "lat": lat_value,
+                "lon": lon_value,
+                "date": date,
+                "location": location,
+                "how_many": how_many,
+                "species_code": code,
+                "sub_id": sub_id,
+                "obs_id": obs_id,
+            }
+            # Iterating lists is much faster than iterating object arrays
+            for species, sci_name, lat_value, lon_value, date, location, how_many, code, sub_id, obs_id in zip(
+                self.species.tolist(), self.sci_name.tolist(), lat.tolist(), lon.tolist(), self.date.tolist(),
+                self.location.tolist(), self.how_many.tolist(), species_code.tolist(), self.sub_id.tolist(), self.obs_id.tolist(),
+            )
+        ]
+
+    def temporal_counts(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Observation counts by hour of day (24), weekday (7, Monday=0) and month (13, index 0 unused),
+        skipping rows without `obs_dt`.
+        """
+        obs_dt = self.obs_dt[~np.isnat(self.obs_dt)]
+        days = obs_dt.astype("datetime64[D]")
+        hours = ((obs_dt - days) // np.timedelta64(1, "h")).astype(np.int64)
+        # 1970-01-01 was a Thursday
+        weekdays = (days.astype(np.int64) + 3) % 7
+        months = obs_dt.astype("datetime64[M]").astype(np.int64) % 12 + 1
+        return (
+            np.bincount(hours, minlength=24),
+            np.bincount(weekdays, minlength=7),
+            np.bincount(months, minlength=13),
+        )
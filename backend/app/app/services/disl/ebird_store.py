@@ -0,0 +1,300 @@
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+from app.core.config import settings
+from app.db.session import MongoDatabase
+from app.services.disl.taxonomy import taxonomy_index
+
+if TYPE_CHECKING:
+    from app.services.disl.ebird_batch import ObservationBatch
+
+logger = logging.getLogger(__name__)
+
+EBIRD_OBSERVATIONS_COLLECTION = "ebird_observations"
+EBIRD_WATERMARKS_COLLECTION = "ebird_watermarks"
+EBIRD_COLLECTION_RUNS_COLLECTION = "ebird_collection_runs"
+# Species names matching more taxonomy entries than this are filtered by name instead of by code
+MAX_SPECIES_CODES = 200
+
+
+def observation_key(item: dict) -> Optional[str]:
+    """
+    Unique key of an eBird observation: one checklist (`subId`) holds many species,
+    so the checklist id alone is not enough. Accepts raw eBird items and normalized records.
+    """
+    sub_id = item.get("subId") or item.get("sub_id")
+    species_code = item.get("speciesCode") or item.get("species_code")
+    if sub_id and species_code:
+        return f"{sub_id}:{species_code}"
+    return None
+
+
+def parse_obs_dt(value: Optional[str]) -> Optional[datetime]:
+    """Parse eBird `obsDt` values ("YYYY-MM-DD HH:MM" or "YYYY-MM-DD")."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+class EBirdObservationStore:
+    """One document per eBird observation in `ebird_observations`, keyed by `subId:speciesCode`."""
+
+    def __init__(self):
+        self.collection = MongoDatabase()[EBIRD_OBSERVATIONS_COLLECTION]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("obs_dt", DESCENDING)])
+        await self.collection.create_index([("last_seen_at", DESCENDING)])
+        await self.collection.create_index([("species_code", ASCENDING), ("obs_dt", DESCENDING)])
+        # Map tile (bounding box) reads
+        await self.collection.create_index([("lat", ASCENDING), ("lon", ASCENDING)])
+
+    async def upsert(self, observations: List[dict]) -> int:
+        """
+        Bulk, unordered upsert of normalized observations. Existing sightings are only touched
+        to bump `last_seen_at`, so repeated runs are idempotent. Returns the number of new sightings;
+        writers bump the eBird data version (see data_versions.py) once they are done.
+        """
+        now = datetime.utcnow()
+        ops = []
+        for obs in observations:
+            key = obs.get("obs_id")
+            if not key:
+                continue
+            doc = {**obs, "obs_dt": parse_obs_dt(obs.get("date")), "first_seen_at": now}
+            ops.append(UpdateOne(
+                {"_id": key},
+                {"$setOnInsert": doc, "$set": {"last_seen_at": now}},
+                upsert=True,
+            ))
+        return await self._bulk_upsert(ops)
+
+    async def upsert_batch(self, batch: "ObservationBatch", records: Optional[List[dict]] = None) -> int:
+        """`upsert` for a columnar batch, reusing its already parsed `obs_dt`; pass `records` if already built."""
+        now = datetime.utcnow()
+        ops = [
+            UpdateOne(
+                {"_id": record["obs_id"]},
+                {"$setOnInsert": {**record, "obs_dt": obs_dt, "first_seen_at": now}, "$set": {"last_seen_at": now}},
+                upsert=True,
+            )
+            for record, obs_dt in zip(records if records is not None else batch.to_records(), batch.obs_datetimes())
+        ]
+        return await self._bulk_upsert(ops)
+
+    async def _bulk_upsert(self, ops: List[UpdateOne]) -> int:
+        if not ops:
+            return 0
+        result = await self.collection.bulk_write(ops, ordered=False)
+        logger.info(f"[EBIRD-STORE] Upserted {len(ops)} observations, {result.upserted_count} new")
+        return result.upserted_count
+
+    @staticmethod
+    async def resolve_species(filters: dict) -> dict:
+        """
+        Replace a `species` name filter by the codes of the taxonomy entries whose common or
+        scientific name contains it, so the `(species_code, obs_dt)` index serves the query.
+        The name is kept (and matched with a regex) when the taxonomy has no or too many matches.
+        """
+        species = filters.get("species")
+        if not species or filters.get("species_codes") is not None:
+            return filters
+        try:
+            await taxonomy_index.ensure_loaded()
+        except Exception as e:
+            logger.error(f"[EBIRD-STORE] Taxonomy unavailable, filtering {species!r} by name: {e}")
+            return filters
+        codes = taxonomy_index.search(species, limit=MAX_SPECIES_CODES + 1)
+        if not codes or len(codes) > MAX_SPECIES_CODES:
+            return filters
+        return {**filters, "species": None, "species_codes": codes}
+
+    @staticmethod
+    def build_query(
+        species: Optional[str] = None,
+        species_codes: Optional[List[str]] = None,
+        obs_since: Optional[datetime] = None,
+        seen_since: Optional[datetime] = None,
+        obs_until: Optional[datetime] = None,
+        bbox: Optional[tuple[float, float, float, float]] = None,
+    ) -> dict:
+        """
+        Filter by species codes (or a species name, see `resolve_species`), observation/last seen
+        time and `bbox=(min_lat, min_lon, max_lat, max_lon)`.
+        """
+        query: dict = {}
+        if species_codes is not None:
+            query["species_code"] = {"$in": species_codes}
+        elif species:
+            pattern = {"$regex": re.escape(species), "$options": "i"}
+            query["$or"] = [{"species": pattern}, {"sci_name": pattern}]
+        if obs_since or obs_until:
+            query["obs_dt"] = {
+                **({"$gte": obs_since} if obs_since else {}),
+                **({"$lte": obs_until} if obs_until else {}),
+            }
+        if bbox is not None:
+            min_lat, min_lon, max_lat, max_lon = bbox
+            query["lat"] = {"$gte": min_lat, "$lte": max_lat}
+            query["lon"] = {"$gte": min_lon, "$lte": max_lon}
+        if seen_since:
+            query["last_seen_at"] = {"$gte": seen_since}
+        return query
+
+    async def existing_keys(self, keys: List[str]) -> set[str]:
+        cursor = self.collection.find({"_id": {"$in": keys}}, {"_id": 1})
+        return {doc["_id"] async for doc in cursor}
+
+    async def find(self, limit: int = 5000, **filters) -> List[dict]:
+        cursor = self.collection.find(
+            self.build_query(**await self.resolve_species(filters)), {"_id": 0, "first_seen_at": 0, "last_seen_at": 0}
+        ).sort("obs_dt", DESCENDING).limit(limit)
+        return [doc async for doc in cursor]
+
+    async def find_run(self, summary: dict, limit: int = 5000) -> List[dict]:
+        """
+        Observations received by an `EtlJobKind.EBIRD_RUN_ETL` job, read back through the summary it
+        keeps as result (see `app.worker.ebird_run_etl`): a run bumps `last_seen_at` of every sighting
+        it receives, so these are the sightings of its species and area seen since it started.
+        """
+        if not summary.get("count"):
+            return []
+        filters: dict = {"seen_since": summary["started_at"], "bbox": summary.get("bbox")}
+        if summary.get("species_codes") is not None:
+            filters["species_codes"] = summary["species_codes"]
+        return await self.find(limit=min(limit, summary["count"]), **filters)
+
+    async def find_batch(self, fields: Optional[List[str]] = None, limit: int = 5000, **filters) -> "ObservationBatch":
+        """
+        `find` returning a columnar batch, for aggregations over many observations. Restricting
+        `fields` (`date` is always read, `obs_dt` is parsed from it) saves decoding unused fields.
+        """
+        from app.services.disl.ebird_batch import ObservationBatch
+
+        projection = {field: 1 for field in ["date", *(fields or [])]} if fields else {"first_seen_at": 0, "last_seen_at": 0, "obs_dt": 0}
+        projection["_id"] = 0
+        cursor = self.collection.find(self.build_query(**await self.resolve_species(filters)), projection).sort("obs_dt", DESCENDING).limit(limit)
+        return ObservationBatch.from_documents([doc async for doc in cursor])
+
+
+class EBirdWatermarkStore:
+    """
+    Per region/species ingestion watermarks in `ebird_watermarks`: the newest `obsDt` and
+    `subId` seen and when the region was last collected.
+    """
+
+    def __init__(self):
+        self.collection = MongoDatabase()[EBIRD_WATERMARKS_COLLECTION]
+
+    @staticmethod
+    def _key(region_code: str, species_code: str) -> str:
+        return f"{region_code}:{species_code or '*'}"
+
+    async def get(self, region_code: str, species_code: str = "") -> Optional[dict]:
+        return await self.collection.find_one({"_id": self._key(region_code, species_code)})
+
+    async def advance(
+        self,
+        region_code: str,
+        species_code: str = "",
+        last_obs_dt: Optional[datetime] = None,
+        last_sub_id: Optional[str] = None,
+        new_count: int = 0,
+    ):
+        """Record a run; the watermark only ever moves forward."""
+        update: dict = {
+            "$set": {
+                "region_code": region_code,
+                "species_code": species_code,
+                "last_run_at": datetime.utcnow(),
+                "last_new_count": new_count,
+            }
+        }
+        if last_obs_dt:
+            current = await self.get(region_code, species_code)
+            if not current or not current.get("last_obs_dt") or current["last_obs_dt"] < last_obs_dt:
+                update["$set"].update({"last_obs_dt": last_obs_dt, "last_sub_id": last_sub_id})
+        await self.collection.update_one({"_id": self._key(region_code, species_code)}, update, upsert=True)
+
+
+class EBirdCollectionRunStore:
+    """
+    Checkpoints of the scheduled multi-country collection in `ebird_collection_runs`: one document
+    per run with the state of every country, so an interrupted run resumes with the countries it had
+    not finished. Also serves as the record of run duration, counts and failures.
+    """
+
+    def __init__(self):
+        self.collection = MongoDatabase()[EBIRD_COLLECTION_RUNS_COLLECTION]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("started_at", DESCENDING)])
+
+    async def start_or_resume(self, region_codes: List[str]) -> dict:
+        """
+        Return the unfinished run started within `EBIRD_COLLECTION_RESUME_HOURS`, or start a new one.
+        Older unfinished runs are closed as abandoned.
+        """
+        now = datetime.utcnow()
+        resume_after = now - timedelta(hours=settings.EBIRD_COLLECTION_RESUME_HOURS)
+        await self.collection.update_many(
+            {"status": "running", "started_at": {"$lt": resume_after}},
+            {"$set": {"status": "abandoned", "finished_at": now}},
+        )
+        run = await self.collection.find_one({"status": "running"}, sort=[("started_at", DESCENDING)])
+        if run:
+            # Countries added to the list since the run started are collected too
+            missing = {f"countries.{code}": {"status": "pending"} for code in region_codes if code not in run["countries"]}
+            if missing:
+                await self.collection.update_one({"_id": run["_id"]}, {"$set": missing})
+                run = await self.collection.find_one({"_id": run["_id"]})
+            await self.collection.update_one({"_id": run["_id"]}, {"$inc": {"resumed": 1}})
+            logger.info(f"[EBIRD-STORE] Resuming collection run {run['_id']} started at {run['started_at']}")
+            return run
+        run = {
+            "started_at": now,
+            "status": "running",
+            "resumed": 0,
+            "countries": {code: {"status": "pending"} for code in region_codes},
+        }
+        result = await self.collection.insert_one(run)
+        run["_id"] = result.inserted_id
+        return run
+
+    async def mark_country(self, run_id, region_code: str, status: str, **fields):
+        update = {f"countries.{region_code}.status": status}
+        update.update({f"countries.{region_code}.{key}": value for key, value in fields.items()})
+        await self.collection.update_one({"_id": run_id}, {"$set": update})
+
+    async def finish(self, run_id) -> dict:
+        """Close the run and compute its totals from the per-country checkpoints."""
+        run = await self.collection.find_one({"_id": run_id})
+        countries = run["countries"].values()
+        failed = [code for code, state in run["countries"].items() if state["status"] == "failed"]
+        now = datetime.utcnow()
+        summary = {
+            "status": "completed_with_errors" if failed else "completed",
+            "finished_at": now,
+            "duration_seconds": round((now - run["started_at"]).total_seconds(), 2),
+            # Sum of per-country times: what a serial run would have taken
+            "country_seconds": round(sum(state.get("duration_seconds", 0) for state in countries), 2),
+            "new_observations": sum(state.get("new_count", 0) for state in countries),
+            "failed_countries": failed,
+        }
+        await self.collection.update_one({"_id": run_id}, {"$set": summary})
+        return summary
+
+    async def recent(self, limit: int = 20) -> List[dict]:
+        cursor = self.collection.find().sort("started_at", DESCENDING).limit(limit)
+        runs = []
+        async for doc in cursor:
+            doc["id"] = str(doc.pop("_id"))
+            runs.append(doc)
+        return runs
@@ -0,0 +1,52 @@
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Optional
+
+from app.services.disl.geocode_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_PATH = Path(__file__).parent / "data" / "gazetteer.json"
+
+
+def place_key(name: str) -> str:
+    """Lookup form of a place name: "North-America", "north_america" and "The North America" all match."""
+    text = re.sub(r"[-_\s]+", " ", normalize_query(name)).strip()
+    return text[4:] if text.startswith("the ") else text
+
+
+class Gazetteer:
+    """
+    Bundled names of continents, oceans, biogeographic realms and large regions, with their
+    centers and bounding boxes. Ninjas describes where animals live with such coarse names,
+    which Photon answers slowly or not at all; these never need a geocoding round trip.
+    """
+
+    def __init__(self, path: Path = GAZETTEER_PATH):
+        self.path = path
+        self.places: dict[str, dict] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.places)
+
+    def load(self):
+        places = {}
+        for entry in json.loads(self.path.read_text(encoding="utf-8"))["places"]:
+            lat, lon = entry["center"]
+            place = {"name": entry["name"], "kind": entry["kind"], "lat": lat, "lon": lon, "bbox": entry["bbox"]}
+            for name in [entry["name"], *entry["aliases"]]:
+                places.setdefault(place_key(name), place)
+        self.places = places
+        logger.info(f"[GAZETTEER] Loaded {len(places)} place names")
+
+    def lookup(self, name: str) -> Optional[dict]:
+        """The place called `name` ({"name", "kind", "lat", "lon", "bbox"}), or None if it is not a coarse place name."""
+        if not self.loaded:
+            self.load()
+        return self.places.get(place_key(name)) if isinstance(name, str) else None
+
+
+gazetteer = Gazetteer()
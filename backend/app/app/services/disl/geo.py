@@ -0,0 +1,75 @@
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+# Length of one degree of latitude
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometers."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat: float, lon: float, dist_km: float) -> tuple[float, float, float, float]:
+    """
+    (min_lat, min_lon, max_lat, max_lon) enclosing the circle of `dist_km` around a point. Near the
+    poles or across the antimeridian the longitude range is widened to the full [-180, 180].
+    """
+    d_lat = dist_km / KM_PER_DEGREE
+    min_lat, max_lat = max(-90.0, lat - d_lat), min(90.0, lat + d_lat)
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat < 1e-6:
+        return min_lat, -180.0, max_lat, 180.0
+    d_lon = dist_km / (KM_PER_DEGREE * cos_lat)
+    if lon - d_lon < -180 or lon + d_lon > 180:
+        return min_lat, -180.0, max_lat, 180.0
+    return min_lat, lon - d_lon, max_lat, lon + d_lon
+
+
+def geojson_point(lat: float, lon: float) -> dict:
+    return {"type": "Point", "coordinates": [lon, lat]}
+
+
+# Longest edge of box polygons, in degrees: Mongo draws polygon edges as great circles, so
+# parallels are densified to stay close to the box the client asked for
+BOX_EDGE_DEGREES = 1.0
+# Widest box polygon: larger rings than a hemisphere would select the outside instead
+BOX_MAX_WIDTH_DEGREES = 90.0
+# Mongo rejects rings that collapse onto the poles
+BOX_MAX_LAT = 89.999
+
+
+def _box_ring(min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> list:
+    steps = max(1, math.ceil((max_lon - min_lon) / BOX_EDGE_DEGREES))
+    south = [[min_lon + (max_lon - min_lon) * i / steps, min_lat] for i in range(steps + 1)]
+    north = [[lon, max_lat] for lon, _ in reversed(south)]
+    return south + north + [south[0]]
+
+
+def bbox_geometry(min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> dict:
+    """
+    GeoJSON MultiPolygon covering a lat/lon box (a map viewport) for `$geoWithin` queries.
+    `min_lon > max_lon` means the box crosses the antimeridian.
+    """
+    min_lat, max_lat = max(-BOX_MAX_LAT, min_lat), min(BOX_MAX_LAT, max_lat)
+    spans = [(min_lon, max_lon)] if min_lon <= max_lon else [(min_lon, 180.0), (-180.0, max_lon)]
+    polygons = []
+    for west, east in spans:
+        pieces = max(1, math.ceil((east - west) / BOX_MAX_WIDTH_DEGREES))
+        width = (east - west) / pieces
+        for i in range(pieces):
+            if width > 0:
+                polygons.append([_box_ring(min_lat, west + i * width, max_lat, west + (i + 1) * width)])
+    return {"type": "MultiPolygon", "coordinates": polygons}
+
+
+def polygon_geometry(points: list[tuple[float, float]]) -> dict:
+    """GeoJSON Polygon from (lat, lon) vertices; the ring is closed if needed."""
+    ring = [[lon, lat] for lat, lon in points]
+    if ring[0] != ring[-1]:
+        ring.append(ring[0])
+    return {"type": "Polygon", "coordinates": [ring]}
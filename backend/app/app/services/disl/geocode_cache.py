@@ -0,0 +1,168 @@
+import logging
+import re
+import unicodedata
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, List, Optional
+
+from pymongo import ASCENDING
+
+from app.core.config import settings
+from app.db.session import MongoDatabase
+from app.services.disl.singleflight import single_flight
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_CACHE_COLLECTION = "geocode_cache"
+
+# Marks a cached "not found" in the in-process level, where None means "not cached"
+_NOT_FOUND = object()
+
+
+def normalize_query(query: str) -> str:
+    """Cache key form of a place query: Unicode-normalized, case-folded, single-spaced, without edge punctuation."""
+    text = unicodedata.normalize("NFKC", query).casefold()
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" .,;:!?\"'()[]{}-")
+
+
+def forward_key(query: str) -> str:
+    return f"fwd:{normalize_query(query)}"
+
+
+def reverse_key(kind: str, lat: float, lon: float) -> str:
+    """Coordinates rounded to `GEOCODE_REVERSE_PRECISION` decimals, so nearby points share an entry."""
+    precision = settings.GEOCODE_REVERSE_PRECISION
+    return f"rev:{kind}:{round(lat, precision):.{precision}f},{round(lon, precision):.{precision}f}"
+
+
+class GeocodeCache:
+    """
+    Two-level cache for geocoding results: a process-wide LRU in front of the `geocode_cache`
+    collection, shared by every process. Found results live for `GEOCODE_CACHE_TTL_DAYS`,
+    "not found" results for `GEOCODE_NEGATIVE_TTL_HOURS`; upstream errors are never cached.
+    Concurrent misses for the same key share one upstream call.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or settings.GEOCODE_CACHE_SIZE
+        self._entries: OrderedDict[str, tuple[Any, datetime]] = OrderedDict()
+        self.counters: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    @property
+    def collection(self):
+        return MongoDatabase()[GEOCODE_CACHE_COLLECTION]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+
+    @staticmethod
+    def _kind(key: str) -> str:
+        return key.split(":", 1)[0]
+
+    def _remember(self, key: str, value: Any, expires_at: datetime):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _recall(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= datetime.utcnow():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Cached value of `key`, calling `fetch` on a miss. `fetch` returns None for "not found",
+        which is cached too, and raises on upstream errors, which are propagated uncached.
+        """
+        counters = self.counters[self._kind(key)]
+        value = self._recall(key)
+        if value is not None:
+            counters["memory_hits"] += 1
+            return None if value is _NOT_FOUND else value
+
+        doc = await self.collection.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+        if doc is not None:
+            counters["mongo_hits"] += 1
+            value = doc["value"] if doc["found"] else _NOT_FOUND
+            self._remember(key, value, doc["expires_at"])
+            return doc["value"]
+
+        counters["misses"] += 1
+        return await single_flight.do(("geocode", key), lambda: self._fetch_and_store(key, fetch))
+
+    async def get_many(self, keys: List[str]) -> dict[str, Any]:
+        """
+        Cached values of the keys found in either level (None for cached "not found"), looking up
+        everything missing from memory in one query. Keys left out are misses, for `get_or_fetch`.
+        """
+        found: dict[str, Any] = {}
+        remaining = []
+        for key in dict.fromkeys(keys):
+            value = self._recall(key)
+            if value is None:
+                remaining.append(key)
+                continue
+            self.counters[self._kind(key)]["memory_hits"] += 1
+            found[key] = None if value is _NOT_FOUND else value
+        if remaining:
+            cursor = self.collection.find({"_id": {"$in": remaining}, "expires_at": {"$gt": datetime.utcnow()}})
+            async for doc in cursor:
+                key = doc["_id"]
+                self.counters[self._kind(key)]["mongo_hits"] += 1
+                self._remember(key, doc["value"] if doc["found"] else _NOT_FOUND, doc["expires_at"])
+                found[key] = doc["value"]
+        return found
+
+    async def _fetch_and_store(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        value = await fetch()
+        found = value is not None
+        now = datetime.utcnow()
+        if found:
+            expires_at = now + timedelta(days=settings.GEOCODE_CACHE_TTL_DAYS)
+        else:
+            expires_at = now + timedelta(hours=settings.GEOCODE_NEGATIVE_TTL_HOURS)
+            self.counters[self._kind(key)]["negative_stored"] += 1
+        self._remember(key, value if found else _NOT_FOUND, expires_at)
+        try:
+            await self.collection.replace_one(
+                {"_id": key},
+                {"value": value, "found": found, "cached_at": now, "expires_at": expires_at},
+                upsert=True,
+            )
+        except Exception as e:
+            # The in-process level still has it; the next process simply fetches again
+            logger.error(f"[GEOCODE-CACHE] Failed to persist {key}: {e}")
+        return value
+
+    def clear_memory(self):
+        self._entries.clear()
+
+    async def stats(self) -> dict:
+        """Hit rates of this process per lookup kind, and the size of both levels."""
+        kinds = {}
+        for kind, counters in self.counters.items():
+            lookups = counters["memory_hits"] + counters["mongo_hits"] + counters["misses"]
+            kinds[kind] = {
+                **counters,
+                "lookups": lookups,
+                "hit_rate": round((counters["memory_hits"] + counters["mongo_hits"]) / lookups, 3) if lookups else None,
+            }
+        now = datetime.utcnow()
+        return {
+            "process": kinds,
+            "memory_entries": len(self._entries),
+            "memory_capacity": self.max_entries,
+            "stored_entries": await self.collection.count_documents({"expires_at": {"$gt": now}}),
+            "stored_not_found": await self.collection.count_documents({"expires_at": {"$gt": now}, "found": False}),
+        }
+
+
+geocode_cache = GeocodeCache()
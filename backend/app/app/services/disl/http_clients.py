@@ -0,0 +1,68 @@
+import importlib.util
+import logging
+from enum import Enum
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (compatible; AnimalToMap/1.0; +https://github.com/Anna-Marin/DC-animal-to-map)"
+
+# HTTP/2 needs the optional `h2` package (installed through `httpx[http2]`)
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class Upstream(str, Enum):
+    EBIRD = "ebird"
+    NINJAS = "ninjas"
+    PHOTON = "photon"
+    WILDLIFE = "wildlife"
+
+
+class HTTPClientRegistry:
+    """
+    Application-lifetime `httpx.AsyncClient` per upstream.
+
+    Sharing one pooled client per upstream keeps TCP/TLS connections and DNS results alive
+    across requests. Clients are opened in `main.app_init` and closed on shutdown; processes
+    without the FastAPI lifespan (scripts, workers) get them lazily on first use.
+    """
+
+    def __init__(self):
+        self._clients: dict[Upstream, httpx.AsyncClient] = {}
+
+    def _create(self, upstream: Upstream) -> httpx.AsyncClient:
+        max_connections = settings.HTTP_UPSTREAM_MAX_CONNECTIONS.get(upstream.value, settings.HTTP_MAX_CONNECTIONS)
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        )
+        logger.info(f"Opening HTTP client for {upstream.value} (max_connections={max_connections}, http2={HTTP2_AVAILABLE})")
+        return httpx.AsyncClient(
+            timeout=60.0,
+            limits=limits,
+            http2=HTTP2_AVAILABLE,
+            headers={"User-Agent": USER_AGENT},
+        )
+
+    def get(self, upstream: Upstream) -> httpx.AsyncClient:
+        client = self._clients.get(upstream)
+        if client is None or client.is_closed:
+            client = self._clients[upstream] = self._create(upstream)
+        return client
+
+    def open(self):
+        for upstream in Upstream:
+            self.get(upstream)
+
+    async def aclose(self):
+        clients, self._clients = self._clients, {}
+        for upstream, client in clients.items():
+            await client.aclose()
+            logger.info(f"Closed HTTP client for {upstream.value}")
+
+
+http_clients = HTTPClientRegistry()
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.db.session import MongoDatabase
+from app.models.etl_job import EtlJob, EtlJobKind, EtlJobStatus
+from app.models.user import User
+from app.services.disl.rate_limit import Priority
+
+logger = logging.getLogger(__name__)
+
+ETL_JOBS_COLLECTION = "etl_jobs"
+
+DONE_STATUSES = [EtlJobStatus.SUCCEEDED.value, EtlJobStatus.FAILED.value]
+
+
+def job_key(kind: EtlJobKind, params: dict) -> str:
+    """Identity of a job: identical queued/running jobs are shared instead of enqueued twice."""
+    return f"{kind.value}:{json.dumps(params, sort_keys=True, default=str)}"
+
+
+class EtlJobQueue:
+    """
+    Mongo-backed work queue in `etl_jobs`, shared by the API (producer) and `app.worker` (consumer).
+
+    A worker leases a job by atomically flipping it to `running` with a `lease_expires_at`
+    (visibility timeout) that it keeps extending while the job runs. A job whose lease expires,
+    e.g. because its worker died, becomes visible to other workers again. Failed attempts are
+    retried with exponential backoff until `max_attempts`. Finished jobs expire after
+    `settings.ETL_JOB_RETENTION_HOURS`.
+
+    Queued and running jobs carry `active: true`, on which `key` is unique: enqueueing an
+    identical job joins the active one atomically. Jobs remember the users that enqueued or
+    joined them (`user_ids`), who with superusers are the only ones allowed to read them.
+    """
+
+    def __init__(self):
+        self.collection = MongoDatabase()[ETL_JOBS_COLLECTION]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("status", ASCENDING), ("priority", ASCENDING), ("available_at", ASCENDING)])
+        await self.collection.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING)])
+        await self.collection.create_index(
+            [("key", ASCENDING)], name="active_key", unique=True, partialFilterExpression={"active": True},
+        )
+        await self.collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+
+    async def enqueue(
+        self,
+        kind: EtlJobKind,
+        params: Optional[dict] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        max_attempts: Optional[int] = None,
+        user_id: Optional[str] = None,
+    ) -> str:
+        """
+        Queue a job and return its id; an identical job that is still queued or running is reused.
+        `user_id` is the user asking for it, if any (scheduled and admin jobs have none).
+        """
+        params = params or {}
+        key = job_key(kind, params)
+        now = datetime.utcnow()
+        job = EtlJob(
+            kind=kind,
+            params=params,
+            priority=int(priority),
+            max_attempts=max_attempts or settings.ETL_JOB_MAX_ATTEMPTS,
+            created_at=now,
+            available_at=now,
+        )
+        doc = job.model_dump(exclude={"id", "user_ids"}, mode="json")
+        doc.update({"_id": ObjectId(), "key": key, "active": True, "created_at": now, "available_at": now})
+        update: dict = {"$setOnInsert": doc}
+        if user_id:
+            update["$addToSet"] = {"user_ids": user_id}
+        else:
+            doc["user_ids"] = []
+        try:
+            result = await self._enqueue_or_join(key, update)
+        except DuplicateKeyError:
+            # A concurrent identical enqueue inserted first: the retry matches and joins its job
+            result = await self._enqueue_or_join(key, update)
+        if result["_id"] == doc["_id"]:
+            logger.info(f"[ETL-JOBS] Enqueued {kind.value} job {result['_id']}")
+        else:
+            logger.debug(f"[ETL-JOBS] Joining active {kind.value} job {result['_id']}")
+        return str(result["_id"])
+
+    async def enqueue_unless_recent(
+        self, kind: EtlJobKind, params: dict, within: timedelta, user_id: Optional[str] = None,
+    ) -> EtlJob:
+        """
+        The active job for `params`, or the one that finished in the last `within`, enqueueing
+        a new one only if there is neither. For collections triggered by reads, which must not
+        repeat every time a query keeps finding nothing.
+        """
+        recent = {"key": job_key(kind, params), "$or": [{"active": True}, {"finished_at": {"$gte": datetime.utcnow() - within}}]}
+        doc = await self.collection.find_one(recent, {"result": 0}, sort=[("created_at", -1)])
+        if doc is None:
+            return await self.get(await self.enqueue(kind, params, user_id=user_id))
+        if user_id and user_id not in doc["user_ids"]:
+            await self.collection.update_one({"_id": doc["_id"]}, {"$addToSet": {"user_ids": user_id}})
+            doc["user_ids"].append(user_id)
+        return self._to_model(doc)
+
+    async def _enqueue_or_join(self, key: str, update: dict) -> dict:
+        return await self.collection.find_one_and_update(
+            {"key": key, "active": True}, update, projection={"_id": 1}, upsert=True, return_document=ReturnDocument.AFTER,
+        )
+
+    async def lease(self, worker_id: str) -> Optional[EtlJob]:
+        """Claim the next visible job (highest priority, oldest first) for `visibility` seconds."""
+        now = datetime.utcnow()
+        visible = {
+            "$or": [
+                {"status": EtlJobStatus.QUEUED.value, "available_at": {"$lte": now}},
+                # Lease expired: the worker holding it is gone or stuck
+                {"status": EtlJobStatus.RUNNING.value, "lease_expires_at": {"$lt": now}},
+            ]
+        }
+        while True:
+            doc = await self.collection.find_one_and_update(
+                visible,
+                {
+                    "$set": {
+                        "status": EtlJobStatus.RUNNING.value,
+                        "worker_id": worker_id,
+                        "started_at": now,
+                        "lease_expires_at": now + timedelta(seconds=settings.ETL_JOB_VISIBILITY_SECONDS),
+                    },
+                    "$inc": {"attempts": 1},
+                },
+                sort=[("priority", ASCENDING), ("available_at", ASCENDING)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if doc is None:
+                return None
+            if doc["attempts"] > doc["max_attempts"]:
+                # Only reachable through expired leases: the last attempt never reported back
+                await self._finish(doc["_id"], worker_id, EtlJobStatus.FAILED, error=doc.get("error") or "Lease expired")
+                continue
+            return self._to_model(doc)
+
+    async def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend the lease; False means the job was taken over by another worker."""
+        result = await self.collection.update_one(
+            {"_id": ObjectId(job_id), "worker_id": worker_id, "status": EtlJobStatus.RUNNING.value},
+            {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=settings.ETL_JOB_VISIBILITY_SECONDS)}},
+        )
+        return result.matched_count == 1
+
+    async def complete(self, job_id: str, worker_id: str, result: Any = None):
+        await self._finish(ObjectId(job_id), worker_id, EtlJobStatus.SUCCEEDED, result=result)
+
+    async def fail(self, job: EtlJob, worker_id: str, error: str):
+        """Record a failed attempt: back to the queue with backoff, or failed for good after `max_attempts`."""
+        if job.attempts < job.max_attempts:
+            delay = settings.ETL_JOB_RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+            await self.collection.update_one(
+                {"_id": ObjectId(job.id), "worker_id": worker_id},
+                {
+                    "$set": {
+                        "status": EtlJobStatus.QUEUED.value,
+                        "available_at": datetime.utcnow() + timedelta(seconds=delay),
+                        "lease_expires_at": None,
+                        "error": error,
+                    }
+                },
+            )
+            logger.warning(f"[ETL-JOBS] Job {job.id} attempt {job.attempts} failed, retrying in {delay}s: {error}")
+        else:
+            await self._finish(ObjectId(job.id), worker_id, EtlJobStatus.FAILED, error=error)
+            logger.error(f"[ETL-JOBS] Job {job.id} failed after {job.attempts} attempts: {error}")
+
+    async def _finish(self, job_id: ObjectId, worker_id: str, status: EtlJobStatus, result: Any = None, error: Optional[str] = None):
+        now = datetime.utcnow()
+        await self.collection.update_one(
+            {"_id": job_id, "worker_id": worker_id},
+            {
+                "$set": {
+                    "status": status.value,
+                    "result": result,
+                    "error": error,
+                    "finished_at": now,
+                    "lease_expires_at": None,
+                    "expires_at": now + timedelta(hours=settings.ETL_JOB_RETENTION_HOURS),
+                },
+                # Frees the key: identical jobs enqueued from now on run again
+                "$unset": {"active": ""},
+            },
+        )
+
+    async def get(self, job_id: str) -> Optional[EtlJob]:
+        if not ObjectId.is_valid(job_id):
+            return None
+        doc = await self.collection.find_one({"_id": ObjectId(job_id)})
+        return self._to_model(doc) if doc else None
+
+    async def recent(self, status: Optional[EtlJobStatus] = None, limit: int = 50) -> list[EtlJob]:
+        query = {"status": status.value} if status else {}
+        cursor = self.collection.find(query, {"result": 0}).sort("created_at", -1).limit(limit)
+        return [self._to_model(doc) async for doc in cursor]
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[EtlJob]:
+        """Poll until the job has finished or `timeout` seconds passed; returns the latest state."""
+        timeout = settings.ETL_JOB_WAIT_SECONDS if timeout is None else timeout
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            job = await self.get(job_id)
+            if job is None or job.status.value in DONE_STATUSES:
+                return job
+            if asyncio.get_running_loop().time() >= deadline:
+                return job
+            await asyncio.sleep(settings.ETL_JOB_POLL_SECONDS)
+
+    async def run(
+        self, kind: EtlJobKind, params: Optional[dict] = None, timeout: Optional[float] = None, user_id: Optional[str] = None,
+    ) -> EtlJob:
+        """Enqueue (or join) a job and wait for it; the returned job may still be queued/running on timeout."""
+        job_id = await self.enqueue(kind, params, user_id=user_id)
+        return await self.wait(job_id, timeout)
+
+    @staticmethod
+    def readable_by(job: EtlJob, user: User) -> bool:
+        return user.is_superuser or (user.id is not None and user.id in job.user_ids)
+
+    @staticmethod
+    def _to_model(doc: dict) -> EtlJob:
+        doc["id"] = str(doc.pop("_id"))
+        return EtlJob(**doc)
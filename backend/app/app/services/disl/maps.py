@@ -1,13 +1,18 @@
 import urllib.parse
-from typing import Any
+from typing import Any, List
 from app.core.config import settings
 from app.models.raw_data import DataSource
-from .base import ETLProvider
+from .base import ETLProvider, Pipeline
+from .countries import country_boundaries
+from .gazetteer import gazetteer
+from .geocode_cache import forward_key, geocode_cache, reverse_key
+from .http_clients import Upstream
 import logging
-import asyncio
 
 
 class OpenStreetMapsProvider(ETLProvider):
+    upstream = Upstream.PHOTON
+
     def __init__(self):
         super().__init__(DataSource.MAPS)
         self.base_url = settings.OPEN_STREET_MAPS_API_URL
@@ -22,62 +27,79 @@ class OpenStreetMapsProvider(ETLProvider):
             return None
         if not isinstance(locations, list):
             locations = [locations]
+
         location_results = {}
-        for loc in locations:
-            try:
-                logger.info(f"[ETL-MAP] Querying Photon for: {loc}")
-                # Add delay to avoid rate limiting
-                await asyncio.sleep(1)
-                photon_results = await self.fetch(loc)
-                coords = []
-                features = photon_results.get("features", [])
-                for item in features:
-                    geom = item.get("geometry", {})
-                    props = item.get("properties", {})
-                    
-                    if geom.get("type") == "Point" and geom.get("coordinates"):
-                        lon, lat = geom["coordinates"]
-                        coords.append({"lat": float(lat), "lon": float(lon)})
-                        
-                if coords:
-                    # Only take the first (most relevant) coordinate for each location
-                    logger.info(f"[ETL-MAP] Found {len(coords)} coordinates for {loc}, using the first one")
-                    location_results[loc] = [coords[0]]
-                else:
-                    logger.warning(f"[ETL-MAP] No coordinates found for location: {loc}")
-                    location_results[loc] = []
-            except Exception as e:
-                error_msg = str(e)
-                if "403" in error_msg or "forbidden" in error_msg.lower():
-                    logger.error(f"[ETL-MAP] Rate limit or forbidden error for {loc} - skipping")
-                elif "timeout" in error_msg.lower() or "timed out" in error_msg.lower():
-                    logger.error(f"[ETL-MAP] Timeout fetching coordinates from Photon for {loc} - location may be too broad or API is slow")
-                else:
-                    logger.error(f"[ETL-MAP] Error fetching coordinates from Photon for {loc}: {e}")
+        places = {}
+        for loc, coords in (await self.geocode_batch(locations)).items():
+            place = gazetteer.lookup(loc)
+            if place:
+                places[loc] = place
+            if coords:
+                location_results[loc] = [{"lat": coords[0], "lon": coords[1]}]
+            else:
+                logger.warning(f"[ETL-MAP] No coordinates found for location: {loc}")
                 location_results[loc] = []
         all_coords = [c for coords in location_results.values() for c in coords]
+        # The first location with coordinates, in input order, decides the map center
         center = all_coords[0] if all_coords else {"lat": 0, "lon": 0}
         logger.info(f"[ETL-MAP] Finished. Total coordinates: {len(all_coords)}")
         return {
             "coordinates": all_coords,
             "center": center,
-            "location_results": location_results
+            "location_results": location_results,
+            # Extent of the continents, oceans and regions among the locations, for fitting the map
+            "places": places
         }
 
+    async def geocode_batch(self, locations: List[str]) -> dict[str, tuple[float, float] | None]:
+        """
+        (lat, lon) of every location, in input order; None where nothing was found or the lookup failed.
+        Continents, oceans and regions come from the gazetteer. The other locations are deduplicated
+        on their normalized form, cached ones are answered with one cache round trip and the rest
+        geocoded concurrently, paced by the Photon rate limiter.
+        """
+        keys = {location: forward_key(location) for location in locations}
+        coords = {}
+        pending = {}
+        for location, key in keys.items():
+            place = gazetteer.lookup(location)
+            if place:
+                coords[key] = (place["lat"], place["lon"])
+            else:
+                pending.setdefault(key, location)
+        coords.update(await geocode_cache.get_many(list(pending)) if pending else {})
+        missing = [(key, location) for key, location in pending.items() if key not in coords]
+
+        if missing:
+            logging.getLogger("app.services.disl.maps").info(
+                f"[ETL-MAP] {len(pending) - len(missing)} of {len(pending)} locations cached, geocoding {len(missing)}"
+            )
+
+            async def geocode(item):
+                key, location = item
+                return key, await self.geocode_single(location)
+
+            pipeline = Pipeline("maps-geocode").source("locations", missing).stage(
+                "geocode", geocode, concurrency=settings.HTTP_UPSTREAM_MAX_CONNECTIONS.get(self.upstream.value, settings.HTTP_MAX_CONNECTIONS)
+            )
+            coords.update({key: value async for key, value in pipeline.run()})
+        return {location: (coords[key][0], coords[key][1]) if coords.get(key) else None for location, key in keys.items()}
+
     async def fetch(self, query: str = "NONE") -> Any:
         params = {
             "q": query,
             "limit": 10
         }
         
-        async with self.get_client() as client:
-            response = await client.get(
-                self.photon_url,
-                params=params,
-                timeout=10.0
-            )
-            response.raise_for_status()
-            return response.json()
+        await self.throttle()
+        client = self.get_client()
+        response = await client.get(
+            self.photon_url,
+            params=params,
+            timeout=10.0
+        )
+        response.raise_for_status()
+        return response.json()
 
     def normalize(self, raw_data: Any) -> Any:
         features = raw_data.get("features", []) if isinstance(raw_data, dict) else []
@@ -99,45 +121,66 @@ class OpenStreetMapsProvider(ETLProvider):
         return normalized
 
     async def geocode_single(self, location: str) -> tuple[float, float] | None:
+        place = gazetteer.lookup(location)
+        if place:
+            return place["lat"], place["lon"]
         try:
-            # Add delay to avoid rate limiting
-            await asyncio.sleep(0.5)
-            data = await self.fetch(location)
-            features = data.get("features", [])
-            if features:
-                coords = features[0]["geometry"]["coordinates"]
-                return float(coords[1]), float(coords[0]) # Return (lat, lon)
+            coords = await geocode_cache.get_or_fetch(forward_key(location), lambda: self._geocode_uncached(location))
         except Exception as e:
-            logging.getLogger("app.services.disl.maps").error(f"Geocoding error for {location}: {e}")
+            logger = logging.getLogger("app.services.disl.maps")
+            error_msg = str(e)
+            if "403" in error_msg or "forbidden" in error_msg.lower():
+                logger.error(f"Rate limit or forbidden error geocoding {location} - skipping")
+            elif "timeout" in error_msg.lower() or "timed out" in error_msg.lower():
+                logger.error(f"Timeout geocoding {location} - location may be too broad or Photon is slow")
+            else:
+                logger.error(f"Geocoding error for {location}: {e}")
             return None
+        return (coords[0], coords[1]) if coords else None
+
+    async def _geocode_uncached(self, location: str) -> list[float] | None:
+        """(lat, lon) of the best Photon match, None if there is none; raises on upstream errors."""
+        data = await self.fetch(location)
+        features = data.get("features", [])
+        if features:
+            coords = features[0]["geometry"]["coordinates"]
+            return [float(coords[1]), float(coords[0])]  # (lat, lon)
         return None
 
     async def reverse_geocode_country(self, lat: float, lon: float) -> str | None:
-        logger = logging.getLogger("app.services.disl.maps")
+        # Bundled boundaries answer most lookups locally; Photon only for borders, coasts and microstates
+        country_code = country_boundaries.lookup(lat, lon)
+        if country_code:
+            return country_code
         try:
-            # Add delay to avoid rate limiting
-            await asyncio.sleep(0.5)
-            # Use Photon reverse geocoding
-            async with self.get_client() as client:
-                response = await client.get(
-                    self.photon_reverse_url,
-                    params={"lat": lat, "lon": lon, "limit": 1},
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                features = data.get("features", [])
-                if features:
-                    props = features[0].get("properties", {})
-                    # Photon returns country code in 'countrycode' field
-                    country_code = props.get("countrycode")
-                    if country_code:
-                        logger.info(f"Reverse geocoded ({lat}, {lon}) to country: {country_code}")
-                        return country_code.upper()
-                    
-                logger.warning(f"No country code found for coordinates ({lat}, {lon})")
-                return None
+            return await geocode_cache.get_or_fetch(
+                reverse_key("country", lat, lon), lambda: self._reverse_geocode_country_uncached(lat, lon)
+            )
         except Exception as e:
-            logger.error(f"Reverse geocoding failed for ({lat}, {lon}): {e}")
+            logging.getLogger("app.services.disl.maps").error(f"Reverse geocoding failed for ({lat}, {lon}): {e}")
             return None
+
+    async def _reverse_geocode_country_uncached(self, lat: float, lon: float) -> str | None:
+        logger = logging.getLogger("app.services.disl.maps")
+        # Use Photon reverse geocoding
+        await self.throttle()
+        client = self.get_client()
+        response = await client.get(
+            self.photon_reverse_url,
+            params={"lat": lat, "lon": lon, "limit": 1},
+            timeout=10.0
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        features = data.get("features", [])
+        if features:
+            props = features[0].get("properties", {})
+            # Photon returns country code in 'countrycode' field
+            country_code = props.get("countrycode")
+            if country_code:
+                logger.info(f"Reverse geocoded ({lat}, {lon}) to country: {country_code}")
+                return country_code.upper()
+
+        logger.warning(f"No country code found for coordinates ({lat}, {lon})")
+        return None
@@ -0,0 +1,110 @@
+"""
+Minimal encoder of Mapbox Vector Tiles (https://github.com/mapbox/vector-tile-spec, version 2.1)
+holding point features. The protobuf messages are written by hand: a tile is a handful of
+length-delimited layers, and points need only the MoveTo command.
+"""
+import struct
+from typing import Iterable, Optional
+
+TILE_EXTENT = 4096
+MVT_VERSION = 2
+MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+# Protobuf wire types
+_VARINT = 0
+_FIXED64 = 1
+_LENGTH_DELIMITED = 2
+
+# vector_tile.proto GeomType.POINT and the MoveTo command id
+_POINT = 1
+_MOVE_TO = 1
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _field(number: int, wire_type: int) -> bytes:
+    return _varint((number << 3) | wire_type)
+
+
+def _bytes_field(number: int, payload: bytes) -> bytes:
+    return _field(number, _LENGTH_DELIMITED) + _varint(len(payload)) + payload
+
+
+def _varint_field(number: int, value: int) -> bytes:
+    return _field(number, _VARINT) + _varint(value)
+
+
+def _packed_field(number: int, values: Iterable[int]) -> bytes:
+    return _bytes_field(number, b"".join(_varint(value) for value in values))
+
+
+def _value(value) -> bytes:
+    """A `Tile.Value`; integers outside 64 bits and other types are written as strings."""
+    if isinstance(value, bool):
+        return _varint_field(7, int(value))
+    if isinstance(value, int) and -(1 << 63) <= value < (1 << 64):
+        return _varint_field(5, value) if value >= 0 else _varint_field(6, _zigzag(value) & ((1 << 64) - 1))
+    if isinstance(value, float):
+        return _field(3, _FIXED64) + struct.pack("<d", value)
+    return _bytes_field(1, str(value).encode("utf-8"))
+
+
+class LayerBuilder:
+    """
+    Point features of one layer, in tile coordinates (0..extent, y down). Property keys and
+    values are shared through the layer's tables as the spec requires; None values are left out.
+    """
+
+    def __init__(self, name: str, extent: int = TILE_EXTENT):
+        self.name = name
+        self.extent = extent
+        self._features: list[bytes] = []
+        self._keys: dict[str, int] = {}
+        self._values: dict[tuple, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._features)
+
+    def _tag(self, key: str, value) -> tuple[int, int]:
+        key_index = self._keys.setdefault(key, len(self._keys))
+        # Keyed by type too: True == 1 == 1.0 must stay distinct values
+        value_index = self._values.setdefault((type(value), value), len(self._values))
+        return key_index, value_index
+
+    def add_point(self, x: int, y: int, properties: dict, feature_id: Optional[int] = None):
+        tags = []
+        for key, value in properties.items():
+            if value is not None:
+                tags.extend(self._tag(key, value))
+        feature = b""
+        if feature_id is not None:
+            feature += _varint_field(1, feature_id)
+        if tags:
+            feature += _packed_field(2, tags)
+        feature += _varint_field(3, _POINT)
+        feature += _packed_field(4, [(1 << 3) | _MOVE_TO, _zigzag(x), _zigzag(y)])
+        self._features.append(feature)
+
+    def encode(self) -> bytes:
+        layer = _varint_field(15, MVT_VERSION) + _bytes_field(1, self.name.encode("utf-8"))
+        layer += b"".join(_bytes_field(2, feature) for feature in self._features)
+        layer += b"".join(_bytes_field(3, key.encode("utf-8")) for key in self._keys)
+        layer += b"".join(_bytes_field(4, _value(value)) for _, value in self._values)
+        layer += _varint_field(5, self.extent)
+        return layer
+
+
+def encode_tile(layers: Iterable[LayerBuilder]) -> bytes:
+    """A `Tile` message of the non-empty `layers`; a tile without features encodes to no bytes."""
+    return b"".join(_bytes_field(3, layer.encode()) for layer in layers if len(layer))
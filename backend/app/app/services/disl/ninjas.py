@@ -2,61 +2,78 @@ from typing import Any
 from app.core.config import settings
 from app.models.raw_data import DataSource, ETLStatus
 from .base import ETLProvider
+from .gazetteer import gazetteer
+from .http_clients import Upstream
+from .singleflight import coalesce
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class NinjasProvider(ETLProvider):
+    upstream = Upstream.NINJAS
+
     def __init__(self):
         super().__init__(DataSource.NINJAS)
         self.api_key = settings.NINJAS_API_KEY
         self.base_url = settings.NINJAS_API_URL
 
+    @coalesce
     async def fetch(self, name: str = "cheetah") -> Any:
         if not self.api_key:
             raise ValueError("NINJAS_API_KEY is not set")
         
-        async with self.get_client() as client:
-            # Try full name first
+        client = self.get_client()
+        # Try full name first
+        await self.throttle()
+        response = await client.get(
+            self.base_url,
+            headers={"X-Api-Key": self.api_key},
+            params={"name": name}
+        )
+        response.raise_for_status()
+        logger.info(f"Ninjas API response for '{name}': {response.text}")
+        data = response.json()
+            
+        # If found results with full name, return them
+        if isinstance(data, list) and data:
+            return data
+            
+        if name and " " in name:
+            words = name.split()
+            last_word = words[-1]
+            logger.info(f"No results for '{name}', trying last word: '{last_word}'")
+                
+            await self.throttle()
             response = await client.get(
                 self.base_url,
                 headers={"X-Api-Key": self.api_key},
-                params={"name": name}
+                params={"name": last_word}
             )
             response.raise_for_status()
-            logger.info(f"Ninjas API response for '{name}': {response.text}")
+            logger.info(f"Ninjas API response for '{last_word}': {response.text}")
             data = response.json()
-            
-            # If found results with full name, return them
-            if isinstance(data, list) and data:
-                return data
-            
-            if name and " " in name:
-                words = name.split()
-                last_word = words[-1]
-                logger.info(f"No results for '{name}', trying last word: '{last_word}'")
-                
-                response = await client.get(
-                    self.base_url,
-                    headers={"X-Api-Key": self.api_key},
-                    params={"name": last_word}
-                )
-                response.raise_for_status()
-                logger.info(f"Ninjas API response for '{last_word}': {response.text}")
-                data = response.json()
                 
-                # Filter results to match original name better
-                if isinstance(data, list) and data:
-                    # Prefer results that contain any word from original name
-                    name_lower = name.lower()
-                    filtered = [
-                        item for item in data 
-                        if name_lower in item.get("name", "").lower()
-                    ]
-                    return filtered if filtered else data
+            # Filter results to match original name better
+            if isinstance(data, list) and data:
+                # Prefer results that contain any word from original name
+                name_lower = name.lower()
+                filtered = [
+                    item for item in data 
+                    if name_lower in item.get("name", "").lower()
+                ]
+                return filtered if filtered else data
             
-            return data
+        return data
+
+    @coalesce
+    async def fetch_and_save(self, name: str) -> tuple[Any, list]:
+        """`fetch`, normalize and save once, however many callers share the fetch; returns (raw, normalized)."""
+        raw = await self.fetch(name=name)
+        normalized = self.normalize(raw) if raw else []
+        if raw:
+            await self.save(raw, normalized)
+        return raw, normalized
 
     def normalize(self, raw_data: Any) -> Any:
         """
@@ -79,24 +96,25 @@ class NinjasProvider(ETLProvider):
         """
         Save raw and normalized data to the database.
         """
-        await self.store(raw_data, status=ETLStatus.SUCCESS, metadata={"type": "raw"})
+        await self.store_raw(raw_data)
         await self.store(normalized_data, status=ETLStatus.SUCCESS, metadata={"type": "normalized"})
 
+    @coalesce
     async def get_locations(self, name: str) -> list[str]:
         """
-        Fetch, normalize, and extract unique locations for the first animal match.
+        Fetch, normalize, store, and extract unique locations for the first animal match, in the
+        order Ninjas lists them. Spellings of the same gazetteer place ("North-America",
+        "North America") are kept once.
         """
-        raw = await self.fetch(name)
-        normalized = self.normalize(raw)
+        pages = [page async for page in self.build_pipeline(name).run()]
+        normalized = pages[0][1] if pages else []
         
-        all_locations = set()
+        all_locations = {}
         if normalized and len(normalized) > 0:
             # Only take locations from the first animal result
             first_animal = normalized[0]
-            locs = first_animal.get("locations")
-            if locs:
-                all_locations.update(locs)
-        
-        await self.save(raw, normalized)
+            for loc in first_animal.get("locations") or []:
+                place = gazetteer.lookup(loc)
+                all_locations.setdefault(place["name"] if place else loc, loc)
         
-        return list(all_locations)
+        return list(all_locations.values())
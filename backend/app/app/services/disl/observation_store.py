@@ -0,0 +1,117 @@
+import base64
+import logging
+import re
+from datetime import datetime
+from typing import List, Optional
+
+from pymongo import DESCENDING, GEOSPHERE, UpdateOne
+
+from app.db.session import MongoDatabase
+from app.services.disl import data_versions
+from app.services.disl.data_versions import DataVersionStore
+from app.services.disl.geo import EARTH_RADIUS_KM, geojson_point
+
+logger = logging.getLogger(__name__)
+
+OBSERVATIONS_COLLECTION = "observations"
+# Fields of a local observation without its (large) image
+SUMMARY_FIELDS = ("species", "confidence", "user_name", "timestamp", "latitude", "longitude", "country_code")
+
+
+def location_fields(lat: Optional[float], lon: Optional[float]) -> dict:
+    """Coordinate fields of a new observation: `latitude`/`longitude` plus the indexed GeoJSON `location`."""
+    fields = {"latitude": lat, "longitude": lon}
+    if lat is not None and lon is not None:
+        fields["location"] = geojson_point(lat, lon)
+    return fields
+
+
+def format_observation(doc: dict, include_image: bool = True) -> dict:
+    """API shape of a local observation; the image is inlined as a data URI."""
+    formatted = {
+        "id": str(doc["_id"]),
+        "species": doc["species"],
+        "confidence": doc["confidence"],
+        "user_name": doc["user_name"],
+        "timestamp": doc["timestamp"],
+        "lat": doc["latitude"],
+        "lon": doc["longitude"],
+    }
+    if include_image:
+        image_b64 = base64.b64encode(doc["image"]).decode("utf-8")
+        formatted["image"] = f"data:{doc['image_mime_type']};base64,{image_b64}"
+    return formatted
+
+
+class ObservationStore:
+    """
+    Queries over the user `observations` collection. Observations with coordinates also store
+    them as a GeoJSON point in `location` (2dsphere indexed), so bounding box, radius and
+    polygon searches run in Mongo together with the species and time filters.
+    """
+
+    def __init__(self):
+        self.collection = MongoDatabase()[OBSERVATIONS_COLLECTION]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("location", GEOSPHERE), ("timestamp", DESCENDING)])
+        await self.collection.create_index([("country_code", DESCENDING), ("timestamp", DESCENDING)])
+
+    async def migrate_locations(self, batch_size: int = 500) -> int:
+        """Add `location` to observations saved before it existed. Idempotent; returns the number updated."""
+        query = {"location": {"$exists": False}, "latitude": {"$ne": None}, "longitude": {"$ne": None}}
+        migrated = 0
+        ops = []
+        async for doc in self.collection.find(query, {"latitude": 1, "longitude": 1}):
+            lat, lon = doc["latitude"], doc["longitude"]
+            # An invalid point would make every write to the 2dsphere index fail
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                logger.warning(f"[OBSERVATIONS] Skipping observation {doc['_id']} with invalid coordinates {lat},{lon}")
+                continue
+            ops.append(UpdateOne({"_id": doc["_id"], "location": {"$exists": False}}, {"$set": {"location": geojson_point(lat, lon)}}))
+            if len(ops) >= batch_size:
+                migrated += (await self.collection.bulk_write(ops, ordered=False)).modified_count
+                ops = []
+        if ops:
+            migrated += (await self.collection.bulk_write(ops, ordered=False)).modified_count
+        if migrated:
+            logger.info(f"[OBSERVATIONS] Added a GeoJSON location to {migrated} observations")
+            await DataVersionStore().safe_bump(data_versions.LOCAL)
+        return migrated
+
+    @staticmethod
+    def build_query(
+        geometry: Optional[dict] = None,
+        near: Optional[tuple[float, float, float]] = None,
+        species: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        **filters,
+    ) -> dict:
+        """
+        Mongo filter for observations within a GeoJSON `geometry` or `near=(lat, lon, dist_km)`,
+        whose species contains `species` (case-insensitive) and taken between `since` and `until`.
+        Extra `filters` are used as is.
+        """
+        query = dict(filters)
+        if geometry is not None:
+            query["location"] = {"$geoWithin": {"$geometry": geometry}}
+        elif near is not None:
+            lat, lon, dist_km = near
+            query["location"] = {"$geoWithin": {"$centerSphere": [[lon, lat], dist_km / EARTH_RADIUS_KM]}}
+        if species:
+            query["species"] = {"$regex": re.escape(species), "$options": "i"}
+        if since or until:
+            query["timestamp"] = {
+                **({"$gte": since} if since else {}),
+                **({"$lte": until} if until else {}),
+            }
+        return query
+
+    async def find(self, query: dict, limit: int = 0, include_image: bool = True) -> List[dict]:
+        """Matching observations, newest first, in the API shape of `format_observation`."""
+        projection = None if include_image else {field: 1 for field in SUMMARY_FIELDS}
+        cursor = self.collection.find(query, projection).sort("timestamp", DESCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        return [format_observation(doc, include_image) async for doc in cursor]
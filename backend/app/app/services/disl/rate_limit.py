@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Optional, Union
+
+from app.core.config import settings
+from app.services.disl.http_clients import Upstream
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Lower value is served first."""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class SharedPriority:
+    """
+    Priority of a call shared by several callers (see singleflight.py): the most urgent of theirs,
+    including callers that join while it runs. Callers may themselves be shared calls.
+    """
+
+    def __init__(self):
+        self._callers: list[Union[Priority, "SharedPriority"]] = []
+
+    def join(self, caller: Union[Priority, "SharedPriority"]):
+        self._callers.append(caller)
+
+    @property
+    def priority(self) -> Priority:
+        return min((effective_priority(caller) for caller in self._callers), default=Priority.INTERACTIVE)
+
+
+def effective_priority(value: Union[Priority, SharedPriority]) -> Priority:
+    return value.priority if isinstance(value, SharedPriority) else value
+
+
+# Priority of upstream calls made from the current task. User requests keep the default,
+# scheduled jobs switch to BACKGROUND with `background_priority()`; shared calls hold a SharedPriority.
+request_priority: ContextVar[Union[Priority, SharedPriority]] = ContextVar("request_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def background_priority():
+    token = request_priority.set(Priority.BACKGROUND)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+class TokenBucket:
+    """
+    Async token bucket with priority lanes.
+
+    Tokens refill at `rate` per second up to `burst`. When callers have to wait, a single
+    dispatcher hands out tokens as they refill, always serving INTERACTIVE waiters before
+    BACKGROUND ones, so user-facing calls overtake queued background traffic. The lane of a
+    waiter is looked up at every dispatch: a shared call moves up once an interactive caller joins.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        # Waiting callers in arrival order, with the priority they wait at
+        self._waiters: deque[tuple[asyncio.Future, Union[Priority, SharedPriority]]] = deque()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _has_waiters(self, up_to: Priority = Priority.BACKGROUND) -> bool:
+        return any(not fut.done() and effective_priority(priority) <= up_to for fut, priority in self._waiters)
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        # Skip callers that were cancelled while waiting
+        waiting = [(fut, effective_priority(priority)) for fut, priority in self._waiters if not fut.done()]
+        if not waiting:
+            self._waiters.clear()
+            return None
+        fut, _ = min(waiting, key=lambda waiter: waiter[1])
+        self._waiters = deque((other, priority) for other, priority in self._waiters if not other.done() and other is not fut)
+        return fut
+
+    async def _dispatch(self):
+        try:
+            while self._has_waiters():
+                self._refill()
+                if self.tokens >= 1:
+                    fut = self._next_waiter()
+                    if fut is not None:
+                        self.tokens -= 1
+                        fut.set_result(None)
+                    continue
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+        finally:
+            self._dispatcher = None
+
+    async def acquire(self, priority: Optional[Priority] = None):
+        if self.rate <= 0:
+            return
+        waiting_priority = request_priority.get() if priority is None else priority
+        self._refill()
+        # Only take a token directly when nobody of the same or higher priority is queued
+        if self.tokens >= 1 and not self._has_waiters(up_to=effective_priority(waiting_priority)):
+            self.tokens -= 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append((fut, waiting_priority))
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await fut
+
+
+class RateLimiterRegistry:
+    """One shared token bucket per upstream, configured by `UPSTREAM_RATE_LIMITS`/`UPSTREAM_RATE_BURST`."""
+
+    def __init__(self):
+        self._buckets: dict[Upstream, TokenBucket] = {}
+
+    def get(self, upstream: Upstream) -> TokenBucket:
+        bucket = self._buckets.get(upstream)
+        if bucket is None:
+            rate = settings.UPSTREAM_RATE_LIMITS.get(upstream.value, 0)
+            burst = settings.UPSTREAM_RATE_BURST.get(upstream.value, 1)
+            bucket = self._buckets[upstream] = TokenBucket(rate, burst)
+            logger.info(f"Rate limiting {upstream.value} to {rate}/s (burst {burst})")
+        return bucket
+
+
+rate_limiters = RateLimiterRegistry()
@@ -0,0 +1,215 @@
+import json
+import logging
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from bson import Binary, ObjectId
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo import ASCENDING, DESCENDING
+
+from app.core.config import settings
+from app.db.session import MongoDatabase
+from app.models.raw_data import ETLStatus
+from app.services.disl.batch_writer import batch_writers
+
+try:
+    import zstandard
+except ImportError:  # zlib is always available, just compresses less
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+RAW_PAYLOADS_COLLECTION = "raw_payloads"
+RAW_PAYLOADS_BUCKET = "raw_payloads_fs"
+# Payloads larger than this go to GridFS, well below Mongo's 16MB document limit
+GRIDFS_THRESHOLD = 8 * 1024 * 1024
+
+
+def compress_payload(payload: Any) -> tuple[str, bytes, int]:
+    """Serialize and compress a payload. Returns (codec, compressed bytes, raw size)."""
+    raw = json.dumps(payload, default=str, separators=(",", ":")).encode("utf-8")
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=settings.RAW_COMPRESSION_LEVEL).compress(raw), len(raw)
+    return "zlib", zlib.compress(raw, min(settings.RAW_COMPRESSION_LEVEL, 9)), len(raw)
+
+
+def decompress_payload(codec: str, data: bytes) -> Any:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd raw payloads")
+        # Streamed frames carry no content size, so decompress incrementally
+        raw = zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    elif codec == "zlib":
+        raw = zlib.decompress(data)
+    else:
+        raise ValueError(f"Unknown raw payload codec: {codec}")
+    return json.loads(raw)
+
+
+class RawPayloadStore:
+    """
+    Cold tier for raw upstream payloads.
+
+    Payloads are compressed and kept in `raw_payloads` (or GridFS when large), away from the
+    hot `raw_data` collection. Each document carries an `expires_at` computed from the
+    per-source retention in `settings.RAW_RETENTION_DAYS`, enforced by a TTL index.
+    """
+
+    def __init__(self):
+        self.db = MongoDatabase()
+        self.collection = self.db[RAW_PAYLOADS_COLLECTION]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+        await self.collection.create_index([("source", ASCENDING), ("fetched_at", DESCENDING)])
+
+    @staticmethod
+    def expires_at(source: str, fetched_at: datetime) -> Optional[datetime]:
+        days = settings.RAW_RETENTION_DAYS.get(source)
+        return fetched_at + timedelta(days=days) if days else None
+
+    async def put(
+        self,
+        source: str,
+        payload: Any,
+        status: ETLStatus = ETLStatus.SUCCESS,
+        fetched_at: Optional[datetime] = None,
+        metadata: Optional[dict] = None,
+        buffered: bool = True,
+    ) -> ObjectId:
+        codec, blob, size = compress_payload(payload)
+        return await self.put_compressed(source, codec, blob, size, status, fetched_at, metadata, buffered)
+
+    async def put_compressed(
+        self,
+        source: str,
+        codec: str,
+        blob: bytes,
+        size: int,
+        status: ETLStatus = ETLStatus.SUCCESS,
+        fetched_at: Optional[datetime] = None,
+        metadata: Optional[dict] = None,
+        buffered: bool = True,
+    ) -> ObjectId:
+        fetched_at = fetched_at or datetime.utcnow()
+        expires_at = self.expires_at(source, fetched_at)
+        doc = {
+            "source": source,
+            "fetched_at": fetched_at,
+            "expires_at": expires_at,
+            "status": status.value,
+            "codec": codec,
+            "size": size,
+            "compressed_size": len(blob),
+            "metadata": metadata or {},
+        }
+        if len(blob) > GRIDFS_THRESHOLD:
+            bucket = AsyncIOMotorGridFSBucket(self.db, bucket_name=RAW_PAYLOADS_BUCKET)
+            doc["gridfs_id"] = await bucket.upload_from_stream(
+                f"{source}-{fetched_at.isoformat()}", blob, metadata={"source": source, "expires_at": expires_at}
+            )
+        else:
+            doc["payload"] = Binary(blob)
+        # Id assigned client-side so the insert can be batched
+        doc["_id"] = ObjectId()
+        if buffered:
+            batch_writers.get(RAW_PAYLOADS_COLLECTION).add(doc)
+        else:
+            await self.collection.insert_one(doc)
+        logger.info(f"[RAW-STORE] Stored {source} payload: {size} -> {len(blob)} bytes ({codec})")
+        return doc["_id"]
+
+    def open_stream(self, source: str, metadata: Optional[dict] = None) -> "RawPayloadStreamWriter":
+        return RawPayloadStreamWriter(self, source, metadata)
+
+    async def get(self, payload_id: str) -> Any:
+        await batch_writers.get(RAW_PAYLOADS_COLLECTION).flush()
+        doc = await self.collection.find_one({"_id": ObjectId(payload_id)})
+        if not doc:
+            return None
+        if "gridfs_id" in doc:
+            bucket = AsyncIOMotorGridFSBucket(self.db, bucket_name=RAW_PAYLOADS_BUCKET)
+            stream = await bucket.open_download_stream(doc["gridfs_id"])
+            return decompress_payload(doc["codec"], await stream.read())
+        return decompress_payload(doc["codec"], doc["payload"])
+
+    async def purge_expired_files(self) -> int:
+        """TTL indexes do not reach GridFS, so expired large payloads are removed here."""
+        bucket = AsyncIOMotorGridFSBucket(self.db, bucket_name=RAW_PAYLOADS_BUCKET)
+        removed = 0
+        async for grid_file in bucket.find({"metadata.expires_at": {"$lt": datetime.utcnow()}}):
+            await bucket.delete(grid_file._id)
+            removed += 1
+        return removed
+
+    async def compact(self, batch_size: int = 100) -> int:
+        """
+        Migrate legacy raw payloads (`metadata.type == "raw"`) out of `raw_data` into this tier.
+        Documents past their retention are dropped instead of migrated.
+        """
+        raw_data = self.db["raw_data"]
+        migrated = 0
+        while True:
+            batch = [doc async for doc in raw_data.find({"metadata.type": "raw"}).limit(batch_size)]
+            if not batch:
+                break
+            now = datetime.utcnow()
+            for doc in batch:
+                fetched_at = doc.get("fetched_at") or now
+                expires_at = self.expires_at(doc["source"], fetched_at)
+                if expires_at is None or expires_at > now:
+                    await self.put(
+                        doc["source"],
+                        doc.get("data"),
+                        status=ETLStatus(doc.get("status", ETLStatus.SUCCESS.value)),
+                        fetched_at=fetched_at,
+                        metadata=doc.get("metadata"),
+                        # Written through so a failed insert aborts before the original is deleted
+                        buffered=False,
+                    )
+                    migrated += 1
+            await raw_data.delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}})
+        logger.info(f"[RAW-STORE] Compaction migrated {migrated} raw documents out of raw_data")
+        return migrated
+
+
+class RawPayloadStreamWriter:
+    """
+    Builds one compressed JSON array payload item by item, so a streamed upstream response can be
+    archived without ever holding it uncompressed. Nothing is stored if no item was added.
+    """
+
+    def __init__(self, store: RawPayloadStore, source: str, metadata: Optional[dict] = None):
+        self.store = store
+        self.source = source
+        self.metadata = metadata
+        self.count = 0
+        self.size = 0
+        self._chunks: list[bytes] = []
+        if zstandard is not None:
+            self.codec = "zstd"
+            self._compressor = zstandard.ZstdCompressor(level=settings.RAW_COMPRESSION_LEVEL).compressobj()
+        else:
+            self.codec = "zlib"
+            self._compressor = zlib.compressobj(min(settings.RAW_COMPRESSION_LEVEL, 9))
+
+    def _write(self, data: bytes):
+        self.size += len(data)
+        chunk = self._compressor.compress(data)
+        if chunk:
+            self._chunks.append(chunk)
+
+    def add(self, item: Any):
+        self._write(b"," if self.count else b"[")
+        self._write(json.dumps(item, default=str, separators=(",", ":")).encode("utf-8"))
+        self.count += 1
+
+    async def close(self, status: ETLStatus = ETLStatus.SUCCESS) -> Optional[ObjectId]:
+        if not self.count:
+            return None
+        self._write(b"]")
+        self._chunks.append(self._compressor.flush())
+        blob = b"".join(self._chunks)
+        self._chunks = []
+        return await self.store.put_compressed(self.source, self.codec, blob, self.size, status, metadata=self.metadata)
@@ -0,0 +1,85 @@
+import asyncio
+import functools
+import inspect
+import logging
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+from app.services.disl.rate_limit import SharedPriority, request_priority
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call for `key` is in flight, later callers
+    await the same task instead of starting their own. Nothing is cached once it completes.
+    The call's upstream requests take the rate-limit lane of its most urgent caller, so an
+    interactive request joining a background call is not served at background priority.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, tuple[asyncio.Task, SharedPriority]] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            priority = SharedPriority()
+            task = asyncio.ensure_future(self._run(fn, priority))
+            self._calls[key] = (task, priority)
+
+            def forget(done: asyncio.Task):
+                if key in self._calls and self._calls[key][0] is done:
+                    del self._calls[key]
+
+            task.add_done_callback(forget)
+        else:
+            task, priority = call
+            logger.debug(f"[SINGLE-FLIGHT] Joining in-flight call {key}")
+        priority.join(request_priority.get())
+        # Shield so one caller giving up (e.g. client disconnect) does not cancel the call for the others
+        return await asyncio.shield(task)
+
+
+    @staticmethod
+    async def _run(fn: Callable[[], Awaitable[T]], priority: SharedPriority) -> T:
+        # The task runs in a copy of the first caller's context: only its own lane changes here
+        request_priority.set(priority)
+        return await fn()
+
+
+single_flight = SingleFlight()
+
+
+def _normalize(value: Any) -> Hashable:
+    if isinstance(value, str):
+        return value.strip().casefold()
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _normalize(v)) for k, v in value.items()))
+    return value
+
+
+def coalesce(method: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """
+    Decorator for provider coroutines: concurrent calls with the same provider, method and
+    normalized arguments share one in-flight call and its result. Callers must treat the
+    shared result as read-only, and side effects (e.g. storing it) belong inside the call.
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = tuple((name, _normalize(value)) for name, value in bound.arguments.items() if name != "self")
+        key = (type(self).__name__, method.__name__, arguments)
+        return await single_flight.do(key, lambda: method(self, *args, **kwargs))
+
+    return wrapper
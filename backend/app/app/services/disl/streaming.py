@@ -0,0 +1,47 @@
+import json
+import logging
+from typing import Any, AsyncIterator
+
+import httpx
+
+try:
+    import ijson
+except ImportError:  # falls back to buffering the whole body
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+
+class _AsyncByteReader:
+    """Minimal async file object over an async byte iterator, as expected by ijson."""
+
+    def __init__(self, chunks: AsyncIterator[bytes]):
+        self._chunks = chunks.__aiter__()
+        self._buffer = b""
+
+    async def read(self, size: int = -1) -> bytes:
+        while not self._buffer:
+            try:
+                self._buffer = await self._chunks.__anext__()
+            except StopAsyncIteration:
+                return b""
+        if size < 0 or size >= len(self._buffer):
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+async def iter_json_items(response: httpx.Response, prefix: str = "item") -> AsyncIterator[Any]:
+    """
+    Yield the elements of a JSON array response one at a time while it downloads, so memory
+    stays flat regardless of response size. `response` must come from `client.stream(...)`.
+    Without ijson installed the body is read and parsed in one go.
+    """
+    if ijson is None:
+        data = json.loads(await response.aread())
+        for item in data if isinstance(data, list) else []:
+            yield item
+        return
+    async for item in ijson.items_async(_AsyncByteReader(response.aiter_bytes()), prefix, use_float=True):
+        yield item
@@ -0,0 +1,177 @@
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from pymongo import ReplaceOne
+
+from app.core.config import settings
+from app.db.session import MongoDatabase
+from app.services.disl.http_clients import Upstream, http_clients
+from app.services.disl.rate_limit import rate_limiters
+
+logger = logging.getLogger(__name__)
+
+TAXONOMY_COLLECTION = "ebird_taxonomy"
+NGRAM = 3
+
+
+def _ngrams(text: str) -> set[str]:
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class TaxonomyIndex:
+    """
+    Process-wide in-memory index over the eBird taxonomy.
+
+    The taxonomy is persisted once in the `ebird_taxonomy` collection and loaded from there,
+    so species lookups never touch the eBird API. Substring queries over `comName`/`sciName`
+    are answered by intersecting trigram postings and verifying the few remaining candidates.
+    """
+
+    def __init__(self):
+        self.codes: List[str] = []
+        self.com_names: List[str] = []
+        self.com_names_lower: List[str] = []
+        self.sci_names_lower: List[str] = []
+        self.postings: dict[str, frozenset[int]] = {}
+        self.loaded_at: Optional[datetime] = None
+        # Stamp of the stored taxonomy the index was built from, and when it was last compared
+        self.refreshed_at: Optional[datetime] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.codes)
+
+    def build(self, taxonomy: List[dict]):
+        codes, com_names, com_lower, sci_lower = [], [], [], []
+        postings: dict[str, set[int]] = {}
+        for entry in taxonomy:
+            code = entry.get("speciesCode")
+            if not code:
+                continue
+            idx = len(codes)
+            com = entry.get("comName") or ""
+            codes.append(code)
+            com_names.append(com)
+            com_lower.append(com.lower())
+            sci_lower.append((entry.get("sciName") or "").lower())
+            for gram in _ngrams(com_lower[idx]) | _ngrams(sci_lower[idx]):
+                postings.setdefault(gram, set()).add(idx)
+
+        # Swap in one go so concurrent readers never see a half-built index
+        self.codes, self.com_names = codes, com_names
+        self.com_names_lower, self.sci_names_lower = com_lower, sci_lower
+        self.postings = {gram: frozenset(ids) for gram, ids in postings.items()}
+        self.loaded_at = datetime.utcnow()
+        logger.info(f"[TAXONOMY] Indexed {len(codes)} species, {len(self.postings)} n-grams")
+
+    def _candidates(self, name_l: str):
+        if len(name_l) < NGRAM:
+            return range(len(self.codes))
+        grams = sorted((self.postings.get(g, frozenset()) for g in _ngrams(name_l)), key=len)
+        candidates = set(grams[0])
+        for ids in grams[1:]:
+            if not candidates:
+                break
+            candidates &= ids
+        return candidates
+
+    def search(self, name: str, limit: int = 5) -> List[str]:
+        """Return up to `limit` species codes whose common or scientific name contains `name`."""
+        name_l = name.strip().lower()
+        if not name_l:
+            return []
+        matches = [
+            idx for idx in self._candidates(name_l)
+            if name_l in self.com_names_lower[idx] or name_l in self.sci_names_lower[idx]
+        ]
+        # Exact common name first, then shorter names, then taxonomic order
+        ranked = heapq.nsmallest(
+            limit, matches, key=lambda idx: (self.com_names_lower[idx] != name_l, len(self.com_names[idx]), idx)
+        )
+        return [self.codes[idx] for idx in ranked]
+
+    async def load(self) -> bool:
+        """Load the index from Mongo. Returns False if the collection is empty."""
+        cursor = MongoDatabase()[TAXONOMY_COLLECTION].find(
+            {}, {"speciesCode": 1, "comName": 1, "sciName": 1, "taxonOrder": 1, "refreshed_at": 1}
+        ).sort("taxonOrder", 1)
+        taxonomy = [doc async for doc in cursor]
+        if not taxonomy:
+            return False
+        self.build(taxonomy)
+        self.refreshed_at = taxonomy[0].get("refreshed_at")
+        self._checked_at = time.monotonic()
+        return True
+
+    async def refresh(self) -> int:
+        """Download the taxonomy from eBird, persist it and rebuild the index."""
+        async with self._lock:
+            return await self._download()
+
+    async def _download(self) -> int:
+        """`refresh` body; the caller holds `_lock`."""
+        headers = {"X-eBirdApiToken": settings.EBIRD_API_KEY} if settings.EBIRD_API_KEY else {}
+        await rate_limiters.get(Upstream.EBIRD).acquire()
+        client = http_clients.get(Upstream.EBIRD)
+        resp = await client.get(settings.EBIRD_TAXONOMY_URL, params={"fmt": "json"}, headers=headers, timeout=60)
+        resp.raise_for_status()
+        taxonomy = resp.json()
+
+        collection = MongoDatabase()[TAXONOMY_COLLECTION]
+        now = datetime.utcnow()
+        ops = [
+            ReplaceOne({"_id": entry["speciesCode"]}, {**entry, "_id": entry["speciesCode"], "refreshed_at": now}, upsert=True)
+            for entry in taxonomy if entry.get("speciesCode")
+        ]
+        if ops:
+            await collection.bulk_write(ops, ordered=False)
+            # Drop species that were removed or lumped upstream
+            await collection.delete_many({"refreshed_at": {"$lt": now}})
+        self.build(taxonomy)
+        self.refreshed_at = now
+        self._checked_at = time.monotonic()
+        logger.info(f"[TAXONOMY] Refreshed eBird taxonomy with {len(ops)} entries")
+        return len(ops)
+
+    async def reload_if_refreshed(self) -> bool:
+        """
+        Rebuild from Mongo if another process refreshed the stored taxonomy since this index was built.
+        Only the scheduler leader runs the weekly refresh, every other process picks it up here.
+        """
+        self._checked_at = time.monotonic()
+        # A refresh stamps every entry with the same refreshed_at, so any document tells the version
+        doc = await MongoDatabase()[TAXONOMY_COLLECTION].find_one({}, {"refreshed_at": 1})
+        stored = doc.get("refreshed_at") if doc else None
+        if stored is None or (self.refreshed_at is not None and stored <= self.refreshed_at):
+            return False
+        async with self._lock:
+            if await self.load():
+                logger.info(f"[TAXONOMY] Reloaded taxonomy refreshed at {stored}")
+                return True
+        return False
+
+    async def ensure_loaded(self):
+        """Make the index available, bootstrapping the collection from eBird only if it is empty."""
+        if self.loaded:
+            if time.monotonic() - self._checked_at > settings.EBIRD_TAXONOMY_RELOAD_MINUTES * 60:
+                try:
+                    await self.reload_if_refreshed()
+                except Exception as e:
+                    logger.error(f"[TAXONOMY] Failed to check for a refreshed taxonomy: {e}")
+            return
+        async with self._lock:
+            if self.loaded:
+                return
+            if await self.load():
+                return
+            # Under the lock, so concurrent first callers wait for one download instead of each running their own
+            await self._download()
+
+
+taxonomy_index = TaxonomyIndex()
@@ -0,0 +1,191 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.disl import data_versions
+from app.services.disl.clusters import EBIRD_POINT_FIELDS, mercator_lat, mercator_x, mercator_y
+from app.services.disl.data_versions import DataVersionStore
+from app.services.disl.ebird_store import EBirdObservationStore
+from app.services.disl.geo import bbox_geometry
+from app.services.disl.mvt import TILE_EXTENT, LayerBuilder, encode_tile
+from app.services.disl.observation_store import ObservationStore
+from app.services.disl.singleflight import single_flight
+
+logger = logging.getLogger(__name__)
+
+TILE_LAYERS = (data_versions.EBIRD, data_versions.LOCAL)
+# Points sharing a pixel of a 256px tile become one feature
+_PIXEL_SHIFT = (TILE_EXTENT // 256).bit_length() - 1
+
+
+def tile_bounds(z: int, x: int, y: int) -> tuple[float, float, float, float]:
+    """(min_lat, min_lon, max_lat, max_lon) of a Web Mercator (XYZ) tile."""
+    n = 1 << z
+    return (
+        float(mercator_lat((y + 1) / n)),
+        x / n * 360.0 - 180.0,
+        float(mercator_lat(y / n)),
+        (x + 1) / n * 360.0 - 180.0,
+    )
+
+
+def tile_points(lat: np.ndarray, lon: np.ndarray, z: int, x: int, y: int) -> tuple[np.ndarray, ...]:
+    """
+    Tile coordinates of the points inside tile z/x/y, one per occupied pixel: returns the row of
+    the first point of every pixel (rows are newest first), its coordinates and the pixel's count.
+    """
+    n = 1 << z
+    px = np.floor((mercator_x(np.asarray(lon, dtype=np.float64)) * n - x) * TILE_EXTENT)
+    py = np.floor((mercator_y(np.asarray(lat, dtype=np.float64)) * n - y) * TILE_EXTENT)
+    # Half-open bounds, so points on a tile edge are drawn once; NaNs fall out here too
+    inside = np.flatnonzero((px >= 0) & (px < TILE_EXTENT) & (py >= 0) & (py < TILE_EXTENT))
+    px, py = px[inside].astype(np.int64), py[inside].astype(np.int64)
+    _, first, count = np.unique(((px >> _PIXEL_SHIFT) << 32) | (py >> _PIXEL_SHIFT), return_index=True, return_counts=True)
+    order = np.argsort(first)
+    first, count = first[order], count[order]
+    return inside[first], px[first], py[first], count
+
+
+async def ebird_tile_layer(z: int, x: int, y: int, species: Optional[str], since: Optional[datetime], until: Optional[datetime]) -> LayerBuilder:
+    """Stored eBird observations of the tile; never collects from eBird, so tiles stay cheap."""
+    batch = await EBirdObservationStore().find_batch(
+        fields=EBIRD_POINT_FIELDS, limit=settings.MAP_TILE_MAX_POINTS,
+        species=species, obs_since=since, obs_until=until, bbox=tile_bounds(z, x, y),
+    )
+    layer = LayerBuilder(data_versions.EBIRD)
+    rows, px, py, count = tile_points(batch.lat, batch.lon, z, x, y)
+    for row, point_x, point_y, point_count in zip(rows.tolist(), px.tolist(), py.tolist(), count.tolist()):
+        layer.add_point(point_x, point_y, {
+            "obs_id": batch.obs_id[row],
+            "species": batch.species[row],
+            "sci_name": batch.sci_name[row],
+            "date": batch.date[row],
+            "location": batch.location[row],
+            "how_many": batch.how_many[row],
+            "count": point_count,
+        })
+    return layer
+
+
+async def local_tile_layer(z: int, x: int, y: int, species: Optional[str], since: Optional[datetime], until: Optional[datetime]) -> LayerBuilder:
+    """User observations of the tile, without images."""
+    query = ObservationStore.build_query(geometry=bbox_geometry(*tile_bounds(z, x, y)), species=species, since=since, until=until)
+    records = await ObservationStore().find(query, limit=settings.MAP_TILE_MAX_POINTS, include_image=False)
+    layer = LayerBuilder(data_versions.LOCAL)
+    lat = np.array([record["lat"] for record in records], dtype=np.float64)
+    lon = np.array([record["lon"] for record in records], dtype=np.float64)
+    rows, px, py, count = tile_points(lat, lon, z, x, y)
+    for row, point_x, point_y, point_count in zip(rows.tolist(), px.tolist(), py.tolist(), count.tolist()):
+        record = records[row]
+        layer.add_point(point_x, point_y, {
+            "id": record["id"],
+            "species": record["species"],
+            "confidence": record["confidence"],
+            "user_name": record["user_name"],
+            "timestamp": record["timestamp"].isoformat() if record["timestamp"] else None,
+            "count": point_count,
+        })
+    return layer
+
+
+_LAYER_BUILDERS = {data_versions.EBIRD: ebird_tile_layer, data_versions.LOCAL: local_tile_layer}
+
+
+class VectorTileCache:
+    """
+    Encoded tiles on disk under MAP_TILE_CACHE_DIR as `<generation>/<filters>/<z>/<x>/<y>.mvt`.
+    The generation names the data version of every layer in the tile ("ebird-12_local-3"), so
+    ingesting observations (see data_versions.py) moves all processes to a new directory at once;
+    directories of older generations are removed in the background when a newer one is seen.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or settings.MAP_TILE_CACHE_DIR)
+        self._latest: dict[str, int] = {}
+
+    @staticmethod
+    def generation(layers: List[str], versions: dict[str, int]) -> str:
+        return "_".join(f"{layer}-{versions.get(layer, 0)}" for layer in layers)
+
+    @staticmethod
+    def filters_key(species: Optional[str], since: Optional[datetime], until: Optional[datetime]) -> str:
+        text = "|".join([(species or "").strip().casefold(), since.isoformat() if since else "", until.isoformat() if until else ""])
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+    def path(self, generation: str, filters: str, z: int, x: int, y: int) -> Path:
+        return self.root / generation / filters / str(z) / str(x) / f"{y}.mvt"
+
+    async def get(
+        self, generation: str, filters: str, z: int, x: int, y: int,
+        layers: List[str], species: Optional[str], since: Optional[datetime], until: Optional[datetime],
+    ) -> bytes:
+        path = self.path(generation, filters, z, x, y)
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            pass
+        return await single_flight.do(("tile", str(path)), lambda: self._build(path, z, x, y, layers, species, since, until))
+
+    async def _build(
+        self, path: Path, z: int, x: int, y: int,
+        layers: List[str], species: Optional[str], since: Optional[datetime], until: Optional[datetime],
+    ) -> bytes:
+        started = time.perf_counter()
+        builders = await asyncio.gather(*(_LAYER_BUILDERS[layer](z, x, y, species, since, until) for layer in layers))
+        data = encode_tile(builders)
+        logger.debug(
+            f"[TILES] Built {z}/{x}/{y} ({', '.join(f'{b.name}: {len(b)}' for b in builders)} features, {len(data)} bytes) "
+            f"in {time.perf_counter() - started:.3f}s"
+        )
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Readers in other processes must never see a partial tile
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.error(f"[TILES] Failed to cache tile {path}: {e}")
+        return data
+
+    def observe_versions(self, versions: dict[str, int]):
+        """Schedule removal of stale generations when `versions` is newer than any seen before."""
+        if all(versions.get(source, 0) <= self._latest.get(source, 0) for source in versions):
+            return
+        self._latest = {source: max(version, self._latest.get(source, 0)) for source, version in versions.items()}
+        asyncio.get_running_loop().run_in_executor(None, self.purge_stale, dict(self._latest))
+
+    def purge_stale(self, versions: dict[str, int]) -> int:
+        """Delete generation directories built from data older than `versions`; returns how many."""
+        removed = 0
+        if not self.root.is_dir():
+            return removed
+        for directory in self.root.iterdir():
+            try:
+                built_from = dict(part.rsplit("-", 1) for part in directory.name.split("_"))
+                stale = any(int(version) < versions.get(source, 0) for source, version in built_from.items())
+            except ValueError:
+                continue
+            if stale:
+                shutil.rmtree(directory, ignore_errors=True)
+                removed += 1
+        if removed:
+            logger.info(f"[TILES] Removed {removed} stale tile generations")
+        return removed
+
+
+vector_tiles = VectorTileCache()
+
+
+async def current_versions() -> dict[str, int]:
+    versions = await DataVersionStore().current()
+    vector_tiles.observe_versions(versions)
+    return versions
@@ -1,11 +1,14 @@
-from typing import Any
+from typing import Any, List
 from app.core.config import settings
 from app.models.raw_data import DataSource
-from .base import ETLProvider
+from .base import ETLProvider, Pipeline
+from .http_clients import Upstream
 import logging
 logger = logging.getLogger(__name__)
 
 class WildlifeProvider(ETLProvider):
+    upstream = Upstream.WILDLIFE
+
     def __init__(self):
         super().__init__(DataSource.WILDLIFE)
         self.api_key = settings.WILDLIFE_API_KEY
@@ -33,17 +36,18 @@ class WildlifeProvider(ETLProvider):
         if threshold is not None:
             data["threshold"] = str(threshold)
 
-        async with self.get_client() as client:
-            response = await client.post(
-                f"{self.base_url}/v1/detect",
-                headers={"Authorization": f"Bearer {self.api_key}"},
-                files=files,
-                data=data,
-                timeout=30.0
-            )
-            response.raise_for_status()
-            logger.info(f"Wildlife API response: {response.text}")
-            return response.json()
+        await self.throttle()
+        client = self.get_client()
+        response = await client.post(
+            f"{self.base_url}/v1/detect",
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            files=files,
+            data=data,
+            timeout=30.0
+        )
+        response.raise_for_status()
+        logger.info(f"Wildlife API response: {response.text}")
+        return response.json()
 
     def normalize(self, raw_data: Any) -> Any:
 
@@ -62,3 +66,18 @@ class WildlifeProvider(ETLProvider):
                 "bbox": item.get("bbox"),
             })
         return normalized
+
+    async def identify(self, image_bytes: bytes, filename: str, content_type: str = "image/jpeg", country: str = None, threshold: float = None) -> List[dict]:
+        """
+        Detect animals in one image and return the normalized annotations. Nothing is stored here:
+        uploads keep their result in the observation they create.
+        """
+        pipeline = (
+            Pipeline("wildlife-identify")
+            .source("fetch", self.fetch_pages(image_bytes, filename, content_type, country, threshold))
+            .stage("normalize", self.normalize)
+        )
+        normalized = []
+        async for page in pipeline.run():
+            normalized.extend(page)
+        return normalized
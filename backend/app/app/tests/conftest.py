@@ -0,0 +1,42 @@
+import os
+
+# Settings without defaults, for runs outside the docker-compose environment; tests reach no real services
+for name, value in {
+    "SERVER_NAME": "localhost",
+    "SERVER_HOST": "http://localhost",
+    "PROJECT_NAME": "Animal to Map",
+    "MONGO_DATABASE": "test",
+    "MONGO_DATABASE_URI": "mongodb://localhost:27017",
+    "FIRST_SUPERUSER": "admin@example.com",
+    "FIRST_SUPERUSER_PASSWORD": "changethis",
+    "EBIRD_API_KEY": "test",
+}.items():
+    os.environ.setdefault(name, value)
+
+from typing import Callable
+
+import httpx
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from app.core.config import settings
+from app.db import session
+from app.services.disl.http_clients import Upstream, http_clients
+
+
+@pytest.fixture(autouse=True)
+def db(monkeypatch):
+    """A fresh in-memory database per test in place of the MongoDB client."""
+    client = object.__new__(session._MongoClientSingleton)
+    client.mongo_client = AsyncMongoMockClient()
+    monkeypatch.setattr(session._MongoClientSingleton, "_instance", client)
+    return client.mongo_client[settings.MONGO_DATABASE]
+
+
+@pytest.fixture
+def upstream(monkeypatch) -> Callable[[Upstream, Callable[[httpx.Request], httpx.Response]], None]:
+    """`upstream(Upstream.EBIRD, handler)` answers that upstream's requests with `handler`."""
+    def route(name: Upstream, handler: Callable[[httpx.Request], httpx.Response]):
+        monkeypatch.setitem(http_clients._clients, name, httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    return route
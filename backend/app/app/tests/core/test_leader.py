@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from app.core.leader import JobRunHistory, LeaderElection, LeadershipLost
+
+
+async def test_run_returns_the_result_while_leader():
+    leader = LeaderElection("test")
+    assert await leader.try_acquire()
+
+    async def work():
+        return 42
+
+    assert await leader.run(work) == 42
+
+
+async def test_run_cancels_work_once_the_lease_lapses():
+    # Nobody renews the lease: it stops being valid after 2/3 of 0.3s
+    leader = LeaderElection("test", lease_seconds=0.3)
+    assert await leader.try_acquire()
+    cancelled = asyncio.Event()
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(LeadershipLost):
+        await asyncio.wait_for(leader.run(work), timeout=2)
+    assert cancelled.is_set()
+
+
+async def test_interrupted_runs_are_handed_to_the_next_leader():
+    history = JobRunHistory()
+    leader = LeaderElection("test", lease_seconds=0.3)
+    assert await leader.try_acquire()
+
+    with pytest.raises(LeadershipLost):
+        await history.record("collection", leader.holder_id, lambda: leader.run(lambda: asyncio.sleep(10)))
+
+    [run] = await history.recent("collection")
+    assert run["status"] == "interrupted"
+    assert await history.abandon_stale() == ["collection"]
+    [run] = await history.recent("collection")
+    assert run["status"] == "abandoned"
+
+
+async def test_lease_is_taken_over_only_once_it_expires():
+    first = LeaderElection("test", lease_seconds=0.3)
+    second = LeaderElection("test", lease_seconds=0.3)
+    assert await first.try_acquire()
+    assert not await second.try_acquire()
+    assert not second.is_leader
+
+    # The first holder stops renewing, e.g. because its process died
+    await asyncio.sleep(0.35)
+    assert not first.is_leader
+    assert await second.try_acquire()
+    assert second.is_leader
+    assert not await first.try_acquire()
+    assert (await second.collection.find_one({"_id": "test"}))["holder"] == second.holder_id
@@ -0,0 +1,28 @@
+import asyncio
+
+from app.db.session import MongoDatabase
+from app.services.disl.batch_writer import BatchWriter
+
+
+async def test_close_flushes_documents_still_buffered():
+    writer = BatchWriter("observations_test", max_batch=10, max_delay=60)
+    for index in range(3):
+        writer.add({"index": index})
+    collection = MongoDatabase()["observations_test"]
+    assert await collection.count_documents({}) == 0
+
+    await writer.close()
+    assert sorted([doc["index"] async for doc in collection.find()]) == [0, 1, 2]
+
+
+async def test_full_batch_is_flushed_without_waiting_for_the_delay():
+    writer = BatchWriter("observations_test", max_batch=2, max_delay=60)
+    docs = [{"index": index} for index in range(2)]
+    for doc in docs:
+        writer.add(doc)
+    await asyncio.gather(*writer._flushes)
+
+    collection = MongoDatabase()["observations_test"]
+    # Ids are assigned on add: a retried write would not duplicate them
+    assert await collection.count_documents({"_id": {"$in": [doc["_id"] for doc in docs]}}) == 2
+    await writer.close()
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+import httpx
+
+from app.services.disl.ebird import EBirdProvider
+from app.services.disl.ebird_store import EBirdObservationStore, EBirdWatermarkStore
+from app.services.disl.http_clients import Upstream
+
+
+def ebird_items(sub_ids: list[str], obs_dt: datetime) -> list[dict]:
+    return [
+        {
+            "subId": sub_id,
+            "speciesCode": "eurrob1",
+            "comName": "European Robin",
+            "sciName": "Erithacus rubecula",
+            "lat": 40.4,
+            "lng": -3.7,
+            "obsDt": obs_dt.strftime("%Y-%m-%d %H:%M"),
+            "locName": "Retiro",
+            "howMany": 1,
+        }
+        for sub_id in sub_ids
+    ]
+
+
+async def test_incremental_run_stores_new_sightings_and_advances_the_watermark(upstream):
+    observed = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(days=3)
+    upstream(Upstream.EBIRD, lambda request: httpx.Response(200, json=ebird_items(["S1", "S2"], observed)))
+
+    new_count = await EBirdProvider().run_incremental("ES")
+
+    assert new_count == 2
+    watermark = await EBirdWatermarkStore().get("ES")
+    assert watermark["last_obs_dt"] == observed
+    assert watermark["last_new_count"] == 2
+
+
+async def test_incremental_run_of_stored_sightings_still_advances_the_watermark(upstream):
+    previous = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(days=10)
+    latest = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(days=1)
+    await EBirdWatermarkStore().advance("ES", last_obs_dt=previous, last_sub_id="S0")
+    # Already stored by another run (e.g. a user search) before the scheduled collection sees them
+    items = ebird_items(["S3", "S4"], latest)
+    await EBirdObservationStore().upsert(EBirdProvider().normalize(items))
+    requests = []
+
+    def respond(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json=items)
+
+    upstream(Upstream.EBIRD, respond)
+
+    new_count = await EBirdProvider().run_incremental("ES")
+
+    assert new_count == 0
+    assert requests[0].url.params["back"] == "12"
+    watermark = await EBirdWatermarkStore().get("ES")
+    assert watermark["last_obs_dt"] == latest
+    assert watermark["last_sub_id"] in {"S3", "S4"}
+    # The next run asks for the days since the newest sighting only, not the whole window
+    assert EBirdProvider._back_window(watermark) == 3
+
+
+async def test_watermark_only_moves_forward():
+    watermarks = EBirdWatermarkStore()
+    newest = datetime(2024, 5, 2, 8, 30)
+    await watermarks.advance("ES", "eurrob1", last_obs_dt=newest, last_sub_id="S2", new_count=2)
+    await watermarks.advance("ES", "eurrob1", last_obs_dt=newest - timedelta(days=1), last_sub_id="S1", new_count=0)
+
+    watermark = await watermarks.get("ES", "eurrob1")
+    assert (watermark["last_obs_dt"], watermark["last_sub_id"]) == (newest, "S2")
+    assert watermark["last_new_count"] == 0
+    # Keyed per species: the region-wide watermark is untouched
+    assert await watermarks.get("ES") is None
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from app.core.config import settings
+from app.models.etl_job import EtlJobKind, EtlJobStatus
+from app.services.disl.job_queue import EtlJobQueue
+
+
+async def expire_lease(queue: EtlJobQueue, job_id: str):
+    await queue.collection.update_one(
+        {"_id": ObjectId(job_id)}, {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}},
+    )
+
+
+async def test_identical_active_jobs_are_enqueued_once():
+    queue = EtlJobQueue()
+    await queue.ensure_indexes()
+    first = await queue.enqueue(EtlJobKind.NINJAS_FETCH, {"name": "fox"}, user_id="u1")
+    second = await queue.enqueue(EtlJobKind.NINJAS_FETCH, {"name": "fox"}, user_id="u2")
+    other = await queue.enqueue(EtlJobKind.NINJAS_FETCH, {"name": "owl"}, user_id="u1")
+
+    assert first == second != other
+    assert (await queue.get(first)).user_ids == ["u1", "u2"]
+
+    # A finished job frees its key: the same request runs again
+    job = await queue.lease("w1")
+    await queue.complete(job.id, "w1", {"count": 1})
+    assert await queue.enqueue(EtlJobKind.NINJAS_FETCH, {"name": "fox"}) != first
+
+
+async def test_expired_lease_is_taken_over_by_another_worker():
+    queue = EtlJobQueue()
+    job_id = await queue.enqueue(EtlJobKind.NINJAS_FETCH, {"name": "fox"})
+    assert (await queue.lease("w1")).id == job_id
+    assert await queue.lease("w2") is None
+
+    await expire_lease(queue, job_id)
+    job = await queue.lease("w2")
+    assert job.id == job_id
+    assert job.worker_id == "w2"
+    assert job.attempts == 2
+    # The first worker's heartbeat tells it the job is no longer its own
+    assert not await queue.heartbeat(job_id, "w1")
+    assert await queue.heartbeat(job_id, "w2")
+
+
+async def test_failed_attempts_are_retried_then_fail_for_good(monkeypatch):
+    monkeypatch.setattr(settings, "ETL_JOB_RETRY_BACKOFF_SECONDS", 0)
+    queue = EtlJobQueue()
+    job_id = await queue.enqueue(EtlJobKind.NINJAS_FETCH, {"name": "fox"}, max_attempts=2)
+
+    job = await queue.lease("w1")
+    await queue.fail(job, "w1", "upstream timeout")
+    job = await queue.get(job_id)
+    assert job.status == EtlJobStatus.QUEUED
+    assert job.error == "upstream timeout"
+
+    job = await queue.lease("w1")
+    assert job.attempts == 2
+    await queue.fail(job, "w1", "upstream timeout again")
+    job = await queue.get(job_id)
+    assert job.status == EtlJobStatus.FAILED
+    assert job.error == "upstream timeout again"
+    assert await queue.lease("w1") is None
+
+
+async def test_expired_lease_of_the_last_attempt_fails_the_job():
+    queue = EtlJobQueue()
+    job_id = await queue.enqueue(EtlJobKind.NINJAS_FETCH, {"name": "fox"}, max_attempts=1)
+    await queue.lease("w1")
+
+    await expire_lease(queue, job_id)
+    assert await queue.lease("w2") is None
+    job = await queue.get(job_id)
+    assert job.status == EtlJobStatus.FAILED
+    assert job.error == "Lease expired"
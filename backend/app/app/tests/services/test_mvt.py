@@ -0,0 +1,100 @@
+import struct
+
+from app.services.disl.mvt import LayerBuilder, encode_tile
+
+
+def read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, pos
+
+
+def read_message(data: bytes) -> list[tuple[int, object]]:
+    """(field number, value) pairs of a protobuf message: ints for varints, bytes otherwise."""
+    fields, pos = [], 0
+    while pos < len(data):
+        key, pos = read_varint(data, pos)
+        number, wire_type = key >> 3, key & 0x7
+        if wire_type == 0:
+            value, pos = read_varint(data, pos)
+        elif wire_type == 1:
+            value, pos = data[pos:pos + 8], pos + 8
+        else:
+            length, pos = read_varint(data, pos)
+            value, pos = data[pos:pos + length], pos + length
+        fields.append((number, value))
+    return fields
+
+
+def read_packed(data: bytes) -> list[int]:
+    values, pos = [], 0
+    while pos < len(data):
+        value, pos = read_varint(data, pos)
+        values.append(value)
+    return values
+
+
+def unzigzag(value: int) -> int:
+    return (value >> 1) ^ -(value & 1)
+
+
+def read_value(data: bytes):
+    [(number, value)] = read_message(data)
+    if number == 1:
+        return value.decode("utf-8")
+    if number == 3:
+        return struct.unpack("<d", value)[0]
+    if number == 6:
+        return unzigzag(value)
+    if number == 7:
+        return bool(value)
+    return value
+
+
+def decode_tile(data: bytes) -> dict[str, dict]:
+    layers = {}
+    for number, layer in read_message(data):
+        assert number == 3
+        fields = read_message(layer)
+        keys = [value.decode("utf-8") for number, value in fields if number == 3]
+        values = [read_value(value) for number, value in fields if number == 4]
+        features = []
+        for feature in (read_message(value) for number, value in fields if number == 2):
+            feature = dict(feature)
+            tags = read_packed(feature.get(2, b""))
+            command, x, y = read_packed(feature[4])
+            assert (feature[3], command) == (1, (1 << 3) | 1)
+            features.append({
+                "id": feature.get(1),
+                "point": (unzigzag(x), unzigzag(y)),
+                "properties": {keys[k]: values[v] for k, v in zip(tags[::2], tags[1::2])},
+            })
+        layer = dict(fields)
+        layers[layer[1].decode("utf-8")] = {"version": layer[15], "extent": layer[5], "features": features}
+    return layers
+
+
+def test_encoded_points_decode_back():
+    layer = LayerBuilder("observations")
+    layer.add_point(10, 4095, {"species": "eurrob1", "count": 3, "flagged": True, "score": 0.5}, feature_id=7)
+    layer.add_point(-5, 20, {"species": "eurrob1", "count": -2, "note": None})
+    empty = LayerBuilder("clusters")
+
+    tile = decode_tile(encode_tile([layer, empty]))
+
+    assert list(tile) == ["observations"]
+    decoded = tile["observations"]
+    assert (decoded["version"], decoded["extent"]) == (2, 4096)
+    assert decoded["features"] == [
+        {"id": 7, "point": (10, 4095), "properties": {"species": "eurrob1", "count": 3, "flagged": True, "score": 0.5}},
+        {"id": None, "point": (-5, 20), "properties": {"species": "eurrob1", "count": -2}},
+    ]
+
+
+def test_tile_without_features_is_empty():
+    assert encode_tile([LayerBuilder("observations")]) == b""
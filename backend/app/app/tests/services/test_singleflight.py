@@ -0,0 +1,78 @@
+import asyncio
+
+import httpx
+
+from app.services.disl.batch_writer import batch_writers
+from app.services.disl.http_clients import Upstream
+from app.services.disl.ninjas import NinjasProvider
+from app.services.disl.raw_store import RAW_PAYLOADS_COLLECTION
+from app.services.disl.rate_limit import Priority, TokenBucket, background_priority, effective_priority, request_priority
+from app.services.disl.singleflight import SingleFlight
+
+ZEBRA = [{"name": "Plains Zebra", "taxonomy": {}, "locations": ["Africa"], "characteristics": {"diet": "Herbivore"}}]
+
+
+async def test_concurrent_fetches_share_one_upstream_call_and_one_store(upstream, db, monkeypatch):
+    monkeypatch.setattr("app.core.config.settings.NINJAS_API_KEY", "test")
+    calls = []
+
+    def respond(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json=ZEBRA)
+
+    upstream(Upstream.NINJAS, respond)
+
+    first, second = await asyncio.gather(NinjasProvider().fetch_and_save("zebra"), NinjasProvider().fetch_and_save("Zebra "))
+
+    assert first == second == (ZEBRA, [{"name": "Plains Zebra", "taxonomy": {}, "locations": ["Africa"], "characteristics": {"diet": "Herbivore"}}])
+    assert len(calls) == 1
+    await batch_writers.flush()
+    assert await db["raw_data"].count_documents({"source": "ninjas"}) == 1
+    assert await db[RAW_PAYLOADS_COLLECTION].count_documents({"source": "ninjas"}) == 1
+
+
+async def test_shared_call_takes_the_priority_of_its_most_urgent_caller():
+    flight = SingleFlight()
+    release = asyncio.Event()
+    seen = []
+
+    async def call():
+        seen.append(effective_priority(request_priority.get()))
+        await release.wait()
+        seen.append(effective_priority(request_priority.get()))
+        return "done"
+
+    async def background_caller():
+        with background_priority():
+            return await flight.do("key", call)
+
+    background = asyncio.create_task(background_caller())
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(flight.do("key", call))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(background, interactive) == ["done", "done"]
+    assert seen == [Priority.BACKGROUND, Priority.INTERACTIVE]
+
+
+async def test_waiting_shared_call_moves_ahead_once_an_interactive_caller_joins():
+    bucket = TokenBucket(rate=20, burst=1)
+    await bucket.acquire()
+    flight = SingleFlight()
+    order = []
+
+    async def acquire(name: str):
+        await bucket.acquire()
+        order.append(name)
+
+    async def background(name: str, shared: bool):
+        with background_priority():
+            await (flight.do(name, lambda: acquire(name)) if shared else acquire(name))
+
+    queued = [asyncio.create_task(background("plain", shared=False)), asyncio.create_task(background("shared", shared=True))]
+    await asyncio.sleep(0.01)
+    joined = asyncio.create_task(flight.do("shared", lambda: acquire("shared")))
+    await asyncio.gather(*queued, joined)
+
+    assert order == ["shared", "plain"]
@@ -0,0 +1,18 @@
+import httpx
+
+from app.services.disl.batch_writer import batch_writers
+from app.services.disl.http_clients import Upstream
+from app.services.disl.wildlife import WildlifeProvider
+
+DETECTION = {"annotations": [{"id": 1, "label": "zebra", "score": 0.93, "taxonomy": {"species": "Equus quagga"}, "bbox": [0, 0, 1, 1]}]}
+
+
+async def test_identify_returns_detections_without_storing_them(upstream, db, monkeypatch):
+    monkeypatch.setattr("app.core.config.settings.WILDLIFE_API_KEY", "test")
+    upstream(Upstream.WILDLIFE, lambda request: httpx.Response(200, json=DETECTION))
+
+    detections = await WildlifeProvider().identify(b"image", "zebra.jpg")
+
+    assert [(d["label"], d["confidence"]) for d in detections] == [("zebra", 0.93)]
+    await batch_writers.flush()
+    assert await db["raw_data"].count_documents({}) == 0
@@ -0,0 +1,36 @@
+import httpx
+
+from app.services.disl.ebird_store import EBirdObservationStore
+from app.services.disl.http_clients import Upstream
+from app.worker import ebird_run_etl
+
+
+def ebird_item(sub_id: str, lat: float, lng: float) -> dict:
+    return {
+        "subId": sub_id,
+        "speciesCode": "eurrob1",
+        "comName": "European Robin",
+        "sciName": "Erithacus rubecula",
+        "lat": lat,
+        "lng": lng,
+        "obsDt": "2026-10-01 08:00",
+        "locName": "Somewhere",
+        "howMany": 1,
+    }
+
+
+async def test_ebird_job_result_is_a_summary_read_back_from_the_store(upstream):
+    madrid = [ebird_item("S1", 40.41, -3.70), ebird_item("S2", 40.42, -3.69)]
+    barcelona = [ebird_item("S3", 41.38, 2.17)]
+    upstream(Upstream.EBIRD, lambda request: httpx.Response(200, json=madrid if "geo" in request.url.path else madrid + barcelona))
+
+    region = await ebird_run_etl({"region_code": "ES", "species": "", "max_results": 100})
+    geo = await ebird_run_etl({"species": "", "max_results": 100, "lat": 40.4, "lng": -3.7, "dist_km": 10})
+
+    assert "observations" not in region
+    assert region["count"] == 3 and region["region_errors"] == {}
+    assert geo["count"] == 2
+    store = EBirdObservationStore()
+    assert {obs["obs_id"] for obs in await store.find_run(region)} == {"S1:eurrob1", "S2:eurrob1", "S3:eurrob1"}
+    # Sightings other runs received meanwhile, outside the area, are left out
+    assert {obs["obs_id"] for obs in await store.find_run(geo)} == {"S1:eurrob1", "S2:eurrob1"}
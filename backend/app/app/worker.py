@@ -0,0 +1,227 @@
+"""
+ETL worker process.
+
+Leases jobs from the Mongo `etl_jobs` queue (see services/disl/job_queue.py) and runs the
+scheduled ETL jobs, so upstream waits and ETL CPU stay out of the API processes. The API only
+enqueues work; start as many workers as needed with `python -m app.worker` (worker-start.sh).
+"""
+import asyncio
+import logging
+import os
+import signal
+import socket
+from datetime import datetime
+from typing import Any, Awaitable, Callable
+
+from app.core.config import settings
+from app.core.leader import JobRunHistory
+from app.core.scheduler import scheduler_leader, setup_scheduler
+from app.models.etl_job import EtlJob, EtlJobKind
+from app.models.raw_data import DataSource, ETLStatus
+from app.services.disl import NinjasProvider, OpenStreetMapsProvider, EBirdProvider
+from app.services.disl.batch_writer import batch_writers
+from app.services.disl.ebird_store import EBirdCollectionRunStore, EBirdObservationStore
+from app.services.disl.geocode_cache import geocode_cache
+from app.services.disl.http_clients import http_clients
+from app.services.disl.job_queue import EtlJobQueue
+from app.services.disl.rate_limit import Priority, request_priority
+from app.services.disl.raw_store import RawPayloadStore
+from app.services.disl.taxonomy import taxonomy_index
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Items of a provider query kept in its job result, for the admin to inspect
+PROVIDER_QUERY_SAMPLE_SIZE = 20
+
+
+async def ebird_run_etl(params: dict) -> dict:
+    """
+    Run the eBird ETL and keep a summary as the job result: a world run returns more observations
+    than fit in a job document, so clients read them back with `EBirdObservationStore.find_run`.
+    """
+    provider = EBirdProvider()
+    started_at = datetime.utcnow()
+    observations = await provider.run_etl(
+        region_code=params.get("region_code", "world"),
+        species=params.get("species", ""),
+        max_results=params.get("max_results", 100),
+        lat=params.get("lat"),
+        lng=params.get("lng"),
+        dist_km=params.get("dist_km"),
+    )
+    geo = params.get("lat") is not None and params.get("lng") is not None
+    return {
+        **params,
+        "started_at": started_at,
+        "count": len(observations),
+        # Without a species filter the run collected every species of its area
+        "species_codes": sorted({obs["species_code"] for obs in observations if obs.get("species_code")}) if params.get("species") else None,
+        "bbox": provider.geo_area(params["lat"], params["lng"], params.get("dist_km")) if geo else None,
+        "region_errors": provider.last_errors,
+    }
+
+
+async def ninjas_fetch(params: dict) -> dict:
+    _, normalized = await NinjasProvider().fetch_and_save(params["name"])
+    # The payloads are stored by `save`; the first match is all readers use
+    return {"name": params["name"], "count": len(normalized), "animal": normalized[0] if normalized else None}
+
+
+async def provider_query(params: dict) -> dict:
+    """
+    Admin test query for one provider (`/etl/{provider}/run`): fetch and save, returning the number
+    of items and the first `PROVIDER_QUERY_SAMPLE_SIZE` of the raw result.
+    """
+    provider = DataSource(params["provider"])
+    if provider == DataSource.EBIRD:
+        ebird_provider = EBirdProvider()
+        result = await ebird_provider.fetch(
+            region_code=params.get("region_code", "ES"),
+            species_code=params.get("species") or None,
+            max_results=params.get("max_results", 100),
+        )
+        normalized = ebird_provider.normalize(result)
+        await ebird_provider.save(result, normalized)
+        return {**_sample(provider, result), "region_errors": ebird_provider.last_errors}
+    if provider == DataSource.NINJAS:
+        result, _ = await NinjasProvider().fetch_and_save(params["animal_name"])
+        return _sample(provider, result)
+    if provider == DataSource.MAPS:
+        maps_provider = OpenStreetMapsProvider()
+        result = await maps_provider.geocode_single(params["location"])
+        await maps_provider.store({"location": params["location"], "coordinates": result}, status=ETLStatus.SUCCESS, metadata={"query": params["location"]})
+        return {"provider": provider.value, "data": result}
+    raise ValueError(f"Provider {provider.value} cannot be queried through the job queue")
+
+
+def _sample(provider: DataSource, result: Any) -> dict:
+    if not isinstance(result, list):
+        return {"provider": provider.value, "data": result, "count": 1}
+    return {"provider": provider.value, "data": result[:PROVIDER_QUERY_SAMPLE_SIZE], "count": len(result)}
+
+
+async def animal_map(params: dict) -> dict:
+    """Where an animal lives according to Ninjas, geocoded for `/maps/animal-to-map`."""
+    name = params["name"]
+    locations = await NinjasProvider().get_locations(name)
+    if not locations:
+        return {"error": "No location found for this animal."}
+    map_data = await OpenStreetMapsProvider().get_map_for_locations(locations)
+    if not map_data:
+        return {"error": "Could not generate map for the given locations."}
+    return {"map_data": map_data, "animal_name": name, "locations": locations}
+
+
+JOB_HANDLERS: dict[EtlJobKind, Callable[[dict], Awaitable[Any]]] = {
+    EtlJobKind.EBIRD_RUN_ETL: ebird_run_etl,
+    EtlJobKind.NINJAS_FETCH: ninjas_fetch,
+    EtlJobKind.PROVIDER_QUERY: provider_query,
+    EtlJobKind.ANIMAL_MAP: animal_map,
+}
+
+
+class EtlWorker:
+    """Runs up to `concurrency` leased jobs at once, extending each lease while its job runs."""
+
+    def __init__(self, concurrency: int | None = None):
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self.concurrency = concurrency or settings.ETL_WORKER_CONCURRENCY
+        self.queue = EtlJobQueue()
+        self._stopping = asyncio.Event()
+
+    def stop(self):
+        logger.info(f"[ETL-WORKER] {self.worker_id} stopping after the running jobs")
+        self._stopping.set()
+
+    async def run(self):
+        logger.info(f"[ETL-WORKER] {self.worker_id} started with {self.concurrency} slots")
+        await asyncio.gather(*(self._slot() for _ in range(self.concurrency)))
+
+    async def _slot(self):
+        while not self._stopping.is_set():
+            try:
+                job = await self.queue.lease(self.worker_id)
+            except Exception as e:
+                logger.error(f"[ETL-WORKER] Failed to lease a job: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=settings.ETL_JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._execute(job)
+
+    async def _heartbeat(self, job: EtlJob):
+        while True:
+            await asyncio.sleep(settings.ETL_JOB_VISIBILITY_SECONDS / 3)
+            try:
+                if not await self.queue.heartbeat(job.id, self.worker_id):
+                    logger.warning(f"[ETL-WORKER] Lost the lease on job {job.id}")
+                    return
+            except Exception as e:
+                logger.error(f"[ETL-WORKER] Heartbeat failed for job {job.id}: {e}")
+
+    async def _execute(self, job: EtlJob):
+        logger.info(f"[ETL-WORKER] Running {job.kind.value} job {job.id} (attempt {job.attempts}/{job.max_attempts})")
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        # Jobs enqueued by API requests keep the interactive rate-limit lane
+        token = request_priority.set(Priority(job.priority))
+        try:
+            result = await JOB_HANDLERS[job.kind](job.params)
+        except Exception as e:
+            logger.error(f"[ETL-WORKER] {job.kind.value} job {job.id} failed: {e}")
+            await self.queue.fail(job, self.worker_id, str(e))
+        else:
+            await self.queue.complete(job.id, self.worker_id, result)
+            logger.info(f"[ETL-WORKER] {job.kind.value} job {job.id} succeeded")
+        finally:
+            request_priority.reset(token)
+            heartbeat.cancel()
+
+
+async def main():
+    http_clients.open()
+
+    for store in (EBirdObservationStore(), EBirdCollectionRunStore(), RawPayloadStore(), EtlJobQueue(), JobRunHistory(), geocode_cache):
+        try:
+            await store.ensure_indexes()
+        except Exception as e:
+            logger.error(f"Failed to create indexes for {type(store).__name__}: {str(e)}")
+
+    try:
+        await taxonomy_index.ensure_loaded()
+    except Exception as e:
+        logger.error(f"Failed to load eBird taxonomy index: {str(e)}")
+
+    # Scheduled ETL jobs run here rather than in the web processes, on the elected leader only
+    logger.info("Starting APScheduler for background ETL tasks")
+    scheduler = setup_scheduler()
+    scheduler.start()
+    scheduler_leader.start()
+
+    worker = EtlWorker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        logger.info("Shutting down APScheduler")
+        scheduler.shutdown()
+        await scheduler_leader.stop()
+        logger.info("Flushing buffered ETL writes")
+        await batch_writers.close()
+        logger.info("Closing shared HTTP clients")
+        await http_clients.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,5 +1,7 @@
 #! /usr/bin/env bash
 set -e
 
-hatch run python /app/app/celeryworker_pre_start.py
-hatch run celery -A app.worker worker -l info -Q main-queue -c 1
+# Let the DB start
+hatch run python /app/app/backend_pre_start.py
+# Lease ETL jobs from the etl_jobs queue and run the scheduled ETL jobs
+hatch run python -m app.worker
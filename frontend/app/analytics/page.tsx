@@ -5,6 +5,10 @@ import { useState } from "react";
 import { BarChart, RecommendationsCard } from "../components/AnalyticsCharts";
 import { useAuthFetch } from "../lib/hooks/useAuthFetch";
 import { useProtectedRoute } from "../lib/hooks/useProtectedRoute";
+import { waitForJob } from "../lib/api/jobs";
+
+// Collection jobs waited for before showing the species as still pending
+const MAX_COLLECTION_ROUNDS = 3;
 
 export default function AnalyticsPage() {
     const router = useRouter();
@@ -14,6 +18,8 @@ export default function AnalyticsPage() {
     const [loading, setLoading] = useState(false);
     const [data, setData] = useState<any>(null);
     const [error, setError] = useState<string | null>(null);
+    const [collecting, setCollecting] = useState<string | null>(null);
+    const [pending, setPending] = useState<string | null>(null);
 
     // Form states
     const [species, setSpecies] = useState("");
@@ -28,6 +34,7 @@ export default function AnalyticsPage() {
         setLoading(true);
         setError(null);
         setData(null);
+        setPending(null);
 
         const queryParams = new URLSearchParams();
         if (species) queryParams.append("species", species);
@@ -36,12 +43,37 @@ export default function AnalyticsPage() {
 
         try {
             const url = `${process.env.NEXT_PUBLIC_API_URL}/analytics/temporal-patterns?${queryParams.toString()}`;
-            const result = await authFetch(url);
+            let result = await authFetch(url);
+            // No stored observations yet: wait for the eBird collection job, then analyze again.
+            // The answer can be another job (202) while a collection is still running.
+            for (let round = 0; result.job_id && round < MAX_COLLECTION_ROUNDS; round++) {
+                setCollecting("Collecting eBird observations for this species...");
+                const job = await waitForJob(authFetch, result.job_id);
+                if (job.status === "failed") {
+                    throw new Error(job.error || "Failed to collect eBird observations");
+                }
+                result = await authFetch(url);
+            }
+            if (result.job_id) {
+                setPending(result.message || "Observations for this species are still being collected.");
+                return;
+            }
             setData(result);
+            setLoading(false);
+
+            // Habitat data still being fetched: refresh the analysis once it is stored
+            if (result.ninjas_job) {
+                setCollecting("Fetching habitat information...");
+                const job = await waitForJob(authFetch, result.ninjas_job.job_id);
+                if (job.status === "succeeded") {
+                    setData(await authFetch(url));
+                }
+            }
         } catch (err: any) {
             setError(err.message || "Unknown error");
         } finally {
             setLoading(false);
+            setCollecting(null);
         }
     }
 
@@ -109,7 +141,7 @@ export default function AnalyticsPage() {
                 {loading && (
                     <div className="text-center py-12">
                         <div className="inline-block animate-spin rounded-full h-12 w-12 border-b-2 border-blue-600"></div>
-                        <p className="mt-4 text-gray-600">Analyzing data...</p>
+                        <p className="mt-4 text-gray-600">{collecting || "Analyzing data..."}</p>
                     </div>
                 )}
 
@@ -119,6 +151,18 @@ export default function AnalyticsPage() {
                     </div>
                 )}
 
+                {pending && !loading && (
+                    <div className="bg-blue-50 border border-blue-200 rounded-lg p-6 text-center mb-8">
+                        <h3 className="text-lg font-medium text-blue-800 mb-2">Still Collecting</h3>
+                        <p className="text-blue-700">{pending}</p>
+                        <p className="text-sm text-blue-600 mt-2">Please run the analysis again in a few minutes.</p>
+                    </div>
+                )}
+
+                {collecting && !loading && (
+                    <p className="text-sm text-blue-600 mb-4">{collecting}</p>
+                )}
+
                 {data && !loading && (
                     <div className="space-y-8 animate-fade-in-up">
                         {data.total_observations === 0 ? (
@@ -0,0 +1,28 @@
+import { IEtlJob } from "../interfaces";
+
+type AuthFetch = (url: string, options?: RequestInit) => Promise<any>;
+
+// Poll an ETL job until the worker has finished it. Endpoints answer with a job id
+// (202, or an `*_job` field) when collecting upstream data takes longer than they wait.
+export async function waitForJob(
+  authFetch: AuthFetch,
+  jobId: string,
+  intervalMs = 2000,
+  timeoutMs = 180000
+): Promise<IEtlJob> {
+  const deadline = Date.now() + timeoutMs;
+  while (true) {
+    const job: IEtlJob = await authFetch(`${process.env.NEXT_PUBLIC_API_URL}/etl/jobs/${jobId}`);
+    if (job.status === "succeeded" || job.status === "failed") return job;
+    if (Date.now() > deadline) {
+      throw new Error("Data is still being collected, please try again in a few minutes");
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+}
+
+// Observations collected by a succeeded eBird ETL job; the job result itself is only a summary.
+export async function fetchJobObservations(authFetch: AuthFetch, jobId: string): Promise<any[]> {
+  const data = await authFetch(`${process.env.NEXT_PUBLIC_API_URL}/etl/jobs/${jobId}/observations`);
+  return data.observations || [];
+}
@@ -14,6 +14,8 @@ import {
   IMsg,
   INotification,
   IErrorResponse,
+  IEtlJob,
+  IPendingJob,
 } from "./utilities";
 
 // https://stackoverflow.com/a/64782482/295606
@@ -35,4 +37,6 @@ export type {
   IMsg,
   INotification,
   IErrorResponse,
+  IEtlJob,
+  IPendingJob,
 };
@@ -44,3 +44,16 @@ export interface IErrorResponse {
   message: string;
   code: number;
 }
+
+export interface IEtlJob {
+  id: string;
+  kind: string;
+  status: "queued" | "running" | "succeeded" | "failed";
+  result?: any;
+  error?: string | null;
+}
+
+export interface IPendingJob {
+  job_id: string;
+  status: IEtlJob["status"];
+}
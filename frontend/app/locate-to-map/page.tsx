@@ -7,6 +7,7 @@ import { markerIcon2x, markerIcon, markerShadow } from "./leaflet-icons";
 import { useSearchParams, useRouter } from "next/navigation";
 import { useAuthFetch } from "../lib/hooks/useAuthFetch";
 import { useProtectedRoute } from "../lib/hooks/useProtectedRoute";
+import { waitForJob } from "../lib/api/jobs";
 
 function LocateToMapContent() {
     const isLoggedIn = useProtectedRoute("/locate-to-map");
@@ -91,9 +92,14 @@ function LocateToMapContent() {
         setShowEBird(false);
 
         try {
-            const data = await authFetch(
+            let data = await authFetch(
                 `${process.env.NEXT_PUBLIC_API_URL}/maps/animal-to-map?name=${encodeURIComponent(searchTerm)}`
             );
+            // Lookup still running in the ETL worker: its result is the map response
+            if (data.job_id) {
+                const job = await waitForJob(authFetch, data.job_id);
+                data = job.status === "succeeded" ? job.result : { error: job.error || "Could not locate this animal." };
+            }
 
             if (data.error) {
                 setError(data.error);
@@ -104,9 +110,13 @@ function LocateToMapContent() {
                 // Prefetch eBird
                 setEBirdLoading(true);
                 try {
-                    const ebirdData = await authFetch(
-                        `${process.env.NEXT_PUBLIC_API_URL}/maps/ebird-observations-map?species=${encodeURIComponent(searchTerm)}`
-                    );
+                    const ebirdUrl = `${process.env.NEXT_PUBLIC_API_URL}/maps/ebird-observations-map?species=${encodeURIComponent(searchTerm)}`;
+                    let ebirdData = await authFetch(ebirdUrl);
+                    // Observations still being collected: ask again once the job is done
+                    if (ebirdData.job_id) {
+                        const job = await waitForJob(authFetch, ebirdData.job_id);
+                        ebirdData = job.status === "succeeded" ? await authFetch(ebirdUrl) : null;
+                    }
                     if (ebirdData?.observations?.length > 0) {
                         setEBirdData(ebirdData);
                     }
@@ -5,6 +5,7 @@ import "leaflet/dist/leaflet.css";
 import { useRouter } from "next/navigation";
 import { useAuthFetch } from "../lib/hooks/useAuthFetch";
 import { useProtectedRoute } from "../lib/hooks/useProtectedRoute";
+import { fetchJobObservations, waitForJob } from "../lib/api/jobs";
 
 const fixLeafletIcons = async () => {
     const L = (await import("leaflet")).default;
@@ -25,6 +26,7 @@ export default function MapSearch() {
     const [search, setSearch] = useState("");
     const [loading, setLoading] = useState(false);
     const [error, setError] = useState<string | null>(null);
+    const [collecting, setCollecting] = useState(false);
     const [observations, setObservations] = useState<{ ebird: any[], local: any[] }>({ ebird: [], local: [] });
 
     const mapRef = useRef<any>(null);
@@ -47,10 +49,25 @@ export default function MapSearch() {
             const data = await authFetch(url);
             setObservations(data);
             renderMap(data);
+
+            // eBird data still being collected: show the rest now, add eBird when the job is done
+            if (data.ebird_job) {
+                setCollecting(true);
+                const job = await waitForJob(authFetch, data.ebird_job.job_id);
+                if (job.status === "failed") {
+                    setError(job.error || "Failed to collect eBird observations");
+                } else {
+                    const ebird = await fetchJobObservations(authFetch, data.ebird_job.job_id);
+                    const updated = { ...data, ebird };
+                    setObservations(updated);
+                    renderMap(updated);
+                }
+            }
         } catch (err: any) {
             setError(err.message);
         } finally {
             setLoading(false);
+            setCollecting(false);
         }
     };
 
@@ -154,6 +171,10 @@ export default function MapSearch() {
                     </button>
                 </form>
 
+                {collecting && (
+                    <div className="mb-6 text-blue-600">Collecting eBird observations, they will appear on the map shortly...</div>
+                )}
+
                 {error && (
                     <div className="rounded-md bg-red-50 p-4 mb-8">
                         <div className="flex">